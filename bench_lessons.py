@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Speicher-Benchmark für Lessons (tracemalloc)
+Vergleicht die frühere UntisLesson (__dict__, uid sofort berechnet) mit der
+aktuellen (Slots, internierte Strings, uid lazy) und dem spaltenweisen LessonTable.
+Die Strings werden pro Lesson neu erzeugt - wie beim Parsen einer Wochen-Datei.
+
+Nutzung:
+    python3 bench_lessons.py
+    python3 bench_lessons.py --lessons 500000
+"""
+
+import argparse
+import gc
+import hashlib
+import random
+import tracemalloc
+from untis_sync_improved import UntisLesson, LessonTable
+from bench_parser import SUBJECTS, TEACHERS, NOTES, SLOTS
+
+
+class DictLesson:
+    """UntisLesson vor der Umstellung auf Slots (zum Vergleich)"""
+    def __init__(self, start_time, end_time, subject, teacher, room, date, note=None):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.subject = subject
+        self.teacher = teacher
+        self.room = room
+        self.date = date
+        if note:
+            self.note = note
+        data = f"{date}_{start_time}_{end_time}_{subject}_{room}"
+        self.uid = hashlib.md5(data.encode()).hexdigest()[:16]
+
+
+def rows(count: int, seed: int = 1):
+    """Lesson-Felder als frisch erzeugte Strings (nicht interniert)"""
+    rng = random.Random(seed)
+    for i in range(count):
+        start, end = rng.choice(SLOTS)
+        note = rng.choice(NOTES)
+        yield (
+            ''.join(start), ''.join(end),
+            ''.join(rng.choice(SUBJECTS)), ''.join(rng.choice(TEACHERS)),
+            f"O{rng.randint(1000, 1200)}", f"2025-{9 + i % 4:02d}-{1 + i % 28:02d}",
+            ''.join(note) or None,
+        )
+
+
+def measure(build, count: int) -> float:
+    """Bytes pro Lesson die nach dem Aufbau belegt bleiben"""
+    gc.collect()
+    tracemalloc.start()
+    data = build(rows(count))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speicher pro Lesson')
+    parser.add_argument('--lessons', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"📊 {args.lessons} Lessons")
+    results = [
+        ('dict (vorher)', measure(lambda it: [DictLesson(*row) for row in it], args.lessons)),
+        ('slots', measure(lambda it: [UntisLesson(*row) for row in it], args.lessons)),
+        ('LessonTable', measure(lambda it: LessonTable(UntisLesson(*row) for row in it), args.lessons)),
+    ]
+
+    baseline = results[0][1]
+    for name, per_lesson in results:
+        print(f"   {name:14} {per_lesson:7.0f} Bytes/Lesson  ({per_lesson / baseline * 100:3.0f}%)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark der DOM-Parser-Engines (legacy vs. fast)
+Erzeugt eine synthetische Wochen-Datei im DOM-Format (viele Klassen = viele
+Lesson-Cards), parst sie mit beiden Engines und prüft dass die Lessons identisch sind.
+
+Nutzung:
+    python3 bench_parser.py                 # 40 Klassen, synthetisch
+    python3 bench_parser.py --classes 200
+    python3 bench_parser.py weekly_data/week_1.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from untis_sync_improved import ImprovedUntisParser
+
+SUBJECTS = ['Ma', 'De', 'En', 'Lit', 'Ph', 'Ch', 'Bio', 'Inf', 'Wi', 'Sp']
+TEACHERS = ['Fay', 'Mül', 'Sch', 'Kra', 'Wen', 'Bau', 'Hof', 'Lan']
+NOTES = ['Klassenarbeit', 'Vertretung', 'Exkursion', 'Test: Kapitel 3', '']
+SLOTS = [('07:20', '08:50'), ('09:10', '10:40'), ('10:50', '12:20'), ('12:50', '14:20'), ('14:30', '16:00')]
+
+
+def element(text, class_name='', testid=None):
+    dataset = {'testid': testid} if testid else {}
+    return {'index': 0, 'text': text, 'html': '', 'className': class_name, 'dataset': dataset}
+
+
+def lesson_card(rng, start, end):
+    """Eine Lesson-Card mit Kind-Elementen wie in der WebUntis-Ansicht"""
+    subject = rng.choice(SUBJECTS)
+    teacher = rng.choice(TEACHERS)
+    rooms = f"O{rng.randint(1000, 1200)}"
+    if rng.random() < 0.2:
+        rooms += f", +O{rng.randint(1000, 1200)}"
+    note = rng.choice(NOTES)
+
+    card_text = f"{start}{end}{teacher}{subject}{rooms}{note}"
+    items = [
+        element(card_text, 'lesson-card lesson-card--regular'),
+        element(f"{start}{end}", 'lesson-card-time'),
+        element(teacher, 'lesson-card-resources', 'lesson-card-resources-with-change-teachers'),
+        element(teacher, 'lesson-card-resource'),
+        element(subject, 'lesson-card-subject', 'lesson-card-subject'),
+        element(rooms, 'lesson-card-resources', 'lesson-card-resources-with-change-rooms'),
+        element(rooms.split(',')[0], 'lesson-card-resource'),
+    ]
+    if note:
+        items.append(element(note, 'lesson-card-text', 'lesson-card-text-content-container'))
+        items.append(element(note, 'lesson-card-text-inner'))
+    return items
+
+
+def synthetic_week(classes: int, seed: int = 1) -> dict:
+    """DOM-Wochen-Datei mit `classes` Stundenplänen hintereinander"""
+    rng = random.Random(seed)
+    lessons = []
+    for _ in range(classes):
+        for _day in range(5):
+            for start, end in SLOTS[:rng.randint(2, len(SLOTS))]:
+                lessons.extend(lesson_card(rng, start, end))
+    for i, item in enumerate(lessons):
+        item['index'] = i
+    return {'localStorage': {}, 'timetable': {'url': 'https://example/timetable/my-student?date=2025-10-20',
+                                              'lessons': lessons}}
+
+
+def run_engine(path: str, engine: str, repeat: int):
+    """Parst `repeat` mal (ohne JSON-Laden) - gibt (beste Zeit, Lessons als dicts) zurück"""
+    best = None
+    lessons = []
+    for _ in range(repeat):
+        parser = ImprovedUntisParser(path, engine=engine)
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            lessons = parser.parse_lessons()
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, [l.to_dict() for l in lessons]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark der DOM-Parser-Engines')
+    parser.add_argument('file', nargs='?', help='Wochen-Datei im DOM-Format (sonst synthetisch)')
+    parser.add_argument('--classes', type=int, default=40, help='Anzahl Klassen in der synthetischen Datei')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    path = args.file
+    tmp_path = None
+    if not path:
+        data = synthetic_week(args.classes)
+        fd, tmp_path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        path = tmp_path
+        print(f"📄 Synthetische Woche: {args.classes} Klassen, {len(data['timetable']['lessons'])} Elemente")
+
+    try:
+        legacy_time, legacy = run_engine(path, 'legacy', args.repeat)
+        fast_time, fast = run_engine(path, 'fast', args.repeat)
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+    print(f"   legacy: {legacy_time * 1000:8.1f} ms  ({len(legacy)} Lessons)")
+    print(f"   fast:   {fast_time * 1000:8.1f} ms  ({len(fast)} Lessons)")
+    print(f"   Faktor: {legacy_time / fast_time:.1f}x")
+
+    if legacy != fast:
+        print("❌ Ergebnisse unterscheiden sich!")
+        return 1
+    print("✓ Identische Lessons")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
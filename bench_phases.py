@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Vergleicht die Phasen-Dauer zweier Extractor-Läufe (extractor_stats.json)
+Typisch: einmal aufzeichnen, dann alte und neue Version gegen den Replay-Server laufen lassen.
+
+Nutzung:
+    python3 bench_phases.py stats_before.json stats_after.json
+"""
+
+import json
+import sys
+
+
+def load_stats(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(before: dict, after: dict) -> list:
+    """Zeilen (Phase, vorher, nachher) für alle Phasen beider Läufe"""
+    phases = list(before.get('phases', {}))
+    phases += [p for p in after.get('phases', {}) if p not in phases]
+
+    rows = []
+    for phase in phases:
+        rows.append((
+            phase,
+            before.get('phases', {}).get(phase, {}).get('total'),
+            after.get('phases', {}).get(phase, {}).get('total'),
+        ))
+    rows.append(('gesamt', before.get('total_seconds'), after.get('total_seconds')))
+    return rows
+
+
+def format_delta(old, new) -> str:
+    if old is None or new is None:
+        return ''
+    delta = new - old
+    percent = f" ({delta / old * 100:+.0f}%)" if old else ''
+    return f"{delta:+8.2f}s{percent}"
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        return 1
+
+    before = load_stats(sys.argv[1])
+    after = load_stats(sys.argv[2])
+
+    print(f"{'Phase':18} {'vorher':>9} {'nachher':>9}  Differenz")
+    print("-" * 60)
+    for phase, old, new in compare(before, after):
+        old_text = f"{old:8.2f}s" if old is not None else f"{'-':>9}"
+        new_text = f"{new:8.2f}s" if new is not None else f"{'-':>9}"
+        print(f"{phase:18} {old_text} {new_text}  {format_delta(old, new)}")
+
+    print(f"\nWochen: {before.get('weeks_extracted')} → {after.get('weeks_extracted')}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
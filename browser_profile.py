@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Browser-Start beschleunigen
+- Gefundener Browser + Driver werden in browser_state.json gemerkt (keine Suche pro Start)
+- Persistentes Browser-Profil, damit die JavaScript-Bundles der SPA aus dem
+  HTTP-Cache kommen. Größe wird begrenzt, geprüft wird höchstens einmal am Tag.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+BROWSER_STATE_FILE = 'browser_state.json'
+
+# Verzeichnisse im Profil die bei Überschreitung der Größe geleert werden dürfen
+CACHE_DIRS = ('Cache', 'Code Cache', 'GPUCache', 'Service Worker', 'cache2', 'startupCache')
+
+# Lock-Dateien die ein abgestürzter Chrome hinterlässt
+CHROME_LOCK_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+PRUNE_INTERVAL = timedelta(days=1)
+
+
+def load_browser_state() -> dict:
+    try:
+        with open(BROWSER_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_browser_state(state: dict):
+    try:
+        with open(BROWSER_STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+    except OSError as e:
+        print(f"⚠ Browser-Status konnte nicht gespeichert werden: {e}")
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def prune_profile(profile_dir: str, max_mb: float):
+    """Löscht die ältesten Cache-Dateien bis das Profil unter 80% des Limits liegt"""
+    limit = max_mb * 1024 * 1024
+    size = directory_size(profile_dir)
+    if size <= limit:
+        return
+
+    cache_files = []
+    for root, dirs, files in os.walk(profile_dir):
+        if not any(part in CACHE_DIRS for part in os.path.relpath(root, profile_dir).split(os.sep)):
+            continue
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                cache_files.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                continue
+
+    removed = 0
+    for _, file_size, path in sorted(cache_files):
+        if size - removed <= limit * 0.8:
+            break
+        try:
+            os.remove(path)
+            removed += file_size
+        except OSError:
+            continue
+
+    print(f"🧹 Browser-Profil bereinigt: {size / 1024 / 1024:.0f} MB → {(size - removed) / 1024 / 1024:.0f} MB")
+
+    # Reicht der Cache nicht, Profil komplett neu anlegen
+    if size - removed > limit:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        print("🧹 Browser-Profil zu groß - neu angelegt")
+
+
+class ProfileInUseError(Exception):
+    """Das Profil ist von einem laufenden Browser gesperrt (anderer Lauf oder der Daemon)"""
+
+
+# Lock-Symlink pro Browser, Ziel endet auf die PID ("hostname-pid" bzw. "ip:+pid")
+PROFILE_LOCKS = {'chrome': 'SingletonLock', 'firefox': 'lock'}
+
+
+def profile_lock_owner(profile_dir: str, browser: str):
+    """PID des laufenden Browsers der das Profil gesperrt hat - None wenn frei oder verwaist"""
+    try:
+        target = os.readlink(os.path.join(profile_dir, PROFILE_LOCKS.get(browser, 'SingletonLock')))
+        pid = int(target.rsplit('-', 1)[-1].rsplit('+', 1)[-1])
+    except (OSError, ValueError):
+        return None
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass  # läuft, gehört aber einem anderen Benutzer
+    return pid
+
+
+def check_profile_lock(profile_dir: str, browser: str):
+    """
+    Bricht mit klarer Meldung ab wenn ein laufender Browser das Profil benutzt,
+    entfernt den Lock eines nicht mehr laufenden Chrome (z.B. nach Absturz)
+    """
+    pid = profile_lock_owner(profile_dir, browser)
+    if pid:
+        raise ProfileInUseError(
+            f"Browser-Profil {profile_dir} wird von Prozess {pid} benutzt "
+            f"(läuft schon ein Extractor?) - UNTIS_PROFILE_DIR ändern oder leer lassen"
+        )
+
+    if browser == 'chrome':
+        for name in CHROME_LOCK_FILES:
+            try:
+                os.remove(os.path.join(profile_dir, name))
+            except OSError:
+                pass
+
+
+def prepare_profile(base_dir: str, browser: str, max_mb: float) -> str:
+    """Profil-Verzeichnis pro Browser anlegen, bei Bedarf (max. täglich) verkleinern"""
+    profile_dir = os.path.abspath(os.path.join(base_dir, browser))
+
+    state = load_browser_state()
+    last_prune = state.get('last_prune')
+    if not last_prune or datetime.now() - datetime.fromisoformat(last_prune) >= PRUNE_INTERVAL:
+        if os.path.isdir(profile_dir):
+            prune_profile(profile_dir, max_mb)
+        state['last_prune'] = datetime.now().isoformat()
+        save_browser_state(state)
+
+    os.makedirs(profile_dir, exist_ok=True)
+    check_profile_lock(profile_dir, browser)
+    return profile_dir
@@ -2,15 +2,21 @@
 """
 Cleanup Script - Löscht alle Untis-Events aus Google Calendar
 Nützlich um neu zu starten oder Duplikate zu entfernen
+
+Standard: Events aus dem lokalen Index (untis_state.db, per syncToken aktualisiert).
+Mit --all wird der Kalender komplett gelistet und mit sehr breiten Kriterien gesucht
+(findet auch Events, die nicht vom Sync angelegt wurden).
 """
 
 import pickle
 import os
-from datetime import datetime, timedelta
+import sys
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from state_store import (StateStore, refresh_store, list_events, date_window, parsed_date_range,
+                         new_transfer_stats, format_transfer)
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
@@ -35,36 +41,44 @@ def authenticate():
     
     return build('calendar', 'v3', credentials=creds)
 
-def find_untis_events(service, calendar_id='primary', days_forward=90):
+def find_indexed_events(service, store, calendar_id='primary', days_forward=90, stats=None):
+    """Untis-Events aus dem lokalen Index (nur Änderungen werden gelistet)"""
+    date_min, date_max = date_window(parsed_date_range(), 14, days_forward)
+    print(f"🔍 Suche Events von {date_min} bis {date_max} im lokalen Index...\n")
+    
+    changes, incremental = refresh_store(service, store, calendar_id, stats)
+    print(f"📊 {changes} Events {'geändert seit dem letzten Lauf' if incremental else 'im Kalender gelistet'}\n")
+    
+    untis_events = []
+    for row in store.events(date_min, date_max):
+        untis_events.append({
+            'id': row['event_id'],
+            'summary': row['summary'],
+            'start': row['start'],
+            'location': row['location'],
+            'description': '',
+            'reason': "hat UID" if row['uid'] else f"Raum: {row['location']}"
+        })
+    
+    print(f"✓ {len(untis_events)} Untis-Events im Index\n")
+    
+    return untis_events
+
+def find_untis_events(service, calendar_id='primary', days_forward=90, stats=None):
     """Finde alle Untis-Events - mit sehr breiten Kriterien"""
-    print(f"🔍 Suche Events der nächsten {days_forward} Tage...\n")
-    
-    now = datetime.utcnow()
-    # Gehe auch in die Vergangenheit
-    time_min = (now - timedelta(days=14)).isoformat() + 'Z'
-    time_max = (now + timedelta(days=days_forward)).isoformat() + 'Z'
-    
-    all_events = []
-    page_token = None
-    
-    # Hole ALLE Events mit Pagination
-    while True:
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=2500,
-            singleEvents=True,
-            orderBy='startTime',
-            pageToken=page_token
-        ).execute()
-        
-        events = events_result.get('items', [])
-        all_events.extend(events)
-        
-        page_token = events_result.get('nextPageToken')
-        if not page_token:
-            break
+    # Wochen der zuletzt geparsten Lessons, sonst auch in die Vergangenheit
+    date_min, date_max = date_window(parsed_date_range(), 14, days_forward)
+    print(f"🔍 Suche Events von {date_min} bis {date_max}...\n")
+    
+    # Hole ALLE Events mit Pagination - nur die Felder für die Kriterien unten
+    all_events, _ = list_events(
+        service, calendar_id, stats,
+        timeMin=f"{date_min}T00:00:00Z",
+        timeMax=f"{date_max}T23:59:59Z",
+        singleEvents=True,
+        orderBy='startTime',
+        fields='items(id,summary,location,description,start,extendedProperties/private),nextPageToken'
+    )
     
     print(f"📊 {len(all_events)} Events total gefunden\n")
     
@@ -132,7 +146,7 @@ def find_untis_events(service, calendar_id='primary', days_forward=90):
     
     return untis_events
 
-def delete_events(service, events, calendar_id='primary', dry_run=False):
+def delete_events(service, events, calendar_id='primary', dry_run=False, store=None):
     """Löscht Events"""
     print(f"\n{'='*60}")
     print(f"{'DRY RUN - ' if dry_run else ''}Lösche {len(events)} Events...")
@@ -154,6 +168,8 @@ def delete_events(service, events, calendar_id='primary', dry_run=False):
                     calendarId=calendar_id,
                     eventId=event['id']
                 ).execute()
+                if store:
+                    store.delete_event(event['id'])
                 print(" ✓")
                 deleted += 1
             except Exception as e:
@@ -175,9 +191,15 @@ def main():
     print("="*60 + "\n")
     
     service = authenticate()
+    store = StateStore()
+    stats = new_transfer_stats()
     
     # Finde Events
-    events = find_untis_events(service)
+    if '--all' in sys.argv:
+        events = find_untis_events(service, stats=stats)
+    else:
+        events = find_indexed_events(service, store, stats=stats)
+    print(f"📦 Übertragen: {format_transfer(stats)}\n")
     
     if not events:
         print("✓ Keine Untis-Events gefunden. Calendar ist sauber!\n")
@@ -217,7 +239,7 @@ def main():
     
     if response in ['j', 'y', 'd']:
         dry_run = (response == 'd')
-        delete_events(service, events, dry_run=dry_run)
+        delete_events(service, events, dry_run=dry_run, store=store)
         
         if not dry_run:
             print("✅ Cleanup abgeschlossen!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Debug-Artefakte (Screenshots + Page-Source) nach Policy
+    off        - nie
+    on-failure - nur bei Fehlern (Standard, der Normalfall kostet nichts)
+    always     - zusätzlich an allen Checkpoints (Login-Seite, vor/nach Login)
+Pro Lauf ein Verzeichnis unter debug/runs/, nur die letzten N werden behalten.
+"""
+
+import os
+import shutil
+import threading
+from datetime import datetime
+
+DEBUG_DIR = 'debug'
+POLICIES = ('off', 'on-failure', 'always')
+
+
+class DebugRecorder:
+    """Sammelt Debug-Artefakte eines Laufs, Schreiben auf Disk läuft im Hintergrund"""
+
+    def __init__(self, policy: str = 'on-failure', keep_runs: int = 5, directory: str = DEBUG_DIR):
+        self.policy = policy if policy in POLICIES else 'on-failure'
+        self.keep_runs = keep_runs
+        self.runs_dir = os.path.join(directory, 'runs')
+        self.run_dir = None
+        self.failures = 0
+        self._threads = []
+
+    def checkpoint(self, driver, name: str):
+        """Zwischenstand im Normalfall - nur bei Policy 'always'"""
+        if self.policy == 'always':
+            self._capture(driver, name, with_source=False)
+
+    def failure(self, driver, name: str):
+        """Fehlerfall - Screenshot + Page-Source (außer bei Policy 'off')"""
+        if self.policy == 'off' or driver is None:
+            return
+        self.failures += 1
+        self._capture(driver, name, with_source=True)
+
+    def _capture(self, driver, name: str, with_source: bool):
+        # Nur das Abholen aus dem Browser passiert synchron
+        try:
+            png = driver.get_screenshot_as_png()
+            source = driver.page_source if with_source else None
+            url = driver.current_url
+        except Exception as e:
+            print(f"  ⚠ Debug-Artefakt '{name}' nicht möglich: {e}")
+            return
+
+        if not self.run_dir:
+            self.run_dir = os.path.join(self.runs_dir, datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+
+        thread = threading.Thread(target=self._write, args=(name, png, source, url))
+        thread.start()
+        self._threads.append(thread)
+        print(f"📸 Debug: {os.path.join(self.run_dir, name)}.png")
+
+    def _write(self, name: str, png: bytes, source: str, url: str):
+        os.makedirs(self.run_dir, exist_ok=True)
+        with open(os.path.join(self.run_dir, f'{name}.png'), 'wb') as f:
+            f.write(png)
+        if source is not None:
+            with open(os.path.join(self.run_dir, f'{name}.html'), 'w', encoding='utf-8') as f:
+                f.write(f'<!-- {url} -->\n{source}')
+
+    def finish(self):
+        """Wartet auf ausstehende Schreibvorgänge und behält nur die letzten N Läufe"""
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.run_dir = None
+
+        if not os.path.isdir(self.runs_dir):
+            return
+        runs = sorted(os.listdir(self.runs_dir))
+        for old_run in runs[:max(0, len(runs) - self.keep_runs)]:
+            shutil.rmtree(os.path.join(self.runs_dir, old_run), ignore_errors=True)
+
+
+def debug_recorder_from_env() -> DebugRecorder:
+    """DebugRecorder aus UNTIS_DEBUG_ARTIFACTS / UNTIS_DEBUG_KEEP"""
+    return DebugRecorder(
+        policy=os.getenv('UNTIS_DEBUG_ARTIFACTS', 'on-failure').lower(),
+        keep_runs=int(os.getenv('UNTIS_DEBUG_KEEP', '5')),
+    )
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Chrome DevTools Netzwerk-Log Helfer
+Liest das Performance-Log von ChromeDriver und holt Response-Bodies
+"""
+
+import base64
+import json
+
+# Timetable-Endpoints der WebUntis SPA (neue REST-API und alte Weekly-API)
+TIMETABLE_URL_PATTERNS = (
+    '/api/rest/view/v1/timetable/entries',
+    '/api/public/timetable/weekly/data',
+)
+
+
+def enable_performance_log(options):
+    """Aktiviert das Performance-Log (Network.* Events) für Chrome"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+class NetworkLog:
+    """
+    Sammelt Network.* Events aus dem Performance-Log
+
+    driver.get_log('performance') leert den Puffer bei jedem Aufruf,
+    deshalb sammelt diese Klasse alle Events zentral und mehrere
+    Verbraucher lesen über mark()/since() ihren Ausschnitt.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.events = []
+
+    def poll(self) -> int:
+        """Holt neue Events aus dem Browser - gibt die Anzahl neuer Events zurück"""
+        count = 0
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            return 0  # Browser bereits beendet
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            if message.get('method', '').startswith('Network.'):
+                self.events.append((message['method'], message.get('params', {})))
+                count += 1
+        return count
+
+    def clear(self):
+        """Verwirft alle gesammelten Events (z.B. nach jedem Daemon-Job)"""
+        self.poll()
+        self.events = []
+
+    def mark(self) -> int:
+        """Position für spätere since()-Abfragen"""
+        self.poll()
+        return len(self.events)
+
+    def since(self, mark: int) -> list:
+        """Alle Events seit mark()"""
+        self.poll()
+        return self.events[mark:]
+
+    def response_body(self, request_id: str):
+        """Holt den Body einer Response - None wenn nicht (mehr) verfügbar"""
+        body = self.response_bytes(request_id)
+        if body is None:
+            return None
+        return body.decode('utf-8', errors='replace')
+
+    def response_bytes(self, request_id: str):
+        """Body einer Response als Bytes (auch Binärdaten) - None wenn nicht verfügbar"""
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            return None
+        if result.get('base64Encoded'):
+            return base64.b64decode(result['body'])
+        return (result.get('body') or '').encode('utf-8')
+
+    def json_responses(self, mark: int, url_patterns=TIMETABLE_URL_PATTERNS) -> list:
+        """
+        Sammelt alle JSON-Responses seit mark() deren URL eines der Muster enthält
+
+        Returns: Liste von {'url': ..., 'status': ..., 'data': ...}
+        """
+        events = self.since(mark)
+        finished = {params.get('requestId') for method, params in events
+                    if method == 'Network.loadingFinished'}
+
+        responses = []
+        for method, params in events:
+            if method != 'Network.responseReceived':
+                continue
+            response = params.get('response', {})
+            url = response.get('url', '')
+            if not any(pattern in url for pattern in url_patterns):
+                continue
+            if params.get('requestId') not in finished:
+                continue
+
+            body = self.response_body(params['requestId'])
+            if body is None:
+                continue
+            try:
+                data = json.loads(body)
+            except ValueError:
+                continue
+
+            responses.append({'url': url, 'status': response.get('status'), 'data': data})
+
+        return responses
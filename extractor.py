@@ -8,37 +8,162 @@ import json
 import time
 import os
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from readiness import (wait_for_spa, wait_for_login_form, wait_for_login_result, login_error_texts,
+                       wait_for_timetable, TimetableReadiness, phase_timeout, POLL_INTERVAL)
+from run_stats import PhaseTimer, write_run_stats
+from session_store import SessionStore
+from devtools import NetworkLog, enable_performance_log
+from recording import ResponseRecorder, record_network_events
+from week_files import (week_file_path, save_week_file, parse_entities, job_label, job_slug,
+                        WeekPlan)
+from resource_filter import resource_filter_from_env
+from debug_artifacts import DebugRecorder, debug_recorder_from_env
+from refresh_policy import refresh_policy_from_env
+from login_selectors import LoginSelectorCache, resolve_login_form
+from resilience import CircuitOpenError, retry_policy_from_env, circuit_breaker_from_env
+from browser_profile import load_browser_state, save_browser_state, prepare_profile, ProfileInUseError
+
+# Kompakt-Modus: ein Record pro Lesson-Card statt aller "lesson"-Elemente samt
+# innerHTML. Der Tag kommt aus der Spalte des Wochentag-Headers über der Card
+# (null wenn keine Header erkannt werden - der Parser nutzt dann Zeit-Sprünge).
+COMPACT_EXTRACT_JS = """
+const keys = arguments[0] || [];
+const weekdays = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So'];
+const text = (card, selector) => {
+    const el = card.querySelector(selector);
+    return el ? el.textContent.trim() : '';
+};
+
+// Wochentag-Header ("Mo 20.10.", "Di", ...) mit ihrer horizontalen Mitte
+const headers = [];
+document.querySelectorAll('[class*="header"] *, [data-testid*="header"] *').forEach(el => {
+    if (el.children.length > 0) return;
+    const label = el.textContent.trim();
+    const day = weekdays.indexOf(label.substring(0, 2));
+    if (day < 0 || !/^\\S{2}\\.?(\\s+\\d|$)/.test(label)) return;
+    const rect = el.getBoundingClientRect();
+    headers.push({day: day, center: rect.left + rect.width / 2});
+});
+
+const lessons = [];
+document.querySelectorAll('div[class*="lesson-card"]').forEach(card => {
+    if (!card.classList.contains('lesson-card')) return;
+    const times = card.textContent.match(/\\d{2}:\\d{2}/g) || [];
+    if (times.length < 2) return;
+
+    // Tag = nächstgelegener Wochentag-Header
+    const rect = card.getBoundingClientRect();
+    const center = rect.left + rect.width / 2;
+    let day = null, distance = Infinity;
+    headers.forEach(header => {
+        if (Math.abs(header.center - center) < distance) {
+            distance = Math.abs(header.center - center);
+            day = header.day;
+        }
+    });
+
+    lessons.push({
+        start: times[0],
+        end: times[1],
+        subject: text(card, '[data-testid*="lesson-card-subject"]'),
+        teachers: text(card, '[data-testid*="lesson-card-resources-with-change-teachers"]'),
+        rooms: text(card, '[data-testid*="lesson-card-resources-with-change-rooms"]'),
+        note: text(card, '[data-testid*="lesson-card-text-content-container"]'),
+        day: day
+    });
+});
+
+const storage = {};
+keys.forEach(key => {
+    const value = localStorage.getItem(key);
+    if (value !== null) storage[key] = value;
+});
+
+return [lessons, storage];
+"""
 
 class UntisAutoExtractor:
     """Automatischer WebUntis Data Extractor"""
     
-    def __init__(self, school_name, username, password, headless=True):
+    def __init__(self, school_name, username, password, headless=True,
+                 reuse_session=True, session_key=None, extract_mode='dom',
+                 base_url='https://ajax.webuntis.com', concurrency=1, resource_filter=None,
+                 debug=None, entities=None, refresh=None, localstorage_keys=None,
+                 profile_dir=None, profile_max_mb=300, retry=None, record_dir=None):
         self.school_name = school_name
         self.username = username
         self.password = password
         self.headless = headless
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = max(1, concurrency)
         self.driver = None
+        self.timer = PhaseTimer()
+        
+        # Wiederholungen pro Woche + Abbruch wenn WebUntis nicht erreichbar ist
+        self.retry = retry or retry_policy_from_env()
+        self.breaker = circuit_breaker_from_env()
+        
+        # Optional: Responses für den Replay-Server aufzeichnen (nur Chrome)
+        self.recorder = ResponseRecorder(record_dir) if record_dir else None
+        self._record_mark = 0
+        
+        # Persistentes Browser-Profil (None = Wegwerf-Profil pro Start)
+        self.profile_dir = profile_dir
+        self.profile_max_mb = profile_max_mb
+        
+        # Stundenpläne pro Lauf: None = eigener Plan, sonst {'type', 'id', 'label'}
+        self.entities = entities or [None]
+        self.throughput = None
+        
+        # Gestaffelte Aktualisierung (refresh_policy.py), None = jede Woche jeden Lauf
+        self.refresh = refresh
+        
+        # 'dom' = Lesson-Cards aus dem DOM, 'api' = Timetable-JSON aus dem Netzwerk-Log,
+        # 'compact' = ein Record pro Lesson-Card (im Browser vorverarbeitet)
+        self.extract_mode = extract_mode
+        self.localstorage_keys = list(localstorage_keys or [])
+        self.api_capture = False
+        self.netlog = None
+        self.timetable_state = None  # Ergebnis von wait_for_timetable der letzten Woche
+        
+        # Optional: Bilder/Fonts/Analytics blockieren (resource_filter.py)
+        self.resource_filter = resource_filter
+        
+        # Pro Schule gelernte Login-Selektoren (login_selectors.json)
+        self.login_selectors = LoginSelectorCache()
+        
+        # Debug-Screenshots nach Policy (Standard: nur bei Fehlern)
+        self.debug = debug or DebugRecorder()
+        self._net_mark = 0
+        
+        # Verschlüsselte Session-Datei (Key: eigener Key oder das Passwort)
+        self.session_store = None
+        if reuse_session:
+            self.session_store = SessionStore(school_name, username, session_key or password)
     
     def setup_driver(self):
         """Setup Chrome/Chromium/Firefox Driver"""
+        # Zuletzt gefundenen Browser direkt starten (keine Suche, kein Driver-Lookup)
+        state = load_browser_state()
+        if state.get('browser'):
+            try:
+                self._start_browser(state['browser'], state.get('binary'), state.get('driver'))
+                print(f"✓ {state['browser'].capitalize()} gestartet (gemerkt: {state.get('binary') or 'default'})")
+                return
+            except ProfileInUseError as e:
+                # Kein anderer Browser hilft - nicht still auf Suche/Firefox ausweichen
+                print(f"❌ {e}")
+                raise
+            except Exception as e:
+                print(f"⚠ Gemerkter Browser startet nicht mehr ({e}) - suche neu")
+        
         # Versuche zuerst Chrome/Chromium
         try:
-            options = Options()
-            
-            if self.headless:
-                options.add_argument('--headless')
-            
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-gpu')
-            
             # Versuche verschiedene Chrome/Chromium Pfade
             chrome_paths = [
                 '/usr/bin/google-chrome',
@@ -51,38 +176,38 @@ class UntisAutoExtractor:
             for chrome_path in chrome_paths:
                 try:
                     if os.path.exists(chrome_path):
-                        options.binary_location = chrome_path
-                        self.driver = webdriver.Chrome(options=options)
+                        self._start_browser('chrome', chrome_path)
                         print(f"✓ Chrome gefunden: {chrome_path}")
+                        self._remember_browser('chrome', chrome_path)
                         return
+                except ProfileInUseError:
+                    raise
                 except Exception as e:
                     continue
             
             # Versuche ohne expliziten Pfad
-            self.driver = webdriver.Chrome(options=options)
+            self._start_browser('chrome')
             print("✓ Chrome gefunden (default)")
+            self._remember_browser('chrome', None)
             return
             
+        except ProfileInUseError as e:
+            print(f"❌ {e}")
+            raise
         except Exception as chrome_error:
             print(f"⚠ Chrome nicht verfügbar: {chrome_error}")
             print("Versuche Firefox...")
         
         # Fallback: Firefox
         try:
-            from selenium.webdriver.firefox.options import Options as FirefoxOptions
-            from selenium.webdriver.firefox.service import Service as FirefoxService
-            
-            firefox_options = FirefoxOptions()
-            
-            if self.headless:
-                firefox_options.add_argument('--headless')
-            
-            firefox_options.add_argument('--no-sandbox')
-            
-            self.driver = webdriver.Firefox(options=firefox_options)
+            self._start_browser('firefox')
             print("✓ Firefox gefunden")
+            self._remember_browser('firefox', None)
             return
             
+        except ProfileInUseError as e:
+            print(f"❌ {e}")
+            raise
         except Exception as firefox_error:
             print(f"❌ Firefox nicht verfügbar: {firefox_error}")
         
@@ -106,69 +231,134 @@ class UntisAutoExtractor:
         
         raise Exception("Kein Browser installiert")
     
+    def _start_browser(self, browser, binary=None, driver_path=None):
+        """Startet Chrome oder Firefox (optional mit bekanntem Binary/Driver und persistentem Profil)"""
+        profile_dir = None
+        if self.profile_dir:
+            profile_dir = prepare_profile(self.profile_dir, browser, self.profile_max_mb)
+        
+        if browser == 'chrome':
+            options = Options()
+            
+            if self.headless:
+                options.add_argument('--headless')
+            
+            options.add_argument('--no-sandbox')
+            options.add_argument('--disable-dev-shm-usage')
+            options.add_argument('--disable-blink-features=AutomationControlled')
+            options.add_argument('--disable-gpu')
+            
+            # Hintergrund-Tabs nicht drosseln (parallele Wochen)
+            options.add_argument('--disable-background-timer-throttling')
+            options.add_argument('--disable-renderer-backgrounding')
+            options.add_argument('--disable-backgrounding-occluded-windows')
+            
+            # Persistentes Profil: SPA-Bundles kommen aus dem HTTP-Cache
+            if profile_dir:
+                options.add_argument(f'--user-data-dir={profile_dir}')
+            
+            # Netzwerk-Events für den API-Modus / Ressourcen-Statistik mitschneiden
+            if self.extract_mode == 'api' or self.resource_filter or self.recorder:
+                enable_performance_log(options)
+            
+            if binary:
+                options.binary_location = binary
+            
+            service = Service(executable_path=driver_path) if driver_path else None
+            self.driver = webdriver.Chrome(options=options, service=service)
+            return
+        
+        from selenium.webdriver.firefox.options import Options as FirefoxOptions
+        from selenium.webdriver.firefox.service import Service as FirefoxService
+        
+        firefox_options = FirefoxOptions()
+        
+        if self.headless:
+            firefox_options.add_argument('--headless')
+        
+        firefox_options.add_argument('--no-sandbox')
+        
+        if profile_dir:
+            firefox_options.add_argument('-profile')
+            firefox_options.add_argument(profile_dir)
+        
+        if self.resource_filter:
+            self.resource_filter.apply_firefox(firefox_options)
+        
+        if binary:
+            firefox_options.binary_location = binary
+        
+        service = FirefoxService(executable_path=driver_path) if driver_path else None
+        self.driver = webdriver.Firefox(options=firefox_options, service=service)
+    
+    def _remember_browser(self, browser, binary):
+        """Merkt sich Browser, Binary und Driver-Pfad für den nächsten Start"""
+        state = load_browser_state()
+        state.update({
+            'browser': browser,
+            'binary': binary,
+            'driver': getattr(getattr(self.driver, 'service', None), 'path', None),
+        })
+        save_browser_state(state)
+    
     def login(self):
         """Login zu WebUntis"""
+        with self.timer.phase('login'):
+            self._login()
+    
+    def _login(self):
         print("🌐 Öffne WebUntis Login...")
+        login_started = time.perf_counter()
         
         # URL mit + für Leerzeichen (wie WebUntis es erwartet)
         school_encoded = self.school_name.replace(' ', '+')
         
         # Die korrekte URL-Struktur
-        login_url = f'https://ajax.webuntis.com/WebUntis/?school={school_encoded}#/basic/login'
+        login_url = f'{self.base_url}/WebUntis/?school={school_encoded}#/basic/login'
         
         print(f"📍 URL: {login_url}")
-        self.driver.get(login_url)
+        with self.timer.phase('login_page_load'):
+            self.driver.get(login_url)
         
-        # Warte bis JavaScript geladen (SPA)
+        # Warte bis JavaScript geladen (SPA gemountet)
         print("⏳ Warte auf App (JavaScript lädt)...")
-        time.sleep(10)  # SPA braucht Zeit
+        with self.timer.phase('spa_mount'):
+            try:
+                wait_for_spa(self.driver)
+            except Exception:
+                print("  ⚠️ SPA nicht rechtzeitig gemountet - versuche trotzdem weiter")
         
         # Prüfe aktuelle URL
         current_url = self.driver.current_url
         print(f"📍 Aktuelle URL: {current_url}")
         
-        # Debug Screenshot
-        try:
-            os.makedirs('debug', exist_ok=True)
-            self.driver.save_screenshot('debug/1_login_page.png')
-            print("📸 Screenshot: debug/1_login_page.png")
-        except:
-            pass
+        self.debug.checkpoint(self.driver, '1_login_page')
         
         # Wenn zu webuntis.com umgeleitet (school not found)
-        if 'webuntis.com' in current_url and 'ajax.webuntis.com' not in current_url:
+        if 'webuntis.com' in current_url and urlparse(self.base_url).netloc not in current_url:
             print("❌ Wurde zu webuntis.com umgeleitet - Schule nicht gefunden!")
             print("📍 Current URL:", current_url)
-            self.driver.save_screenshot('debug/error_redirect.png')
+            self.debug.failure(self.driver, 'error_redirect')
             raise Exception(f"Schule '{self.school_name}' nicht gefunden. Prüfe Schulnamen!")
         
-        # Username eingeben
-        print("👤 Suche Username-Feld...")
-        username_selectors = [
-            'input#username',
-            'input[name="username"]',
-            'input[data-testid*="username"]',
-            'input[placeholder*="Benutzername"]',
-            'input[placeholder*="Username"]',
-            'input[type="text"]',
-        ]
-        
-        username_input = None
-        for selector in username_selectors:
+        # Warte auf das Login-Formular
+        with self.timer.phase('login_form'):
             try:
-                username_input = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                )
-                print(f"  ✓ Username-Feld gefunden: {selector}")
-                break
-            except:
-                continue
+                wait_for_login_form(self.driver)
+            except Exception:
+                print("  ⚠️ Login-Formular nicht rechtzeitig gefunden")
         
-        if not username_input:
+        # Alle Formular-Felder in einem Roundtrip (gelernte Selektoren zuerst)
+        cached = self.login_selectors.is_cached(self.school_name)
+        print(f"👤 Suche Login-Formular{' (gelernte Selektoren)' if cached else ''}...")
+        with self.timer.phase('login_fields'):
+            form = resolve_login_form(self.driver, self.login_selectors.ordered(self.school_name))
+        
+        if not form['username']:
             print("\n❌ Username-Feld nicht gefunden!")
             print("📄 Current URL:", self.driver.current_url)
             print("📄 Page Title:", self.driver.title)
-            self.driver.save_screenshot('debug/error_no_username.png')
+            self.debug.failure(self.driver, 'error_no_username')
             
             # Debug: Zeige alle Input-Felder
             inputs = self.driver.find_elements(By.TAG_NAME, 'input')
@@ -185,59 +375,28 @@ class UntisAutoExtractor:
             
             raise Exception("Username-Feld nicht gefunden")
         
-        print("✏️  Gebe Username ein...")
-        username_input.clear()
-        username_input.send_keys(self.username)
-        time.sleep(1)
-        
-        # Password eingeben
-        print("🔑 Suche Password-Feld...")
-        password_selectors = [
-            'input#password',
-            'input[name="password"]',
-            'input[type="password"]',
-            'input[data-testid*="password"]',
-        ]
-        
-        password_input = None
-        for selector in password_selectors:
-            try:
-                password_input = self.driver.find_element(By.CSS_SELECTOR, selector)
-                print(f"  ✓ Password-Feld gefunden: {selector}")
-                break
-            except:
-                continue
-        
-        if not password_input:
+        if not form['password']:
+            self.debug.failure(self.driver, 'error_no_password')
             raise Exception("Password-Feld nicht gefunden")
         
-        print("✏️  Gebe Password ein...")
+        username_input, username_selector = form['username']
+        password_input, password_selector = form['password']
+        login_button, login_selector = form['submit'] or (None, None)
+        print(f"  ✓ Username-Feld: {username_selector}")
+        print(f"  ✓ Password-Feld: {password_selector}")
+        if login_button:
+            print(f"  ✓ Login-Button: {login_selector}")
+        
+        print("✏️  Gebe Username und Password ein...")
+        username_input.clear()
+        username_input.send_keys(self.username)
         password_input.clear()
         password_input.send_keys(self.password)
-        time.sleep(1)
-        
-        self.driver.save_screenshot('debug/2_before_login.png')
-        print("📸 Screenshot: debug/2_before_login.png")
-        
-        # Login Button klicken
-        print("🔓 Suche Login-Button...")
-        login_selectors = [
-            'button[type="submit"]',
-            'button#login',
-            'button[data-testid*="login"]',
-            'button[data-testid*="submit"]',
-            'input[type="submit"]',
-            '.login-button',
-        ]
-        
-        login_button = None
-        for selector in login_selectors:
-            try:
-                login_button = self.driver.find_element(By.CSS_SELECTOR, selector)
-                print(f"  ✓ Login-Button gefunden: {selector}")
-                break
-            except:
-                continue
+        
+        self.debug.checkpoint(self.driver, '2_before_login')
+        
+        url_before_submit = self.driver.current_url
+        errors_before_submit = login_error_texts(self.driver)
         
         if login_button:
             print("🖱️  Klicke Login-Button...")
@@ -247,12 +406,14 @@ class UntisAutoExtractor:
             print("  ⚠️ Kein Login-Button gefunden, drücke Enter...")
             password_input.send_keys('\n')
         
-        # Warte bis eingeloggt (URL ändert sich)
+        # Warte bis eingeloggt (URL ändert sich) oder Fehlermeldung erscheint
         print("⏳ Warte auf Login-Response...")
-        time.sleep(10)
+        with self.timer.phase('login_submit'):
+            login_result = wait_for_login_result(self.driver, url_before_submit,
+                                                 known_errors=errors_before_submit)
+        print(f"   Login-Response: {login_result}")
         
-        self.driver.save_screenshot('debug/3_after_login.png')
-        print("📸 Screenshot: debug/3_after_login.png")
+        self.debug.checkpoint(self.driver, '3_after_login')
         
         # Prüfe ob eingeloggt
         current_url = self.driver.current_url
@@ -264,7 +425,7 @@ class UntisAutoExtractor:
             print("   - Falsches Password")
             print("   - Falscher Username")
             print("   - Login-Button nicht geklickt")
-            print("📸 Siehe: debug/3_after_login.png")
+            self.debug.failure(self.driver, 'error_login_failed')
             
             # Zeige Fehlermeldungen falls vorhanden
             try:
@@ -287,13 +448,81 @@ class UntisAutoExtractor:
             raise Exception("Schule nicht gefunden nach Login")
         
         else:
-            print("✅ Login erfolgreich!")
+            # Funktionierende Selektoren für den nächsten Login merken
+            self.login_selectors.remember(self.school_name, {
+                'username': username_selector,
+                'password': password_selector,
+                'submit': login_selector,
+            })
+            print(f"✅ Login erfolgreich! ({time.perf_counter() - login_started:.1f}s)")
             print(f"📍 Eingeloggt auf: {current_url}")
+    
+    def restore_session(self):
+        """Stellt eine gespeicherte Session wieder her - True wenn sie noch gültig ist"""
+        if not self.session_store:
+            return False
+        
+        payload = self.session_store.load()
+        if not payload:
+            return False
+        
+        print(f"🔁 Stelle gespeicherte Session wieder her (vom {payload['saved_at'][:16]})...")
+        
+        with self.timer.phase('session_restore'):
+            # Cookies/localStorage können nur auf der eigenen Domain gesetzt werden
+            self.driver.get(f'{self.base_url}/robots.txt')
+            
+            for cookie in payload['cookies']:
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception:
+                    continue
             
-        time.sleep(2)
+            self.driver.execute_script(
+                "for (const [k, v] of Object.entries(arguments[0])) localStorage.setItem(k, v);",
+                payload.get('localStorage', {})
+            )
+            
+            # Eine günstige Navigation zur Validierung
+            monday = datetime.now() - timedelta(days=datetime.now().weekday())
+            self.driver.get(f"{self.base_url}/timetable/my-student?date={monday.strftime('%Y-%m-%d')}")
+            try:
+                wait_for_spa(self.driver)
+            except Exception:
+                pass
+            current_url = self.driver.current_url
+        
+        if 'login' in current_url.lower():
+            print("   ⚠️ Session abgelaufen - normaler Login nötig")
+            self.session_store.clear()
+            self.driver.delete_all_cookies()
+            return False
+        
+        print("   ✓ Session gültig - Login übersprungen")
+        return True
     
-    def navigate_to_week(self, week_offset=0):
-        """Navigiere zu einer bestimmten Woche"""
+    def save_session(self):
+        """Speichert Cookies + localStorage der aktuellen Session verschlüsselt"""
+        if not self.session_store:
+            return
+        
+        try:
+            cookies = self.driver.get_cookies()
+            local_storage = self.driver.execute_script("""
+                const data = {};
+                for (let i = 0; i < localStorage.length; i++) {
+                    const key = localStorage.key(i);
+                    data[key] = localStorage.getItem(key);
+                }
+                return data;
+            """)
+            self.session_store.save(cookies, local_storage)
+            print(f"🔐 Session gespeichert ({len(cookies)} Cookies)")
+        except Exception as e:
+            print(f"⚠ Session konnte nicht gespeichert werden: {e}")
+    
+    def week_url(self, week_offset=0, entity=None):
+        """Montag (YYYY-MM-DD) und Stundenplan-URL einer Woche (eigener Plan oder Entity)"""
         # Berechne das Datum des MONTAGS der Zielwoche
         # Finde zuerst den Montag der aktuellen Woche
         today = datetime.now()
@@ -304,28 +533,52 @@ class UntisAutoExtractor:
         target_monday = current_monday + timedelta(weeks=week_offset)
         date_str = target_monday.strftime('%Y-%m-%d')
         
-        # Gehe direkt zur URL mit Datum (Montag der Woche)
-        url = f'https://ajax.webuntis.com/timetable/my-student?date={date_str}'
+        # Klassen/Lehrer/Räume haben eine eigene Route mit Element-ID
+        if entity:
+            return date_str, f"{self.base_url}/timetable/{entity['type']}?date={date_str}&entityId={entity['id']}"
+        
+        # Direkte URL mit Datum (Montag der Woche)
+        return date_str, f'{self.base_url}/timetable/my-student?date={date_str}'
+    
+    def navigate_to_week(self, week_offset=0, entity=None):
+        """Navigiere zu einer bestimmten Woche"""
+        date_str, url = self.week_url(week_offset, entity)
+        
         print(f"📅 Navigiere zu Woche {week_offset+1}: {date_str} (Montag)")
-        self.driver.get(url)
+        if self.netlog:
+            self._net_mark = self.netlog.mark()
+        with self.timer.phase('navigate'):
+            self.driver.get(url)
         
-        # Warte bis Stundenplan geladen (länger für dynamisches Laden)
+        # Warte bis Stundenplan gerendert (Lesson-Cards stabil oder leere Woche)
         print("   ⏳ Warte auf Stundenplan...")
-        time.sleep(8)  # Erhöht von 5 auf 8 Sekunden
+        with self.timer.phase('timetable_render'):
+            state = wait_for_timetable(self.driver)
+        self.timetable_state = state
         
-        # Zusätzlich: Warte bis lesson-card Elemente sichtbar sind
-        try:
-            WebDriverWait(self.driver, 10).until(
-                lambda d: len(d.find_elements(By.CSS_SELECTOR, 'div[class*="lesson-card"]')) > 0
-            )
+        self.check_logged_in()
+        
+        if state == 'lessons':
             print("   ✓ Stundenplan geladen")
-        except:
-            print("   ⚠️ Keine lesson-cards gefunden (möglicherweise leere Woche)")
+        elif state == 'empty':
+            print("   ⚠️ Keine lesson-cards gefunden (leere Woche)")
+        else:
+            print("   ⚠️ Stundenplan nicht rechtzeitig geladen (Timeout)")
         
         return date_str
     
+    def check_logged_in(self):
+        """Bricht ab wenn WebUntis auf die Login-Seite umgeleitet hat (Session abgelaufen)"""
+        if 'login' in self.driver.current_url.lower():
+            raise Exception("Session abgelaufen - auf Login-Seite umgeleitet")
+    
     def extract_data(self):
         """Extrahiere Stundenplan-Daten"""
+        if self.api_capture:
+            return self.extract_api_data()
+        if self.extract_mode == 'compact':
+            return self.extract_compact_data()
+        
         print("🔍 Extrahiere Daten...")
         
         # JavaScript zum Extrahieren
@@ -358,7 +611,8 @@ class UntisAutoExtractor:
         return data;
         """
         
-        data = self.driver.execute_script(js_code)
+        with self.timer.phase('extract'):
+            data = self.driver.execute_script(js_code)
         
         lesson_count = len(data['timetable']['lessons'])
         
@@ -369,53 +623,360 @@ class UntisAutoExtractor:
         
         return data
     
-    def extract_multiple_weeks(self, num_weeks=4):
-        """Extrahiere mehrere Wochen"""
+    def extract_api_data(self):
+        """Extrahiere die Timetable-JSON-Responses der SPA aus dem Netzwerk-Log"""
+        print("🔍 Extrahiere Timetable-JSON aus dem Netzwerk-Log...")
+        
+        with self.timer.phase('extract'):
+            # Response kann kurz nach dem Rendern noch nicht fertig geladen sein
+            deadline = time.monotonic() + 3
+            while True:
+                responses = self.netlog.json_responses(self._net_mark)
+                if responses or time.monotonic() > deadline:
+                    break
+                time.sleep(0.2)
+        
+        if not responses:
+            raise Exception("Keine Timetable-Responses im Netzwerk-Log gefunden")
+        
+        print(f"✓ {len(responses)} Timetable-Response(s) mitgeschnitten")
+        
+        return {
+            'format': 'api',
+            'timetable': {
+                'url': self.driver.current_url,
+                'responses': responses
+            }
+        }
+    
+    def extract_compact_data(self):
+        """Extrahiere einen kompakten Record pro Lesson-Card (Zeiten, Fach, Lehrer, Räume, Notiz, Tag)"""
+        print("🔍 Extrahiere Lessons (kompakt)...")
+        
+        with self.timer.phase('extract'):
+            lessons, local_storage = self.driver.execute_script(COMPACT_EXTRACT_JS, self.localstorage_keys)
+        
+        data = {
+            'format': 'compact',
+            'localStorage': local_storage,
+            'timetable': {
+                'url': self.driver.current_url,
+                'lessons': lessons
+            }
+        }
+        
+        size_kb = len(json.dumps(data, ensure_ascii=False).encode('utf-8')) / 1024
+        if not lessons:
+            print(f"⚠️  0 Lessons gefunden - möglicherweise Ferien oder kein Stundenplan")
+        else:
+            print(f"✓ {len(lessons)} Lessons gefunden ({size_kb:.1f} KB)")
+        
+        return data
+    
+    def extract_multiple_weeks(self, num_weeks=4, plan=None):
+        """Extrahiere mehrere Wochen für alle konfigurierten Entities (plan: schon geplante Jobs)"""
+        plan = plan or WeekPlan(self.entities, num_weeks, self.refresh)
+        jobs = plan.due
+        started = time.monotonic()
+        self.breaker.reset()
+        
+        if self.concurrency > 1 and len(jobs) > 1 and self.api_capture:
+            print("⚠ Parallele Tabs im API-Modus nicht möglich - extrahiere sequentiell")
+        elif self.concurrency > 1 and len(jobs) > 1 and self.recording:
+            print("⚠ Parallele Tabs beim Aufzeichnen nicht möglich - extrahiere sequentiell")
+        if self.concurrency > 1 and len(jobs) > 1 and not (self.api_capture or self.recording):
+            files = self.extract_weeks_parallel(jobs)
+        else:
+            files = self.extract_weeks_sequential(jobs) if jobs else []
+        
+        files = plan.finish(files, time.monotonic() - started)
+        self.throughput = plan.throughput
+        return files
+    
+    def extract_weeks_sequential(self, jobs):
+        """Extrahiere (Entity, Woche)-Jobs nacheinander im aktuellen Tab"""
         print(f"\n{'='*60}")
-        print(f"📊 Extrahiere {num_weeks} Wochen")
+        print(f"📊 Extrahiere {len(jobs)} Wochen")
         print(f"{'='*60}\n")
         
         all_data = []
         
-        for week in range(num_weeks):
+        for i, (entity, week) in enumerate(jobs):
+            label = job_label(entity, week)
+            print(f"\n--- {label} ({i+1}/{len(jobs)}) ---")
             try:
-                print(f"\n--- Woche {week+1}/{num_weeks} ---")
-                
-                # Navigiere zur Woche
-                date_str = self.navigate_to_week(week)
-                
-                # Extrahiere Daten
-                data = self.extract_data()
-                
-                # Speichere
-                filename = f'weekly_data/week_{week+1}.json'
-                os.makedirs('weekly_data', exist_ok=True)
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                
-                print(f"💾 Gespeichert: {filename}")
+                filename = self.with_retry(label, lambda: self.extract_week(entity, week))
                 all_data.append(filename)
-                
-                # Pause zwischen Wochen
-                time.sleep(2)
-                
+            except CircuitOpenError as e:
+                print(f"⛔ Abbruch: {e}")
+                break
             except Exception as e:
-                print(f"❌ Fehler bei Woche {week+1}: {e}")
+                print(f"❌ Fehler bei {label}: {e}")
+                self.debug.failure(self.driver, f'error_{job_slug(entity, week)}')
         
         return all_data
     
-    def run(self, num_weeks=4):
-        """Hauptausführung"""
+    def extract_week(self, entity, week):
+        """Eine Woche navigieren, extrahieren und speichern - gibt den Dateinamen zurück"""
+        # Navigiere zur Woche
+        self.navigate_to_week(week, entity)
+        
+        # Extrahiere Daten
+        data = self.extract_data()
+        
+        # Speichere
+        filename = week_file_path(week + 1, entity)
+        save_week_file(filename, data, complete=self.timetable_state != 'timeout')
+        if self.refresh:
+            self.refresh.record(entity, week, data)
+        
+        print(f"💾 Gespeichert: {filename}")
+        self.record_traffic()
+        return filename
+    
+    def with_retry(self, label, action):
+        """Führt action mit Backoff-Wiederholungen aus (Circuit-Breaker bricht früh ab)"""
+        for attempt in range(self.retry.retries + 1):
+            self.breaker.check()
+            try:
+                result = action()
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                self.breaker.record_failure()
+                if attempt >= self.retry.retries or self.breaker.is_open:
+                    raise
+                print(f"   ⚠️ {label} fehlgeschlagen: {e}")
+                self.recover_session()
+                delay = self.retry.delay(attempt)
+                print(f"   🔁 Versuch {attempt+2}/{self.retry.retries+1} in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def session_alive(self):
+        """
+        Prüft die WebUntis-Session mit einem Token-Request aus der Seite
+        
+        Returns: True (gültig), False (abgelaufen) oder None (unklar, z.B. Server-Fehler)
+        """
+        try:
+            if 'login' in self.driver.current_url.lower():
+                return False
+            status = self.driver.execute_async_script("""
+                const done = arguments[arguments.length - 1];
+                fetch('/WebUntis/api/token/new', {credentials: 'include'})
+                    .then(r => done(r.status)).catch(() => done(0));
+            """)
+        except Exception:
+            return None
+        if status == 200:
+            return True
+        if status in (401, 403):
+            return False
+        return None
+    
+    def recover_session(self):
+        """Loggt nur neu ein wenn die Session wirklich abgelaufen ist"""
+        if self.session_alive() is not False:
+            return
+        print("   🔐 Session abgelaufen - neuer Login")
         try:
+            self.login()
+            self.save_session()
+        except Exception as e:
+            print(f"   ❌ Neuer Login fehlgeschlagen: {e}")
+            self.breaker.record_failure()
+    
+    def extract_weeks_parallel(self, jobs):
+        """
+        Extrahiere (Entity, Woche)-Jobs parallel in Browser-Tabs
+        
+        Es laden immer bis zu self.concurrency Tabs gleichzeitig (gleiche
+        eingeloggte Session). Die Tabs werden reihum geprüft und jede Woche
+        wird gespeichert sobald ihr Stundenplan fertig gerendert ist.
+        Fehlgeschlagene Wochen kommen mit Backoff zurück in die Warteschlange.
+        """
+        print(f"\n{'='*60}")
+        print(f"📊 Extrahiere {len(jobs)} Wochen ({self.concurrency} Tabs parallel)")
+        print(f"{'='*60}\n")
+        
+        saved = {}  # job-index -> Datei
+        attempts = {}  # job-index -> Anzahl Fehlversuche
+        main_handle = self.driver.current_window_handle
+        pending_jobs = [(index, 0.0) for index in range(len(jobs))]  # (job-index, frühester Start)
+        open_tabs = {}  # handle -> (job-index, readiness, deadline)
+        
+        with self.timer.phase('weeks_parallel'):
+            while pending_jobs or open_tabs:
+                # Freie Slots mit fälligen Wochen füllen (Navigation blockiert nicht)
+                now = time.monotonic()
+                for job in [job for job in pending_jobs if job[1] <= now]:
+                    if len(open_tabs) >= self.concurrency:
+                        break
+                    pending_jobs.remove(job)
+                    index = job[0]
+                    entity, week = jobs[index]
+                    date_str, url = self.week_url(week, entity)
+                    self.driver.switch_to.new_window('tab')
+                    self.apply_resource_filter()
+                    self.driver.execute_script("window.location.href = arguments[0];", url)
+                    open_tabs[self.driver.current_window_handle] = (
+                        index, TimetableReadiness(), time.monotonic() + phase_timeout('timetable')
+                    )
+                    print(f"📅 Tab geöffnet für {job_label(entity, week)}: {date_str} (Montag)")
+                
+                # Reihum prüfen welche Tabs fertig sind
+                for handle, (index, readiness, deadline) in list(open_tabs.items()):
+                    self.driver.switch_to.window(handle)
+                    try:
+                        state = readiness.check(self.driver)
+                    except Exception:
+                        state = None  # Seite lädt noch
+                    
+                    if not state and time.monotonic() < deadline:
+                        continue
+                    
+                    entity, week = jobs[index]
+                    label = job_label(entity, week)
+                    failed = False
+                    try:
+                        self.check_logged_in()
+                        if not state:
+                            print(f"   ⚠️ {label}: Stundenplan nicht rechtzeitig geladen (Timeout)")
+                        data = self.extract_data()
+                        filename = week_file_path(week + 1, entity)
+                        save_week_file(filename, data, complete=bool(state))
+                        if self.refresh:
+                            self.refresh.record(entity, week, data)
+                        print(f"💾 Gespeichert: {filename}")
+                        saved[index] = filename
+                        self.breaker.record_success()
+                    except Exception as e:
+                        failed = True
+                        self.breaker.record_failure()
+                        attempts[index] = attempts.get(index, 0) + 1
+                        if attempts[index] > self.retry.retries or self.breaker.is_open:
+                            print(f"❌ Fehler bei {label}: {e}")
+                            self.debug.failure(self.driver, f'error_{job_slug(entity, week)}')
+                        else:
+                            delay = self.retry.delay(attempts[index] - 1)
+                            print(f"   ⚠️ {label} fehlgeschlagen: {e}")
+                            print(f"   🔁 Versuch {attempts[index]+1}/{self.retry.retries+1} in {delay:.1f}s")
+                            pending_jobs.append((index, time.monotonic() + delay))
+                    finally:
+                        self.driver.close()
+                        # Nie auf einem geschlossenen Tab stehen bleiben (new_window braucht ein lebendes Fenster)
+                        self.driver.switch_to.window(main_handle)
+                        del open_tabs[handle]
+                    
+                    if failed and not self.breaker.is_open:
+                        # Session im Haupt-Tab prüfen, nur bei Bedarf neu einloggen
+                        self.driver.switch_to.window(main_handle)
+                        self.recover_session()
+                
+                # WebUntis nicht erreichbar: restliche Tabs schließen und abbrechen
+                if self.breaker.is_open:
+                    print(f"⛔ Abbruch: {self.breaker.consecutive_failures} Fehler in Folge - WebUntis scheint nicht erreichbar")
+                    for handle in open_tabs:
+                        self.driver.switch_to.window(handle)
+                        self.driver.close()
+                    open_tabs.clear()
+                    pending_jobs.clear()
+                
+                if open_tabs or pending_jobs:
+                    time.sleep(POLL_INTERVAL)
+        
+        self.driver.switch_to.window(main_handle)
+        
+        # Reihenfolge wie bei der sequentiellen Extraktion
+        return [saved[index] for index in sorted(saved)]
+    
+    def start(self):
+        """Browser starten und einloggen (gespeicherte Session wenn möglich)"""
+        with self.timer.phase('setup_driver'):
             self.setup_driver()
+        
+        is_chrome = self.driver.name == 'chrome'
+        if is_chrome and (self.extract_mode == 'api' or self.resource_filter or self.recorder):
+            self.netlog = NetworkLog(self.driver)
+            self._record_mark = 0
+        
+        if self.recorder and not is_chrome:
+            print("⚠ Aufzeichnen braucht Chrome (Performance-Log) - keine Aufzeichnung")
+        
+        if self.extract_mode == 'api':
+            self.api_capture = is_chrome
+            if not is_chrome:
+                print("⚠ API-Modus braucht Chrome (Performance-Log) - nutze DOM-Modus")
+        
+        self.apply_resource_filter()
+        
+        # Beim Aufzeichnen alles frisch laden (kein HTTP-Cache, Login immer mit aufzeichnen)
+        if self.recording:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+        
+        # Gespeicherte Session wiederverwenden, Login nur wenn abgelaufen
+        if self.recording or not self.restore_session():
             self.login()
-            
-            # Warte bis auf Stundenplan-Seite
-            time.sleep(3)
+            self.save_session()
+        
+        self.record_traffic()
+    
+    @property
+    def recording(self):
+        """Zeichnet dieser Lauf Responses für den Replay-Server auf?"""
+        return bool(self.recorder and self.netlog)
+    
+    def record_traffic(self):
+        """Schreibt die Responses seit dem letzten Aufruf in die Aufzeichnung (UNTIS_RECORD_DIR)"""
+        if not self.recording:
+            return
+        # Bodies nur im aktuellen Tab und nur solange Chrome sie puffert verfügbar
+        events = self.netlog.since(self._record_mark)
+        self._record_mark += len(events)
+        count = record_network_events(self.recorder, events, self.netlog.response_bytes,
+                                      urlparse(self.base_url).netloc)
+        if count:
+            print(f"   🎞️  {count} Responses aufgezeichnet → {self.recorder.directory}")
+    
+    def apply_resource_filter(self):
+        """Aktiviert die Ressourcen-Blockliste im aktuellen Tab (Chrome)"""
+        if self.resource_filter and self.driver.name == 'chrome':
+            try:
+                self.resource_filter.apply_chrome(self.driver, urlparse(self.base_url).netloc)
+            except Exception as e:
+                print(f"⚠ Ressourcen-Filter nicht aktiv: {e}")
+    
+    def close(self):
+        """Browser beenden"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+        self.netlog = None
+        self.api_capture = False
+    
+    def run(self, num_weeks=4):
+        """Hauptausführung"""
+        files = []
+        started = datetime.now()
+        
+        # Nichts fällig: Browser gar nicht erst starten
+        plan = WeekPlan(self.entities, num_weeks, self.refresh)
+        if not plan.due:
+            print("⏭️  Alle Wochen noch aktuell (Refresh-Intervall) - kein Browser-Start nötig\n")
+            return plan.skipped_files()
+        try:
+            self.start()
             
             # Extrahiere Wochen
-            files = self.extract_multiple_weeks(num_weeks)
+            files = self.extract_multiple_weeks(num_weeks, plan)
+            
+            # Aktualisierte Cookies für den nächsten Lauf sichern
+            if files:
+                self.save_session()
             
             print(f"\n{'='*60}")
             print("✅ FERTIG!")
@@ -429,19 +990,44 @@ class UntisAutoExtractor:
             print(f"\n❌ Fehler: {e}")
             import traceback
             traceback.print_exc()
+            self.debug.failure(self.driver, 'error_run')
         
         finally:
-            if self.driver:
-                self.driver.quit()
-
-def main():
-    """Hauptprogramm"""
-    import sys
-    
-    print("="*60)
-    print("🤖 WebUntis Automatischer Data Extractor")
-    print("="*60 + "\n")
+            self.write_stats(started, files)
+            self.close()
+            self.debug.finish()
+        
+        return files
     
+    def write_stats(self, started, files):
+        """Speichert Laufzeit-Statistiken (Phasen-Dauer) für Vergleiche zwischen Läufen"""
+        extra = {'backend': 'selenium'}
+        self.record_traffic()
+        
+        # Ressourcen-Zähler aus dem Netzwerk-Log (nur Chrome)
+        if self.resource_filter and self.netlog:
+            summary = self.resource_filter.summarize(self.netlog.since(0))
+            self.resource_filter.print_summary(summary)
+            extra['resources'] = summary
+        elif self.resource_filter:
+            # Firefox: keine Zähler, nur was per Pref wirklich blockiert wird
+            extra['resources'] = {'mode': self.resource_filter.mode,
+                                  'blocked_categories': self.resource_filter.active_categories}
+        
+        # Netzwerk-Log nach jedem Lauf leeren - im Daemon wächst es sonst über alle Jobs
+        if self.netlog:
+            self.netlog.clear()
+            self._net_mark = 0
+            self._record_mark = 0
+        
+        if self.throughput:
+            extra['throughput'] = self.throughput
+        extra['failed_attempts'] = self.breaker.total_failures
+        
+        write_run_stats(self.timer, started, files, extra)
+
+def create_extractor_from_env():
+    """Erstellt den Extractor aus den Umgebungsvariablen - gibt (extractor, num_weeks) zurück"""
     # Konfiguration (aus Umgebungsvariablen oder Config-Datei)
     school_name = os.getenv('UNTIS_SCHOOL', 'BSZ GTW')  # Ändere das!
     username = os.getenv('UNTIS_USERNAME', 'HeidriArn')  # Ändere das!
@@ -468,13 +1054,85 @@ def main():
     # Headless Mode (für Server)
     headless = os.getenv('UNTIS_HEADLESS', 'true').lower() == 'true'
     
+    # Backend: selenium (Browser) oder http (ohne Browser)
+    backend = os.getenv('UNTIS_BACKEND', 'selenium').lower()
+    base_url = os.getenv('UNTIS_BASE_URL', 'https://ajax.webuntis.com')
+    
+    # Session-Wiederverwendung zwischen Läufen
+    reuse_session = os.getenv('UNTIS_SESSION_REUSE', 'true').lower() == 'true'
+    session_key = os.getenv('UNTIS_SESSION_KEY') or None
+    
+    # Extraktions-Modus: dom (Lesson-Cards), api (Timetable-JSON) oder compact
+    extract_mode = os.getenv('UNTIS_EXTRACT_MODE', 'dom').lower()
+    localstorage_keys = [k.strip() for k in os.getenv('UNTIS_LOCALSTORAGE_KEYS', '').split(',') if k.strip()]
+    
+    # Anzahl parallel geladener Wochen (Browser-Tabs)
+    concurrency = int(os.getenv('UNTIS_CONCURRENCY', '1'))
+    
+    # Stundenpläne: eigener (Standard) oder Liste von Klassen/Lehrern/Räumen
+    try:
+        entities = parse_entities(os.getenv('UNTIS_ENTITIES', ''))
+    except ValueError as e:
+        print(f"❌ FEHLER: {e}")
+        import sys
+        sys.exit(1)
+    
+    # Gestaffelte Aktualisierung: Minuten zwischen Abrufen pro Wochen-Offset
+    refresh = refresh_policy_from_env()
+    
+    # Persistentes Browser-Profil (HTTP-Cache für die SPA), leer = aus
+    profile_dir = os.getenv('UNTIS_PROFILE_DIR', 'browser_profile') or None
+    profile_max_mb = float(os.getenv('UNTIS_PROFILE_MAX_MB', '300'))
+    
+    # Ressourcen-Filter: off / on / measure
+    resource_filter = resource_filter_from_env()
+    
+    # Debug-Artefakte: off / on-failure / always
+    debug = debug_recorder_from_env()
+    
     print(f"🏫 Schule: {school_name}")
     print(f"👤 Username: {username}")
     print(f"📅 Wochen: {num_weeks}")
-    print(f"🖥️  Headless: {headless}\n")
+    if entities:
+        print(f"🗂️  Stundenpläne: {', '.join(e['label'] if e else 'eigener' for e in entities)}")
+    print(f"🧭 Backend: {backend}")
+    print(f"🖥️  Headless: {headless}")
+    print(f"🗄️  Browser-Profil: {profile_dir or 'aus'}")
+    print(f"🔁 Session-Reuse: {reuse_session}")
+    print(f"🧩 Extraktions-Modus: {extract_mode}")
+    print(f"⚡ Parallele Tabs: {concurrency}")
+    if refresh:
+        print(f"⏭️  Refresh-Intervalle: {', '.join(f'{m:g}' for m in refresh.intervals)} min")
+    else:
+        print("⏭️  Refresh-Intervalle: aus (jede Woche jeden Lauf)")
+    print(f"🚫 Ressourcen-Filter: {resource_filter.mode if resource_filter else 'off'}")
+    print(f"📸 Debug-Artefakte: {debug.policy}\n")
+    
+    if backend == 'http':
+        from http_extractor import UntisHttpExtractor
+        extractor = UntisHttpExtractor(school_name, username, password, base_url=base_url,
+                                       record_dir=os.getenv('UNTIS_RECORD_DIR') or None,
+                                       concurrency=concurrency, entities=entities,
+                                       refresh=refresh)
+    else:
+        extractor = UntisAutoExtractor(school_name, username, password, headless,
+                                       reuse_session=reuse_session, session_key=session_key,
+                                       extract_mode=extract_mode, base_url=base_url,
+                                       concurrency=concurrency, resource_filter=resource_filter,
+                                       debug=debug, entities=entities, refresh=refresh,
+                                       localstorage_keys=localstorage_keys,
+                                       profile_dir=profile_dir, profile_max_mb=profile_max_mb,
+                                       record_dir=os.getenv('UNTIS_RECORD_DIR') or None)
+    
+    return extractor, num_weeks
+
+def main():
+    """Hauptprogramm"""
+    print("="*60)
+    print("🤖 WebUntis Automatischer Data Extractor")
+    print("="*60 + "\n")
     
-    # Extrahiere
-    extractor = UntisAutoExtractor(school_name, username, password, headless)
+    extractor, num_weeks = create_extractor_from_env()
     extractor.run(num_weeks)
 
 if __name__ == "__main__":
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Extractor-Daemon - hält einen eingeloggten Browser warm
+Nimmt Extraktions-Jobs über einen lokalen Unix-Socket an, damit nicht
+jeder Cron-Lauf Browser-Start und Login neu bezahlen muss.
+
+Nutzung:
+    python3 extractor_daemon.py serve      # Daemon starten
+    python3 extractor_daemon.py extract    # Job ausführen (von run_full_sync.sh genutzt)
+    python3 extractor_daemon.py status     # Status anzeigen
+    python3 extractor_daemon.py stop       # Daemon beenden
+"""
+
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+from extractor import UntisAutoExtractor, create_extractor_from_env
+from run_stats import PhaseTimer
+
+SOCKET_PATH = os.getenv('UNTIS_DAEMON_SOCKET', 'extractor.sock')
+
+# Exit-Code des Clients wenn kein Daemon läuft (run_full_sync.sh fällt dann zurück)
+EXIT_NO_DAEMON = 3
+
+
+class Tee(io.TextIOBase):
+    """Schreibt gleichzeitig ins Daemon-Log und in den Job-Puffer"""
+
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+def process_tree_rss_mb(root_pid: int) -> float:
+    """RSS eines Prozesses inkl. aller Kind-Prozesse (Browser-Renderer etc.) aus /proc"""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # Feld 4 = PPID (nach dem Prozessnamen in Klammern)
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            parents.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(parents.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+
+    return total_kb / 1024
+
+
+class ExtractorDaemon:
+    """Verwaltet den warmen Browser und recycelt ihn nach N Jobs oder bei zu viel RAM"""
+
+    def __init__(self, extractor: UntisAutoExtractor, num_weeks: int,
+                 max_jobs: int = 24, max_rss_mb: float = 800):
+        self.extractor = extractor
+        self.num_weeks = num_weeks
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.jobs_since_start = 0
+        self.jobs_total = 0
+        self.browser_starts = 0
+        self.started = datetime.now()
+        self.last_job = None
+
+    def browser_rss_mb(self) -> float:
+        """Speicherverbrauch des Browsers (Driver-Prozess + Kinder)"""
+        service = getattr(self.extractor.driver, 'service', None)
+        process = getattr(service, 'process', None)
+        if not process:
+            return 0.0
+        return process_tree_rss_mb(process.pid)
+
+    def ensure_browser(self):
+        """Startet Browser + Login falls nötig, recycelt ihn wenn Limits erreicht"""
+        if self.extractor.driver:
+            reason = None
+            rss = self.browser_rss_mb()
+            if self.jobs_since_start >= self.max_jobs:
+                reason = f"{self.jobs_since_start} Jobs"
+            elif rss > self.max_rss_mb:
+                reason = f"{rss:.0f} MB RSS"
+            else:
+                try:
+                    self.extractor.driver.current_url  # Browser noch erreichbar?
+                except Exception:
+                    reason = "Browser reagiert nicht"
+
+            if not reason:
+                return
+            print(f"♻️  Recycle Browser ({reason})")
+            self.extractor.close()
+
+        self.extractor.start()
+        self.browser_starts += 1
+        self.jobs_since_start = 0
+
+    def run_job(self, num_weeks: int = None) -> dict:
+        """Führt einen Extraktions-Job aus"""
+        num_weeks = num_weeks or self.num_weeks
+        started = datetime.now()
+        self.extractor.timer = PhaseTimer()
+        files = []
+        error = None
+
+        # Ein Retry mit frischem Browser falls der warme Browser/Session kaputt ist
+        for attempt in range(2):
+            try:
+                self.ensure_browser()
+                files = self.extractor.extract_multiple_weeks(num_weeks)
+                if files:
+                    self.extractor.save_session()
+                    error = None
+                    break
+                error = "Keine Wochen extrahiert"
+            except Exception as e:
+                error = str(e)
+                print(f"❌ Fehler: {e}")
+                self.extractor.debug.failure(self.extractor.driver, 'error_job')
+            self.extractor.close()
+
+        self.jobs_since_start += 1
+        self.jobs_total += 1
+        self.last_job = datetime.now().isoformat()
+        self.extractor.write_stats(started, files)
+        self.extractor.debug.finish()
+
+        return {'ok': bool(files), 'files': files, 'error': error}
+
+    def status(self) -> dict:
+        return {
+            'started': self.started.isoformat(),
+            'browser_running': self.extractor.driver is not None,
+            'browser_rss_mb': round(self.browser_rss_mb(), 1),
+            'browser_starts': self.browser_starts,
+            'jobs_total': self.jobs_total,
+            'jobs_since_browser_start': self.jobs_since_start,
+            'last_job': self.last_job,
+        }
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """Eine JSON-Zeile als Request, eine JSON-Zeile als Antwort"""
+
+    def handle(self):
+        daemon = self.server.daemon_state
+        line = self.rfile.readline()
+        if not line:
+            return  # nur Verbindungstest (daemon_running)
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = {}
+        command = request.get('cmd')
+
+        if command == 'extract':
+            buffer = io.StringIO()
+            with redirect_stdout(Tee(sys.__stdout__, buffer)):
+                result = daemon.run_job(request.get('weeks'))
+            result['log'] = buffer.getvalue()
+        elif command == 'status':
+            result = daemon.status()
+        elif command == 'stop':
+            result = {'ok': True}
+            self.server.stop_requested = True
+        else:
+            result = {'ok': False, 'error': f"Unbekannter Befehl: {command}"}
+
+        self.wfile.write((json.dumps(result) + '\n').encode())
+
+
+def serve():
+    """Startet den Daemon (Jobs laufen nacheinander - es gibt nur einen Browser)"""
+    print("="*60)
+    print("🤖 WebUntis Extractor-Daemon")
+    print("="*60 + "\n")
+
+    if daemon_running():
+        print(f"❌ Auf {SOCKET_PATH} läuft bereits ein Daemon")
+        return 1
+
+    extractor, num_weeks = create_extractor_from_env()
+    if not isinstance(extractor, UntisAutoExtractor):
+        print("❌ Der Daemon ist nur für das Selenium-Backend sinnvoll")
+        return 1
+
+    # Eigenes Profil: direkte Läufe (z.B. Fallback in run_full_sync.sh) laufen parallel
+    # und würden sonst am Profil-Lock des Daemon-Browsers scheitern
+    if extractor.profile_dir:
+        extractor.profile_dir = os.path.join(extractor.profile_dir, 'daemon')
+
+    daemon = ExtractorDaemon(
+        extractor, num_weeks,
+        max_jobs=int(os.getenv('UNTIS_DAEMON_MAX_JOBS', '24')),
+        max_rss_mb=float(os.getenv('UNTIS_DAEMON_MAX_RSS_MB', '800')),
+    )
+
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH)  # verwaist (Daemon abgestürzt)
+
+    # Socket direkt mit 0600 anlegen (kein Zeitfenster bis zu einem chmod)
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(SOCKET_PATH, JobHandler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_state = daemon
+    server.stop_requested = False
+
+    print(f"🔌 Socket: {SOCKET_PATH}")
+    print(f"♻️  Recycle nach {daemon.max_jobs} Jobs oder {daemon.max_rss_mb:.0f} MB RSS\n")
+
+    try:
+        # Browser direkt vorwärmen
+        daemon.ensure_browser()
+    except Exception as e:
+        print(f"⚠ Browser-Start fehlgeschlagen, neuer Versuch beim ersten Job: {e}")
+        extractor.close()
+
+    try:
+        while not server.stop_requested:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        extractor.close()
+        server.server_close()
+        os.remove(SOCKET_PATH)
+        print("\n✋ Daemon beendet")
+
+    return 0
+
+
+def daemon_running() -> bool:
+    """True wenn auf SOCKET_PATH ein Daemon Verbindungen annimmt (auch während eines Jobs)"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with client:
+        try:
+            client.connect(SOCKET_PATH)
+            return True
+        except OSError:
+            return False
+
+
+def send_command(request: dict, timeout: float = 900):
+    """Schickt einen Befehl an den Daemon - None wenn keiner läuft"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(SOCKET_PATH)
+    except OSError:
+        return None
+
+    with client:
+        client.sendall((json.dumps(request) + '\n').encode())
+        response = b''
+        while not response.endswith(b'\n'):
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+
+    return json.loads(response)
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+
+    if command == 'serve':
+        return serve()
+
+    if command == 'extract':
+        result = send_command({'cmd': 'extract'})
+        if result is None:
+            print("⚠ Kein Extractor-Daemon erreichbar")
+            return EXIT_NO_DAEMON
+        print(result.get('log', ''), end='')
+        if not result.get('ok'):
+            print(f"❌ Daemon-Job fehlgeschlagen: {result.get('error')}")
+            return 1
+        print(f"✅ Daemon-Job: {len(result['files'])} Wochen extrahiert")
+        return 0
+
+    if command in ('status', 'stop'):
+        result = send_command({'cmd': command}, timeout=30)
+        if result is None:
+            print("⚠ Kein Extractor-Daemon erreichbar")
+            return EXIT_NO_DAEMON
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Browserloser WebUntis Extractor
+Loggt sich per HTTP ein und holt den Stundenplan direkt von den JSON-Endpoints.
+Schreibt dieselben weekly_data/week_N.json Dateien (API-Format) wie der Selenium-Extractor.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from run_stats import PhaseTimer, write_run_stats
+from recording import ResponseRecorder
+from resilience import CircuitOpenError, retry_policy_from_env, circuit_breaker_from_env
+from week_files import (week_file_path, save_week_file, job_label, ENTITY_TYPES,
+                        WeekPlan)
+
+TIMETABLE_ENTRIES_PATH = '/WebUntis/api/rest/view/v1/timetable/entries'
+
+
+class UntisHttpExtractor:
+    """WebUntis Extractor ohne Browser (requests Session mit Connection-Pool)"""
+
+    def __init__(self, school_name, username, password,
+                 base_url='https://ajax.webuntis.com', record_dir=None, timeout=20,
+                 concurrency=1, entities=None, refresh=None, retry=None):
+        self.school_name = school_name
+        self.username = username
+        self.password = password
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.timer = PhaseTimer()
+        
+        # Stundenpläne pro Lauf: None = eigener Plan, sonst {'type', 'id', 'label'}
+        self.entities = entities or [None]
+        self.throughput = None
+
+        # Gestaffelte Aktualisierung (refresh_policy.py), None = jede Woche jeden Lauf
+        self.refresh = refresh
+
+        # Wiederholungen pro Woche + Abbruch wenn WebUntis nicht erreichbar ist
+        self.retry = retry or retry_policy_from_env()
+        self.breaker = circuit_breaker_from_env()
+        self._login_lock = threading.Lock()
+
+        # Eine Session für alle Requests - Keep-Alive statt neuer TLS-Handshakes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(4, self.concurrency))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (untis-calendar-sync)'
+
+        # Optional: Responses für den Replay-Server aufzeichnen
+        self.recorder = ResponseRecorder(record_dir) if record_dir else None
+
+        self.person_id = None
+        self.resource_type = 'STUDENT'
+
+    def _request(self, method, path, **kwargs):
+        """Request relativ zur Base-URL (wird bei Bedarf aufgezeichnet)"""
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        if self.recorder:
+            self.recorder.record(method, response.url, response.status_code,
+                                 response.headers.get('Content-Type'), response.content)
+        return response
+
+    def login(self):
+        """Login zu WebUntis per Formular-POST, danach Bearer-Token für die REST-API"""
+        print("🌐 Login zu WebUntis (HTTP)...")
+
+        with self.timer.phase('login'):
+            # Session-Cookie + Schule setzen
+            self._request('GET', '/WebUntis/', params={'school': self.school_name})
+
+            response = self._request('POST', '/WebUntis/j_spring_security_check', data={
+                'school': self.school_name,
+                'j_username': self.username,
+                'j_password': self.password,
+                'token': '',
+            }, headers={'Accept': 'application/json'})
+
+            try:
+                result = response.json()
+            except ValueError:
+                result = {}
+
+            if response.status_code != 200 or result.get('loginError') or result.get('state') == 'FAILURE':
+                raise Exception(f"Login fehlgeschlagen: {result.get('loginError') or response.status_code}")
+
+            # JWT für die REST-API
+            response = self._request('GET', '/WebUntis/api/token/new')
+            token = response.text.strip()
+            if response.status_code != 200 or not token:
+                raise Exception("Login fehlgeschlagen - kein API-Token erhalten")
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+            # Eigene Person-ID (für MY_TIMETABLE)
+            response = self._request('GET', '/WebUntis/api/rest/view/v1/app/data')
+            response.raise_for_status()
+            app_data = response.json()
+
+        person = (app_data.get('user') or {}).get('person') or {}
+        self.person_id = person.get('id')
+        if not self.person_id:
+            raise Exception("Person-ID nicht in app/data gefunden")
+
+        tenant_id = (app_data.get('tenant') or {}).get('id')
+        if tenant_id:
+            self.session.headers['Tenant-Id'] = str(tenant_id)
+
+        print(f"✅ Login erfolgreich (Person-ID {self.person_id})")
+
+    def fetch_week(self, week_offset=0, entity=None):
+        """Holt eine Woche - gibt (Montag, Wochen-Daten im API-Format) zurück"""
+        today = datetime.now()
+        monday = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
+        date_str = monday.strftime('%Y-%m-%d')
+        sunday_str = (monday + timedelta(days=6)).strftime('%Y-%m-%d')
+
+        print(f"📅 Hole {job_label(entity, week_offset)}: {date_str} (Montag)")
+
+        # Eigener Plan über die Person-ID, Klassen/Lehrer/Räume über ihre Element-ID
+        if entity:
+            resource_type, resource_id, timetable_type = ENTITY_TYPES[entity['type']], entity['id'], 'STANDARD'
+            page_url = f"{self.base_url}/timetable/{entity['type']}?date={date_str}&entityId={entity['id']}"
+        else:
+            resource_type, resource_id, timetable_type = self.resource_type, self.person_id, 'MY_TIMETABLE'
+            page_url = f'{self.base_url}/timetable/my-student?date={date_str}'
+
+        with self.timer.phase('fetch_week'):
+            response = self._request('GET', TIMETABLE_ENTRIES_PATH, params={
+                'start': date_str,
+                'end': sunday_str,
+                'format': 4,
+                'resourceType': resource_type,
+                'resources': resource_id,
+                'periodTypes': '',
+                'timetableType': timetable_type,
+            })
+            response.raise_for_status()
+            payload = response.json()
+
+        data = {
+            'format': 'api',
+            'timetable': {
+                # Parser liest das Basis-Datum aus dieser URL
+                'url': page_url,
+                'responses': [{'url': response.url, 'status': response.status_code, 'data': payload}]
+            }
+        }
+
+        return date_str, data
+
+    def fetch_week_with_retry(self, week_offset=0, entity=None):
+        """fetch_week mit Backoff-Wiederholungen, neuer Login nur bei abgelaufenem Token"""
+        label = job_label(entity, week_offset)
+        for attempt in range(self.retry.retries + 1):
+            self.breaker.check()
+            token = self.session.headers.get('Authorization')
+            try:
+                result = self.fetch_week(week_offset, entity)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                self.breaker.record_failure()
+                if attempt >= self.retry.retries or self.breaker.is_open:
+                    raise
+                print(f"   ⚠️ {label} fehlgeschlagen: {e}")
+
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status in (401, 403):
+                    self.relogin(token)
+
+                delay = self.retry.delay(attempt)
+                print(f"   🔁 {label}: Versuch {attempt+2}/{self.retry.retries+1} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def relogin(self, stale_token):
+        """Neuer Login - nur einmal, auch wenn mehrere Worker den Ablauf bemerken"""
+        with self._login_lock:
+            if self.session.headers.get('Authorization') != stale_token:
+                return  # anderer Worker hat schon neu eingeloggt
+            print("   🔐 Token abgelaufen - neuer Login")
+            try:
+                self.login()
+            except Exception as e:
+                print(f"   ❌ Neuer Login fehlgeschlagen: {e}")
+
+    def extract_multiple_weeks(self, num_weeks=4):
+        """Extrahiere mehrere Wochen für alle konfigurierten Entities"""
+        plan = WeekPlan(self.entities, num_weeks, self.refresh)
+        jobs = plan.due
+        started = time.monotonic()
+        self.breaker.reset()
+
+        print(f"\n{'='*60}")
+        print(f"📊 Extrahiere {len(jobs)} Wochen (HTTP, {self.concurrency} parallel)")
+        print(f"{'='*60}\n")
+
+        all_data = []
+
+        # Wochen parallel holen, jede Datei wird gespeichert sobald sie fertig ist
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self.fetch_week_with_retry, week, entity): index
+                       for index, (entity, week) in enumerate(jobs)}
+
+            for future in as_completed(futures):
+                index = futures[future]
+                entity, week = jobs[index]
+                try:
+                    date_str, data = future.result()
+
+                    filename = week_file_path(week + 1, entity)
+                    save_week_file(filename, data)
+                    if self.refresh:
+                        self.refresh.record(entity, week, data)
+
+                    print(f"💾 Gespeichert: {filename}")
+                    all_data.append((index, filename))
+
+                except CircuitOpenError as e:
+                    print(f"⛔ {job_label(entity, week)} abgebrochen: {e}")
+                except Exception as e:
+                    print(f"❌ Fehler bei {job_label(entity, week)}: {e}")
+
+        files = [filename for index, filename in sorted(all_data)]
+
+        files = plan.finish(files, time.monotonic() - started)
+        self.throughput = plan.throughput
+        return files
+
+    def run(self, num_weeks=4):
+        """Hauptausführung"""
+        files = []
+        started = datetime.now()
+        try:
+            self.login()
+            files = self.extract_multiple_weeks(num_weeks)
+
+            print(f"\n{'='*60}")
+            print("✅ FERTIG!")
+            print(f"{'='*60}")
+            print(f"📁 {len(files)} Wochen extrahiert:")
+            for f in files:
+                print(f"   - {f}")
+            print(f"{'='*60}\n")
+
+        except Exception as e:
+            print(f"\n❌ Fehler: {e}")
+            import traceback
+            traceback.print_exc()
+
+        finally:
+            self.session.close()
+            extra = {'backend': 'http'}
+            if self.throughput:
+                extra['throughput'] = self.throughput
+            extra['failed_attempts'] = self.breaker.total_failures
+            write_run_stats(self.timer, started, files, extra)
+
+        return files
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Login-Formular in einem Roundtrip finden
+Alle Selektoren werden in einem execute_script geprüft. Welche pro Schule
+funktioniert haben wird gespeichert und beim nächsten Login zuerst probiert.
+"""
+
+import json
+import time
+
+LOGIN_SELECTORS_FILE = 'login_selectors.json'
+
+SELECTORS = {
+    'username': [
+        'input#username',
+        'input[name="username"]',
+        'input[data-testid*="username"]',
+        'input[placeholder*="Benutzername"]',
+        'input[placeholder*="Username"]',
+        'input[type="text"]',
+    ],
+    'password': [
+        'input#password',
+        'input[name="password"]',
+        'input[type="password"]',
+        'input[data-testid*="password"]',
+    ],
+    'submit': [
+        'button[type="submit"]',
+        'button#login',
+        'button[data-testid*="login"]',
+        'button[data-testid*="submit"]',
+        'input[type="submit"]',
+        '.login-button',
+    ],
+}
+
+# Gibt pro Feld das erste passende Element und den Selektor zurück
+RESOLVE_FORM_JS = """
+const result = {};
+for (const [field, selectors] of Object.entries(arguments[0])) {
+    result[field] = null;
+    for (const selector of selectors) {
+        const el = document.querySelector(selector);
+        if (el) {
+            result[field] = [el, selector];
+            break;
+        }
+    }
+}
+return result;
+"""
+
+
+class LoginSelectorCache:
+    """Merkt sich pro Schule die Selektoren mit denen der Login geklappt hat"""
+
+    def __init__(self, path: str = LOGIN_SELECTORS_FILE):
+        self.path = path
+        self.data = self._load()
+
+    def ordered(self, school: str) -> dict:
+        """Selektor-Listen pro Feld, gelernte Selektoren zuerst"""
+        learned = self.data.get(school, {})
+        ordered = {}
+        for field, selectors in SELECTORS.items():
+            first = learned.get(field)
+            ordered[field] = ([first] if first else []) + [s for s in selectors if s != first]
+        return ordered
+
+    def is_cached(self, school: str) -> bool:
+        return school in self.data
+
+    def remember(self, school: str, used: dict):
+        """Speichert die Selektoren eines erfolgreichen Logins"""
+        entry = {field: selector for field, selector in used.items() if selector}
+        if self.data.get(school) == entry:
+            return
+        self.data[school] = entry
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2)
+        except OSError as e:
+            print(f"⚠ Login-Selektoren konnten nicht gespeichert werden: {e}")
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def resolve_login_form(driver, selectors: dict, timeout: float = 5, poll: float = 0.2) -> dict:
+    """
+    Sucht alle Formular-Felder mit einem execute_script pro Versuch
+
+    Returns: {'username': (element, selector) | None, 'password': ..., 'submit': ...}
+             - wiederholt bis Username- und Password-Feld da sind oder der Timeout abläuft
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        found = driver.execute_script(RESOLVE_FORM_JS, selectors)
+        found = {field: tuple(value) if value else None for field, value in found.items()}
+        if (found.get('username') and found.get('password')) or time.monotonic() >= deadline:
+            return found
+        time.sleep(poll)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Gemeinsame Normalisierung für uid und Signatur einer Lesson
+Genutzt von UntisLesson (Parser), GoogleCalendarSync (Duplikat-Prüfung) und dem
+Laden existierender Events - damit überall dieselben Schlüssel entstehen.
+"""
+
+import hashlib
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def normalize_room(room: str) -> str:
+    """
+    Hauptraum ohne Raumänderungen
+    "+O1101, O1104" -> "O1104" (nimm zweiten wenn erster mit + beginnt)
+    "O1027, +O1101, +O1102" -> "O1027" (nimm ersten)
+    "N/A" -> "N/A"
+    """
+    room_parts = [r.strip() for r in room.split(',')]
+
+    # Nimm ersten Raum der NICHT mit + beginnt
+    for part in room_parts:
+        clean_part = part.lstrip('+').strip()
+        if clean_part and clean_part != 'N/A':
+            return clean_part
+
+    # Fallback auf originalen Raum wenn nichts gefunden
+    return room_parts[0].lstrip('+').strip() if room_parts else room
+
+
+def lesson_uid(date: str, start_time: str, end_time: str, subject: str, room: str) -> str:
+    """Eindeutige ID für Duplikat-Erkennung (landet als untis_uid im Event)"""
+    data = f"{date}_{start_time}_{end_time}_{subject}_{normalize_room(room)}"
+    return hashlib.md5(data.encode()).hexdigest()[:16]
+
+
+def lesson_signature(date: str, start_time: str, subject: str, room: str) -> str:
+    """Signatur Datum_Zeit_Fach_Raum - erkennt auch Events ohne untis_uid"""
+    return f"{date}_{start_time}_{subject}_{normalize_room(room)}"
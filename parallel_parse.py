@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Paralleles Parsen der Wochen-Dateien
+Jede Datei wird in einem eigenen Prozess geparst (CPU-gebunden, daher Prozesse
+statt Threads). Ausgaben werden pro Datei gepuffert und in Datei-Reihenfolge
+ausgegeben, die Ergebnisse ebenfalls - das Zusammenführen bleibt deterministisch.
+"""
+
+import io
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from untis_sync_improved import ImprovedUntisParser
+from parse_cache import cache_key, parse_cache_from_env
+
+
+def parse_week_file(path: str) -> dict:
+    """
+    Parst eine Datei - gibt Lessons, gepufferte Ausgabe, Dauer, Cache-Status
+    ('hit', 'miss' oder None wenn aus), ob die Woche fertig gerendert gespeichert
+    wurde und ggf. Fehler zurück
+    """
+    buffer = io.StringIO()
+    started = time.perf_counter()
+    lessons = []
+    error = None
+    cache = parse_cache_from_env()
+    cache_status = None
+    complete = True
+
+    with redirect_stdout(buffer):
+        try:
+            key = cache_key(path) if cache else None
+            cached = cache.get(key) if cache else None
+            if cached is not None:
+                lessons, complete = cached
+                cache_status = 'hit'
+                print(f"♻️  Unverändert - {len(lessons)} Lessons aus dem Parse-Cache")
+            else:
+                parser = ImprovedUntisParser(path)
+                lessons = parser.parse_lessons()
+                # Nach Render-Timeout gespeichert (week_files.save_week_file)
+                complete = not parser.data.get('incomplete')
+                if cache:
+                    cache.put(key, lessons, complete)
+                    cache_status = 'miss'
+        except Exception as e:
+            error = f"{e}\n{traceback.format_exc()}"
+
+    return {
+        'path': path,
+        'lessons': lessons,
+        'log': buffer.getvalue(),
+        'seconds': time.perf_counter() - started,
+        'cache': cache_status,
+        'complete': complete,
+        'error': error,
+    }
+
+
+def parse_workers(num_files: int) -> int:
+    """Anzahl Parse-Prozesse aus UNTIS_PARSE_WORKERS (Standard: CPU-Kerne, max. Anzahl Dateien)"""
+    value = os.getenv('UNTIS_PARSE_WORKERS')
+    if value:
+        workers = int(value)
+    elif hasattr(os, 'sched_getaffinity'):
+        workers = len(os.sched_getaffinity(0))  # für den Prozess nutzbare Kerne (Container)
+    else:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, num_files))
+
+
+def parse_week_files(paths: list, workers: int = None) -> list:
+    """
+    Parst alle Dateien - parallel wenn workers > 1, sonst (oder wenn kein
+    Prozess-Pool möglich ist) nacheinander. Ergebnisse in der Reihenfolge von paths.
+    """
+    workers = workers or parse_workers(len(paths))
+
+    # Alte Cache-Einträge nach dem Lauf entfernen (Einträge dieses Laufs sind die neuesten)
+    cache = parse_cache_from_env()
+    try:
+        return _parse_all(paths, workers)
+    finally:
+        if cache:
+            cache.prune()
+
+
+def _parse_all(paths: list, workers: int) -> list:
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(parse_week_file, paths))
+        except (OSError, RuntimeError) as e:
+            # z.B. kein /dev/shm oder Prozess-Limit - seriell weitermachen
+            print(f"⚠ Paralleles Parsen nicht möglich ({e}) - parse seriell")
+
+    return [parse_week_file(path) for path in paths]
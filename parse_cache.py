@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Parse-Cache für unveränderte Wochen-Dateien
+Schlüssel = SHA-256 des Datei-Inhalts + Parser-Version. Gespeichert wird nur die
+Lesson-Liste als kompakte Zeilen (ein JSON-Array pro Lesson, ohne Einrückung) und
+ob die Woche fertig gerendert gespeichert wurde - ein Treffer liest die Datei nie.
+Nicht mehr genutzte Einträge werden nach Zugriffszeit (mtime) entfernt.
+"""
+
+import hashlib
+import json
+import os
+from untis_sync_improved import UntisLesson, PARSER_VERSION
+
+PARSE_CACHE_DIR = '.parse_cache'
+
+# Format der Cache-Zeilen - bei Änderungen erhöhen
+CACHE_FORMAT = 3
+
+# Spalten einer Cache-Zeile (uid vorberechnet, spart das Hashen beim Sync)
+FIELDS = ('date', 'start_time', 'end_time', 'subject', 'teacher', 'room', 'note', 'uid')
+
+
+def cache_key(path: str) -> str:
+    """Hash über Datei-Inhalt, Parser-Version und Cache-Format"""
+    digest = hashlib.sha256(f"v{PARSER_VERSION}.{CACHE_FORMAT}:".encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Lesson-Listen pro Datei-Hash auf Disk"""
+
+    def __init__(self, directory: str = PARSE_CACHE_DIR, max_entries: int = 64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key: str):
+        """(Lessons, complete) aus dem Cache - None bei Miss"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            rows, complete = entry['lessons'], entry['complete']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+
+        # Zugriff merken (LRU nach mtime)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return [self._lesson(row) for row in rows], complete
+
+    def put(self, key: str, lessons: list, complete: bool = True):
+        rows = [[getattr(lesson, field) or '' for field in FIELDS] for lesson in lessons]
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'complete': complete, 'lessons': rows}, f,
+                          ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"⚠ Parse-Cache konnte nicht geschrieben werden: {e}")
+
+    @staticmethod
+    def _lesson(row: list) -> UntisLesson:
+        date, start_time, end_time, subject, teacher, room, note, uid = row
+        return UntisLesson(start_time=start_time, end_time=end_time, subject=subject,
+                           teacher=teacher, room=room, date=date, note=note, uid=uid)
+
+    def prune(self) -> int:
+        """Entfernt die am längsten nicht genutzten Einträge über max_entries"""
+        try:
+            entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                       if name.endswith('.json')]
+        except OSError:
+            return 0
+
+        entries.sort(key=lambda path: os.path.getmtime(path), reverse=True)
+        removed = 0
+        for path in entries[self.max_entries:]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+def parse_cache_from_env():
+    """ParseCache aus UNTIS_PARSE_CACHE_MAX (0 = Cache aus)"""
+    max_entries = int(os.getenv('UNTIS_PARSE_CACHE_MAX', '64'))
+    if max_entries <= 0:
+        return None
+    return ParseCache(max_entries=max_entries)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Readiness-Engine für den WebUntis Extractor
+Wartet auf konkrete Bedingungen statt auf feste Sleeps
+"""
+
+import os
+import time
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+# Standard-Timeouts pro Phase (Sekunden), überschreibbar per UNTIS_TIMEOUT_<PHASE>
+DEFAULT_TIMEOUTS = {
+    'spa': 30,
+    'login_form': 20,
+    'login': 20,
+    'timetable': 20,
+}
+
+# Wie lange die Anzahl der Lesson-Cards unverändert bleiben muss (ms)
+DEFAULT_STABLE_MS = 800
+
+# Polling-Intervall für alle Bedingungen
+POLL_INTERVAL = 0.2
+
+LESSON_CARD_SELECTOR = 'div[class*="lesson-card"]'
+
+# Stundenplan-Raster ist gerendert (auch bei leerer Woche vorhanden)
+TIMETABLE_GRID_JS = """
+return !!document.querySelector(
+    '[class*="timetable-grid"], [data-testid*="timetable"], [class*="timetable-view"]'
+);
+"""
+
+# Lade-Indikatoren der SPA
+LOADING_JS = """
+return !!document.querySelector(
+    '[class*="loading"], [class*="spinner"], [class*="skeleton"], [role="progressbar"]'
+);
+"""
+
+# Explizite "keine Stunden" Marker
+EMPTY_WEEK_JS = """
+return !!document.querySelector(
+    '[class*="empty-state"], [class*="no-lessons"], [data-testid*="empty"], [data-testid*="no-lessons"]'
+);
+"""
+
+
+def phase_timeout(phase: str) -> float:
+    """Timeout für eine Phase (Env-Variable hat Vorrang)"""
+    value = os.getenv(f'UNTIS_TIMEOUT_{phase.upper()}')
+    if value:
+        return float(value)
+    return DEFAULT_TIMEOUTS[phase]
+
+
+def stable_ms() -> int:
+    """Stabilitätsfenster für die Lesson-Card-Anzahl"""
+    return int(os.getenv('UNTIS_STABLE_MS', DEFAULT_STABLE_MS))
+
+
+def wait_for_spa(driver, timeout: float = None):
+    """Wartet bis das Dokument geladen und die SPA gemountet ist"""
+    timeout = timeout or phase_timeout('spa')
+    WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+        lambda d: d.execute_script("""
+            if (document.readyState !== 'complete') return false;
+            return !!document.querySelector('input, button, [class*="lesson"], [class*="timetable"]');
+        """)
+    )
+
+
+def wait_for_login_form(driver, timeout: float = None):
+    """Wartet bis das Login-Formular (Passwort-Feld) vorhanden ist"""
+    timeout = timeout or phase_timeout('login_form')
+    WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+        lambda d: d.execute_script("return !!document.querySelector('input[type=\"password\"]');")
+    )
+
+
+# Fehlermeldungen auf der Login-Seite (Texte aller sichtbaren Treffer)
+LOGIN_ERRORS_JS = """
+return Array.from(document.querySelectorAll('.error, .alert, [class*="error"], [class*="alert"]'))
+    .map(el => el.textContent.trim())
+    .filter(text => text);
+"""
+
+# Formular ist wieder bedienbar (nach dem Submit neu gerendert, nichts lädt mehr)
+LOGIN_FORM_IDLE_JS = f"""
+const password = document.querySelector('input[type="password"]');
+const loading = (function() {{ {LOADING_JS} }})();
+return !!(password && !password.disabled && !loading);
+"""
+
+
+def login_error_texts(driver) -> list:
+    """Fehler-/Hinweistexte die aktuell auf der Seite stehen (vor dem Submit aufrufen)"""
+    try:
+        return driver.execute_script(LOGIN_ERRORS_JS) or []
+    except Exception:
+        return []
+
+
+def wait_for_login_result(driver, old_url: str, timeout: float = None, known_errors=None) -> str:
+    """
+    Wartet auf das Ergebnis des Login-Submits
+
+    known_errors: Texte die schon vor dem Submit da waren (Banner, Hinweise) - nur
+    neue Meldungen zählen, und erst wenn das Formular wieder bedienbar ist.
+
+    Returns: 'url_changed', 'error' (neue Fehlermeldung sichtbar) oder 'timeout'
+    """
+    timeout = timeout or phase_timeout('login')
+    known = set(known_errors or [])
+
+    def check(d):
+        current = d.current_url
+        if current != old_url and 'login' not in current.lower():
+            return 'url_changed'
+        new_errors = [text for text in d.execute_script(LOGIN_ERRORS_JS) or [] if text not in known]
+        if new_errors and d.execute_script(LOGIN_FORM_IDLE_JS):
+            return 'error'
+        return False
+
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(check)
+    except TimeoutException:
+        return 'timeout'
+
+
+class TimetableReadiness:
+    """
+    Verfolgt den Render-Zustand eines Stundenplans über mehrere Prüfungen
+
+    Eine Instanz pro Seite/Tab - so können mehrere Tabs abwechselnd
+    ohne Blockieren geprüft werden.
+    """
+
+    STATE_JS = f"""
+        return {{
+            cards: document.querySelectorAll('{LESSON_CARD_SELECTOR}').length,
+            grid: (function() {{ {TIMETABLE_GRID_JS} }})(),
+            loading: (function() {{ {LOADING_JS} }})(),
+            empty: (function() {{ {EMPTY_WEEK_JS} }})()
+        }};
+    """
+
+    def __init__(self, stable_for_ms: int = None):
+        self.stable_for = (stable_for_ms if stable_for_ms is not None else stable_ms()) / 1000.0
+        self.last_count = -1
+        self.last_change = time.monotonic()
+
+    def check(self, driver):
+        """Eine Prüfung - 'lessons', 'empty' oder None (noch nicht fertig)"""
+        state = driver.execute_script(self.STATE_JS)
+
+        now = time.monotonic()
+        if state['cards'] != self.last_count:
+            self.last_count = state['cards']
+            self.last_change = now
+
+        settled = (now - self.last_change) >= self.stable_for and not state['loading']
+
+        if state['cards'] > 0 and settled:
+            return 'lessons'
+        if state['cards'] == 0 and (state['empty'] or (state['grid'] and settled)):
+            return 'empty'
+        return None
+
+
+def wait_for_timetable(driver, timeout: float = None, stable_for_ms: int = None) -> str:
+    """
+    Wartet bis der Stundenplan fertig gerendert ist
+
+    Returns:
+        'lessons' - Lesson-Card-Anzahl > 0 und stabil für stable_for_ms
+        'empty'   - Leere Woche (Marker oder Raster ohne Cards und ohne Lade-Indikator)
+        'timeout' - Keine der Bedingungen innerhalb des Timeouts erfüllt
+    """
+    timeout = timeout or phase_timeout('timetable')
+    readiness = TimetableReadiness(stable_for_ms)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = readiness.check(driver)
+        if state:
+            return state
+        time.sleep(POLL_INTERVAL)
+
+    return 'timeout'
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Abgleich geparste Lessons <-> existierende Untis-Events im Kalender
+Berechnet einen minimalen Plan: insert (neue Stunde), patch (Lehrer, Raum oder
+Notiz geändert), delete (Stunde entfallen) und unchanged. Gelöscht werden nur
+Events mit untis_uid in Wochen, für die in diesem Lauf Lessons geparst wurden -
+Wochen ohne Lessons (Ferien oder Parser-Problem) bleiben unangetastet, ebenso
+Wochen die nach einem Render-Timeout gespeichert wurden oder deren Lesson-Anzahl
+gegenüber dem Index stark eingebrochen ist (vermutlich halb geladen).
+Ein Raumwechsel ändert die uid - Events ohne passende uid werden daher erst über
+Datum, Beginn und Fach einer neuen Lesson zugeordnet und gepatcht.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+
+# Anteil an Lessons den eine Woche gegenüber dem Index verlieren darf, bevor dort nichts gelöscht wird
+MAX_WEEK_DROP = 0.5
+
+
+def lesson_hash(lesson) -> str:
+    """Hash über alles was im Event landet (landet als untis_hash im Event)"""
+    data = '\x1f'.join((lesson.date, lesson.start_time, lesson.end_time, lesson.subject,
+                        lesson.teacher, lesson.room, lesson.note or ''))
+    return hashlib.md5(data.encode()).hexdigest()[:16]
+
+
+def week_start(date_str: str) -> str:
+    """Montag (YYYY-MM-DD) der Woche eines Datums"""
+    day = datetime.strptime(date_str[:10], '%Y-%m-%d')
+    return (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
+
+
+class SyncPlan:
+    """Geplante Schreib-Operationen eines Laufs"""
+
+    def __init__(self):
+        self.inserts = []     # Lessons
+        self.patches = []     # (event_id, Lesson)
+        self.deletes = []     # event_id
+        self.unchanged = 0
+        self.kept_weeks = {}  # Montag -> Grund, warum dort nicht gelöscht wird
+
+    def counts(self) -> dict:
+        return {
+            'insert': len(self.inserts),
+            'patch': len(self.patches),
+            'delete': len(self.deletes),
+            'unchanged': self.unchanged,
+        }
+
+    @property
+    def writes(self) -> int:
+        return len(self.inserts) + len(self.patches) + len(self.deletes)
+
+
+def plan_sync(lessons: list, existing: dict, delete: bool = True, keep_weeks=(),
+              max_drop: float = MAX_WEEK_DROP) -> SyncPlan:
+    """
+    Plan aus Lessons und existing_events von GoogleCalendarSync
+    (by_uid: uid -> event_id, by_signature: Signatur -> event_id,
+    by_id: event_id -> {'uid', 'hash', 'date', 'start', 'summary'})
+    keep_weeks: Montage in denen nichts gelöscht wird (z.B. Wochen mit Render-Timeout)
+    """
+    plan = SyncPlan()
+    seen = set()
+    new_lessons = []
+    parsed_per_week = {}
+
+    for lesson in lessons:
+        uid = lesson.uid
+        if uid in seen:
+            continue  # doppelt in den Wochen-Dateien
+        seen.add(uid)
+        week = week_start(lesson.date)
+        parsed_per_week[week] = parsed_per_week.get(week, 0) + 1
+
+        event_id = existing['by_uid'].get(uid)
+        if event_id:
+            if existing['by_id'].get(event_id, {}).get('hash') == lesson_hash(lesson):
+                plan.unchanged += 1
+            else:
+                plan.patches.append((event_id, lesson))
+        elif lesson.signature in existing['by_signature']:
+            # Event ohne untis_uid (älterer Sync oder manuell) - nicht anfassen
+            plan.unchanged += 1
+        else:
+            new_lessons.append(lesson)
+
+    # Events deren uid nicht mehr vorkommt: gleiche Stunde mit anderem Raum? -> patchen
+    unmatched = {}
+    for event_id, info in existing['by_id'].items():
+        if info['uid'] not in seen:
+            key = (info.get('date'), info.get('start'), info.get('summary'))
+            unmatched.setdefault(key, []).append(event_id)
+
+    for lesson in new_lessons:
+        candidates = unmatched.get((lesson.date, lesson.start_time, lesson.subject))
+        if candidates:
+            plan.patches.append((candidates.pop(0), lesson))
+        else:
+            plan.inserts.append(lesson)
+
+    if delete:
+        indexed_per_week = {}
+        for info in existing['by_id'].values():
+            if info.get('date'):
+                week = week_start(info['date'])
+                indexed_per_week[week] = indexed_per_week.get(week, 0) + 1
+
+        for week in keep_weeks:
+            plan.kept_weeks[week] = 'Stundenplan nicht fertig geladen (Timeout)'
+        for week, parsed in parsed_per_week.items():
+            indexed = indexed_per_week.get(week, 0)
+            if week not in plan.kept_weeks and parsed < indexed * (1 - max_drop):
+                plan.kept_weeks[week] = f'nur {parsed} statt {indexed} Lessons'
+
+        for event_ids in unmatched.values():
+            for event_id in event_ids:
+                date = existing['by_id'][event_id].get('date')
+                if not date:
+                    continue
+                week = week_start(date)
+                if week in parsed_per_week and week not in plan.kept_weeks:
+                    plan.deletes.append(event_id)
+
+    return plan
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Aufzeichnung von HTTP-Responses für den Replay-Server
+Ein Verzeichnis enthält index.json plus eine Body-Datei pro Response
+"""
+
+import json
+import os
+import threading
+from urllib.parse import urlparse, parse_qsl
+
+INDEX_FILE = 'index.json'
+
+# Cache-Buster die beim Abgleich von Requests ignoriert werden
+VOLATILE_PARAMS = {'_'}
+
+
+class ResponseRecorder:
+    """Speichert alle Responses eines Laufs in einem Verzeichnis"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.entries = []
+        self._lock = threading.Lock()  # parallele Requests
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, method: str, url: str, status: int, content_type: str, body: bytes,
+               headers: dict = None):
+        parsed = urlparse(url)
+
+        with self._lock:
+            body_file = f"{len(self.entries):04d}.body"
+
+            with open(os.path.join(self.directory, body_file), 'wb') as f:
+                f.write(body or b'')
+
+            self.entries.append({
+                'method': method.upper(),
+                'path': parsed.path,
+                'query': parsed.query,
+                'status': status,
+                'content_type': content_type or 'application/octet-stream',
+                'body_file': body_file,
+            })
+            if headers:
+                self.entries[-1]['headers'] = headers
+            self._write_index()
+
+    def _write_index(self):
+        with open(os.path.join(self.directory, INDEX_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+
+
+def record_network_events(recorder: ResponseRecorder, events: list, body_for, host: str) -> int:
+    """
+    Überträgt Network.* Events (Chrome Performance-Log) in eine Aufzeichnung
+
+    Nur Responses vom WebUntis-Host - Redirects werden mit relativem Location-Header
+    gespeichert, damit der Browser beim Replay auf dem Replay-Server bleibt.
+    body_for(request_id) liefert den Body als Bytes (None wenn nicht verfügbar).
+    Returns: Anzahl aufgezeichneter Responses
+    """
+    methods = {}
+    responses = []
+    finished = set()
+
+    for method, params in events:
+        request_id = params.get('requestId')
+        if method == 'Network.requestWillBeSent':
+            redirect = params.get('redirectResponse')
+            if redirect:
+                # Redirect-Response des vorherigen Requests mit derselben ID
+                responses.append((request_id, methods.get(request_id, 'GET'), redirect, True))
+            methods[request_id] = params.get('request', {}).get('method', 'GET')
+        elif method == 'Network.responseReceived':
+            responses.append((request_id, methods.get(request_id, 'GET'), params.get('response', {}), False))
+        elif method == 'Network.loadingFinished':
+            finished.add(request_id)
+
+    count = 0
+    for request_id, method, response, is_redirect in responses:
+        url = response.get('url', '')
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc != host:
+            continue
+
+        headers = {k.lower(): v for k, v in (response.get('headers') or {}).items()}
+        content_type = headers.get('content-type') or response.get('mimeType')
+
+        if is_redirect:
+            location = urlparse(headers.get('location', ''))
+            relative = location.path + (f'?{location.query}' if location.query else '')
+            if location.fragment:
+                relative += f'#{location.fragment}'
+            recorder.record(method, url, response.get('status', 302), content_type, b'',
+                            headers={'Location': relative or '/'})
+        else:
+            if request_id not in finished:
+                continue
+            body = body_for(request_id)
+            if body is None:
+                continue
+            recorder.record(method, url, response.get('status', 200), content_type, body)
+        count += 1
+
+    return count
+
+
+def load_recordings(directory: str) -> list:
+    """Lädt den Index eines Aufzeichnungs-Verzeichnisses"""
+    with open(os.path.join(directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def query_params(query: str) -> list:
+    """Query-Parameter sortiert und ohne Cache-Buster - Reihenfolge ist egal, Werte nicht"""
+    return sorted((key, value) for key, value in parse_qsl(query, keep_blank_values=True)
+                  if key not in VOLATILE_PARAMS)
+
+
+def find_recording(entries: list, method: str, path: str, query: str):
+    """
+    Sucht die passende Aufzeichnung
+
+    Gleiche Methode und Pfad, dazu dieselben Query-Parameter (Datum, Entity, ...) -
+    Reihenfolge und Cache-Buster zählen nicht. Kein Ausweichen auf andere Wochen:
+    ohne Treffer None (der Replay-Server antwortet 404).
+    """
+    params = None
+    for entry in entries:
+        if entry['method'] != method.upper() or entry['path'] != path:
+            continue
+        if entry['query'] == query:
+            return entry
+        if params is None:
+            params = query_params(query)
+        if query_params(entry['query']) == params:
+            return entry
+    return None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Gestaffelte Aktualisierung der Wochen
+Die aktuelle Woche wird jeden Lauf geholt, spätere Wochen seltener.
+Merkt sich pro Woche (Montag) wann sie zuletzt geholt wurde und wie oft
+sich ihr Inhalt dabei geändert hat - häufig geänderte Wochen werden öfter geholt.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+REFRESH_STATE_FILE = 'refresh_state.json'
+
+# Minuten zwischen zwei Abrufen pro Wochen-Offset, der letzte Wert gilt für alle weiteren
+DEFAULT_INTERVALS = (0, 60, 360)
+
+# Gewicht einer neuen Beobachtung in der Änderungsrate (gleitender Mittelwert)
+CHANGE_RATE_ALPHA = 0.3
+
+# Bei Änderungsrate 1.0 schrumpft das Intervall auf 1/(1+FACTOR)
+CHANGE_RATE_FACTOR = 3
+
+# Einträge älter als das werden beim Speichern entfernt
+MAX_STATE_AGE_DAYS = 28
+
+
+def monday_of_week(week_offset: int) -> str:
+    """Montag (YYYY-MM-DD) der Woche mit dem Offset zur aktuellen Woche"""
+    today = datetime.now()
+    monday = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
+    return monday.strftime('%Y-%m-%d')
+
+
+def content_hash(data: dict) -> str:
+    """Hash des Stundenplan-Inhalts (ohne URL) zum Erkennen von Änderungen"""
+    content = {k: v for k, v in data.get('timetable', {}).items() if k != 'url'}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def file_week_date(path: str):
+    """Montag aus der URL einer vorhandenen Wochen-Datei (None wenn nicht lesbar)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            url = json.load(f)['timetable']['url']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    marker = 'date='
+    if marker not in url:
+        return None
+    return url.split(marker, 1)[1][:10]
+
+
+class RefreshPolicy:
+    """Entscheidet pro (Entity, Woche) ob ein Abruf fällig ist"""
+
+    def __init__(self, intervals=DEFAULT_INTERVALS, path: str = REFRESH_STATE_FILE):
+        self.intervals = list(intervals) or [0]
+        self.path = path
+        self.state = self._load()
+
+    @staticmethod
+    def _key(entity: dict, monday: str) -> str:
+        owner = f"{entity['type']}_{entity['id']}" if entity else 'me'
+        return f"{owner}|{monday}"
+
+    def interval_minutes(self, week: int, entry: dict = None) -> float:
+        """Intervall für einen Wochen-Offset, verkürzt um die beobachtete Änderungsrate"""
+        base = self.intervals[min(week, len(self.intervals) - 1)]
+        change_rate = (entry or {}).get('change_rate', 0.0)
+        return base / (1 + CHANGE_RATE_FACTOR * change_rate)
+
+    def is_due(self, entity: dict, week: int, path: str) -> bool:
+        """Fällig wenn Intervall abgelaufen oder die Datei nicht zur Woche passt"""
+        monday = monday_of_week(week)
+        entry = self.state.get(self._key(entity, monday))
+        if not entry:
+            return True
+
+        # Nach dem Wochenwechsel enthält week_N.json noch die alte Woche
+        if file_week_date(path) != monday:
+            return True
+
+        age = datetime.now() - datetime.fromisoformat(entry['last_fetch'])
+        return age >= timedelta(minutes=self.interval_minutes(week, entry))
+
+    def plan(self, jobs: list, path_for) -> tuple:
+        """Teilt (Entity, Woche)-Jobs in (fällig, übersprungen) auf"""
+        due, skipped = [], []
+        for entity, week in jobs:
+            if self.is_due(entity, week, path_for(entity, week)):
+                due.append((entity, week))
+            else:
+                skipped.append((entity, week))
+        return due, skipped
+
+    def record(self, entity: dict, week: int, data: dict):
+        """Merkt sich einen Abruf und aktualisiert die Änderungsrate"""
+        key = self._key(entity, monday_of_week(week))
+        new_hash = content_hash(data)
+        entry = self.state.get(key)
+
+        if entry:
+            changed = 1.0 if entry['hash'] != new_hash else 0.0
+            entry['change_rate'] = round(
+                (1 - CHANGE_RATE_ALPHA) * entry['change_rate'] + CHANGE_RATE_ALPHA * changed, 4
+            )
+            entry['fetches'] += 1
+            entry['changes'] += int(changed)
+        else:
+            entry = {'change_rate': 0.0, 'fetches': 1, 'changes': 0}
+            self.state[key] = entry
+
+        entry['hash'] = new_hash
+        entry['last_fetch'] = datetime.now().isoformat()
+
+    def save(self):
+        """Schreibt den Zustand (alte Wochen werden entfernt)"""
+        cutoff = (datetime.now() - timedelta(days=MAX_STATE_AGE_DAYS)).strftime('%Y-%m-%d')
+        self.state = {k: v for k, v in self.state.items() if k.split('|', 1)[1] >= cutoff}
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠ Refresh-Status konnte nicht gespeichert werden: {e}")
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def refresh_policy_from_env():
+    """RefreshPolicy aus UNTIS_REFRESH_INTERVALS (None wenn alle Wochen jeden Lauf geholt werden)"""
+    value = os.getenv('UNTIS_REFRESH_INTERVALS')
+    if value is None:
+        intervals = list(DEFAULT_INTERVALS)
+    else:
+        intervals = [float(v) for v in value.split(',') if v.strip()]
+
+    if not any(intervals):
+        return None
+    return RefreshPolicy(intervals)
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 """
 Entfernt Duplikate aus Google Calendar basierend auf untis_uid
+Nutzt den lokalen Index (untis_state.db) statt den Kalender komplett zu listen
 """
 
 import os
 import pickle
-from datetime import datetime, timedelta
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from state_store import (StateStore, refresh_store, date_window, parsed_date_range,
+                         new_transfer_stats, format_transfer)
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
@@ -42,50 +44,20 @@ def find_and_remove_duplicates(dry_run=True):
     print("🔍 Suche nach Duplikaten in Google Calendar")
     print("="*60)
     
-    # Hole Events
-    now = datetime.utcnow()
-    time_min = (now - timedelta(days=7)).isoformat() + 'Z'
-    time_max = (now + timedelta(days=90)).isoformat() + 'Z'
-    
-    print(f"\n📅 Zeitraum: {time_min[:10]} bis {time_max[:10]}")
-    
-    all_events = []
-    page_token = None
-    
-    while True:
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=2500,
-            singleEvents=True,
-            orderBy='startTime',
-            pageToken=page_token
-        ).execute()
-        
-        events = events_result.get('items', [])
-        all_events.extend(events)
-        
-        page_token = events_result.get('nextPageToken')
-        if not page_token:
-            break
+    # Zeitraum: Wochen der zuletzt geparsten Lessons (sonst -7 bis +90 Tage)
+    date_min, date_max = date_window(parsed_date_range())
     
-    print(f"📊 {len(all_events)} Events gefunden\n")
+    print(f"\n📅 Zeitraum: {date_min} bis {date_max}")
     
-    # Gruppiere nach untis_uid
-    by_uid = {}
+    # Lokalen Index auf den Stand des Kalenders bringen (nur Änderungen per syncToken)
+    store = StateStore()
+    stats = new_transfer_stats()
+    changes, incremental = refresh_store(service, store, stats=stats)
+    print(f"📊 {store.count()} Untis-Events im Index ({changes} Events {'geändert' if incremental else 'gelistet'})")
+    print(f"📦 Übertragen: {format_transfer(stats)}\n")
     
-    for event in all_events:
-        extended = event.get('extendedProperties', {}).get('private', {})
-        uid = extended.get('untis_uid')
-        
-        if not uid:
-            continue
-        
-        if uid not in by_uid:
-            by_uid[uid] = []
-        
-        by_uid[uid].append(event)
+    # Gruppiere nach untis_uid (nur uids mit mehreren Events, älteste zuerst)
+    by_uid = store.duplicate_groups(date_min, date_max)
     
     # Finde Duplikate
     duplicates_found = 0
@@ -95,22 +67,19 @@ def find_and_remove_duplicates(dry_run=True):
         if len(events) > 1:
             duplicates_found += len(events) - 1
             
-            # Sortiere nach Erstellungsdatum (älteste behalten)
-            events.sort(key=lambda e: e.get('created', ''))
-            
-            # Erste behalten, Rest löschen
+            # Erste behalten (älteste), Rest löschen
             keep = events[0]
             delete = events[1:]
             
             print(f"\n🔴 Duplikat gefunden (UID: {uid}):")
-            print(f"   ✓ Behalte: {keep.get('summary')} am {keep['start'].get('dateTime', '')[:10]}")
-            print(f"              Google ID: {keep['id'][:20]}...")
-            print(f"              Erstellt: {keep.get('created', 'unbekannt')[:10]}")
+            print(f"   ✓ Behalte: {keep['summary']} am {keep['date']}")
+            print(f"              Google ID: {keep['event_id'][:20]}...")
+            print(f"              Erstellt: {(keep['created'] or 'unbekannt')[:10]}")
             
             for dup in delete:
-                print(f"   ✗ Lösche:  {dup.get('summary')} am {dup['start'].get('dateTime', '')[:10]}")
-                print(f"              Google ID: {dup['id'][:20]}...")
-                print(f"              Erstellt: {dup.get('created', 'unbekannt')[:10]}")
+                print(f"   ✗ Lösche:  {dup['summary']} am {dup['date']}")
+                print(f"              Google ID: {dup['event_id'][:20]}...")
+                print(f"              Erstellt: {(dup['created'] or 'unbekannt')[:10]}")
                 duplicates_to_delete.append(dup)
     
     if duplicates_found == 0:
@@ -138,13 +107,14 @@ def find_and_remove_duplicates(dry_run=True):
         try:
             service.events().delete(
                 calendarId='primary',
-                eventId=event['id']
+                eventId=event['event_id']
             ).execute()
+            store.delete_event(event['event_id'])
             deleted += 1
-            print(f"   ✓ Gelöscht: {event.get('summary')} ({event['id'][:20]}...)")
+            print(f"   ✓ Gelöscht: {event['summary']} ({event['event_id'][:20]}...)")
         except Exception as e:
             failed += 1
-            print(f"   ✗ Fehler: {event.get('summary')} - {e}")
+            print(f"   ✗ Fehler: {event['summary']} - {e}")
     
     print(f"\n{'='*60}")
     print(f"✅ Fertig!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Lokaler Replay-Server für aufgezeichnete WebUntis Responses
+Damit lassen sich die Extractor-Backends offline testen und messen
+
+Nutzung:
+    python3 replay_server.py recordings/run1 --port 8765 --latency-ms 50
+    UNTIS_BASE_URL=http://127.0.0.1:8765 UNTIS_BACKEND=http python3 extractor.py
+
+    # Selenium-Aufzeichnung (UNTIS_RECORD_DIR mit UNTIS_BACKEND=selenium, Chrome)
+    UNTIS_BASE_URL=http://127.0.0.1:8765 UNTIS_SESSION_REUSE=false python3 extractor.py
+"""
+
+import argparse
+import os
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+from recording import load_recordings, find_recording
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Beantwortet Requests aus der Aufzeichnung"""
+
+    directory = None
+    entries = []
+    latency = 0.0
+
+    def _replay(self):
+        # Request-Body lesen, damit der Client nicht blockiert
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        parsed = urlparse(self.path)
+        entry = find_recording(self.entries, self.command, parsed.path, parsed.query)
+
+        if not entry:
+            self.send_response(404)
+            self.end_headers()
+            self.wfile.write(b'Not recorded')
+            return
+
+        with open(os.path.join(self.directory, entry['body_file']), 'rb') as f:
+            body = f.read()
+
+        self.send_response(entry['status'])
+        self.send_header('Content-Type', entry['content_type'])
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in entry.get('headers', {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _replay
+    do_POST = _replay
+
+    def log_message(self, format, *args):
+        print(f"  ↺ {self.command} {self.path} ({format % args})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay-Server für aufgezeichnete WebUntis Responses')
+    parser.add_argument('directory', help='Aufzeichnungs-Verzeichnis (mit index.json)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=int, default=0, help='Künstliche Latenz pro Request')
+    args = parser.parse_args()
+
+    ReplayHandler.directory = args.directory
+    ReplayHandler.entries = load_recordings(args.directory)
+    ReplayHandler.latency = args.latency_ms / 1000.0
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), ReplayHandler)
+    print(f"🔁 Replay-Server: http://127.0.0.1:{args.port} ({len(ReplayHandler.entries)} Responses, "
+          f"Latenz {args.latency_ms} ms)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✋ Beendet")
+
+
+if __name__ == '__main__':
+    main()
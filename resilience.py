@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Wiederholungen pro Woche und Circuit-Breaker für die Extractor-Backends
+Ein kurzer Aussetzer kostet so ein paar Sekunden statt eines ganzen Sync-Zyklus,
+und wenn WebUntis komplett weg ist wird früh abgebrochen.
+"""
+
+import os
+import random
+import threading
+
+
+class CircuitOpenError(Exception):
+    """Zu viele Fehler in Folge - weitere Requests sind sinnlos"""
+
+
+class RetryPolicy:
+    """Exponentielles Backoff mit Jitter: base * 2^versuch, +-50%, gedeckelt"""
+
+    def __init__(self, retries: int = 2, base_delay: float = 1.0, max_delay: float = 15.0):
+        self.retries = max(0, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Wartezeit vor Wiederholung Nr. attempt+1 (attempt beginnt bei 0)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+
+class CircuitBreaker:
+    """Öffnet nach `threshold` fehlgeschlagenen Versuchen in Folge (thread-safe)"""
+
+    def __init__(self, threshold: int = 4):
+        self.threshold = max(1, threshold)
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Neuer Lauf - Zähler zurücksetzen"""
+        with self._lock:
+            self.consecutive_failures = 0
+            self.total_failures = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.consecutive_failures >= self.threshold
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+
+    def check(self):
+        """Wirft CircuitOpenError wenn der Breaker offen ist"""
+        if self.is_open:
+            raise CircuitOpenError(
+                f"{self.consecutive_failures} Fehler in Folge - WebUntis scheint nicht erreichbar"
+            )
+
+
+def retry_policy_from_env() -> RetryPolicy:
+    """RetryPolicy aus UNTIS_RETRIES / UNTIS_RETRY_BASE_DELAY"""
+    return RetryPolicy(
+        retries=int(os.getenv('UNTIS_RETRIES', '2')),
+        base_delay=float(os.getenv('UNTIS_RETRY_BASE_DELAY', '1.0')),
+    )
+
+
+def circuit_breaker_from_env() -> CircuitBreaker:
+    """CircuitBreaker aus UNTIS_CIRCUIT_THRESHOLD"""
+    return CircuitBreaker(int(os.getenv('UNTIS_CIRCUIT_THRESHOLD', '4')))
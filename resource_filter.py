@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Ressourcen-Filter für den Headless-Browser
+Blockiert Bilder, Fonts, Medien, Analytics (optional Stylesheets) - der
+Extractor braucht nur Dokument, JavaScript und die XHR-Responses.
+Zählt blockierte Requests und schätzt die eingesparten Bytes.
+Muster die etwas Benötigtes treffen könnten werden vor dem Blockieren aussortiert.
+"""
+
+import json
+import os
+from fnmatch import fnmatchcase
+
+RESOURCE_STATS_FILE = 'resource_stats.json'
+
+# URL-Muster pro Kategorie (Chrome Network.setBlockedURLs, * = Wildcard)
+# Dateiendungen bzw. Hosts die nur Analytics ausliefern - keine Teilstrings,
+# die auch ein Bundle der WebUntis-App treffen könnten
+CATEGORY_PATTERNS = {
+    'image': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp'],
+    'font': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'media': ['*.mp4', '*.webm', '*.mp3', '*.ogg'],
+    'stylesheet': ['*.css'],
+    'analytics': [
+        '*://*google-analytics.com/*', '*://*googletagmanager.com/*', '*://*doubleclick.net/*',
+        '*://*hotjar.com/*', '*://*matomo.cloud/*', '*://*sentry.io/*', '*://*newrelic.com/*',
+        '*://*nr-data.net/*', '*://*usercentrics.eu/*', '*://*cookiebot.com/*',
+    ],
+}
+
+# Standard: alles außer Stylesheets (die SPA misst teils Layouts)
+DEFAULT_CATEGORIES = ('image', 'font', 'media', 'analytics')
+
+# Was der Stundenplan tatsächlich braucht - wird nie blockiert
+ALLOWED_RESOURCE_TYPES = ('Document', 'Script', 'XHR', 'Fetch')
+
+# Beispiel-URLs dieser Typen auf dem WebUntis-Host zum Prüfen der Muster
+# (dazu kommen die in früheren Läufen gesehenen benötigten URLs)
+ALLOWED_URL_PATHS = ('/', '/WebUntis/', '/app.js', '/app.mjs', '/api/data.json', '/index.html')
+
+# Kategorien die Firefox per Pref wirklich blockiert (Medien nur per Autoplay/Preload
+# zu bremsen, nicht zu blockieren - bleiben dort geladen)
+FIREFOX_CATEGORIES = ('image', 'font', 'stylesheet', 'analytics')
+
+# Höchstens so viele benötigte URLs merken
+MAX_NEEDED_URLS = 200
+
+# DevTools Resource-Type -> Kategorie (für Statistik und Lernen der Größen)
+RESOURCE_TYPE_CATEGORY = {
+    'Image': 'image',
+    'Font': 'font',
+    'Media': 'media',
+    'Stylesheet': 'stylesheet',
+}
+
+
+class ResourceFilter:
+    """
+    Blockiert unnötige Ressourcen und zählt was blockiert wurde
+
+    mode:
+        'on'      - blockieren + zählen
+        'measure' - nichts blockieren, nur Größen pro Kategorie lernen
+                    (Grundlage für die Schätzung der eingesparten Bytes)
+    """
+
+    def __init__(self, mode: str = 'on', categories=DEFAULT_CATEGORIES):
+        self.mode = mode
+        self.categories = [c for c in categories if c in CATEGORY_PATTERNS]
+        self.learned = self._load_learned()
+        self.active_categories = []  # was im laufenden Browser tatsächlich blockiert wird
+        self._dropped = set()         # schon gemeldete ausgelassene Muster
+
+    @property
+    def blocking(self) -> bool:
+        return self.mode == 'on'
+
+    def patterns(self, host: str = None) -> list:
+        """Blockliste ohne Muster die eine benötigte Ressource treffen (Allowlist)"""
+        needed = list(self.learned.get('needed_urls', []))
+        if host:
+            needed += [f'{scheme}://{host}{path}' for scheme in ('https', 'http')
+                       for path in ALLOWED_URL_PATHS]
+
+        patterns = []
+        for category in self.categories:
+            for pattern in CATEGORY_PATTERNS[category]:
+                hit = next((url for url in needed if fnmatchcase(url, pattern)), None)
+                if hit:
+                    if pattern not in self._dropped:
+                        self._dropped.add(pattern)
+                        print(f"   ⚠️ Muster {pattern} nicht blockiert - trifft benötigte Ressource {hit}")
+                    continue
+                patterns.append(pattern)
+        return patterns
+
+    def apply_chrome(self, driver, host: str = None):
+        """Aktiviert die Blockliste im aktuellen Tab (pro Tab nötig)"""
+        if not self.blocking:
+            return
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns(host)})
+        self.active_categories = list(self.categories)
+
+    def apply_firefox(self, options):
+        """Firefox-Äquivalent über Prefs (ohne Zähler) - nur Kategorien aus FIREFOX_CATEGORIES"""
+        if not self.blocking:
+            return
+        if 'image' in self.categories:
+            options.set_preference('permissions.default.image', 2)
+        if 'font' in self.categories:
+            options.set_preference('gfx.downloadable_fonts.enabled', False)
+            options.set_preference('browser.display.use_document_fonts', 0)
+        if 'stylesheet' in self.categories:
+            options.set_preference('permissions.default.stylesheet', 2)
+        if 'analytics' in self.categories:
+            # Tracking-Schutz blockiert bekannte Analytics-Hosts (Disconnect-Liste)
+            options.set_preference('privacy.trackingprotection.enabled', True)
+        self.active_categories = [c for c in self.categories if c in FIREFOX_CATEGORIES]
+        skipped = [c for c in self.categories if c not in FIREFOX_CATEGORIES]
+        if skipped:
+            print(f"   ⚠️ Firefox blockiert {', '.join(skipped)} nicht - wird geladen")
+
+    def _category(self, resource_type: str, url: str) -> str:
+        if any(self._matches(url, p) for p in CATEGORY_PATTERNS['analytics']):
+            return 'analytics'
+        return RESOURCE_TYPE_CATEGORY.get(resource_type, 'other')
+
+    @staticmethod
+    def _matches(url: str, pattern: str) -> bool:
+        return fnmatchcase(url, pattern)
+
+    def summarize(self, events: list) -> dict:
+        """
+        Wertet Network.* Events aus
+
+        Returns: blockierte Requests pro Kategorie, übertragene Bytes und
+                 die geschätzten eingesparten Bytes (gelernte Durchschnittsgrößen)
+        """
+        requests = {}
+        for method, params in events:
+            if method == 'Network.requestWillBeSent':
+                requests[params.get('requestId')] = (
+                    params.get('type', ''), params.get('request', {}).get('url', '')
+                )
+
+        blocked = {}
+        needed_blocked = []
+        needed = set()
+        transferred = 0
+        sizes = {}
+
+        for method, params in events:
+            request_id = params.get('requestId')
+            resource_type, url = requests.get(request_id, ('', ''))
+
+            if method == 'Network.loadingFailed' and params.get('blockedReason'):
+                resource_type = params.get('type') or resource_type
+                category = self._category(resource_type, url)
+                blocked[category] = blocked.get(category, 0) + 1
+                if resource_type in ALLOWED_RESOURCE_TYPES and category != 'analytics':
+                    needed_blocked.append(url)
+
+            elif method == 'Network.responseReceived' and params.get('type') in ALLOWED_RESOURCE_TYPES:
+                if self._category(params['type'], url) != 'analytics':
+                    needed.add(url.split('?', 1)[0])
+
+            elif method == 'Network.loadingFinished':
+                size = int(params.get('encodedDataLength') or 0)
+                transferred += size
+                category = self._category(resource_type, url)
+                if category != 'other':
+                    sizes.setdefault(category, []).append(size)
+
+        # Benötigte URLs merken - Muster die sie treffen werden ab dem nächsten Tab ausgelassen
+        needed.update(url.split('?', 1)[0] for url in needed_blocked)
+        self._learn(sizes, needed)
+
+        saved = 0
+        unknown = []
+        for category, count in blocked.items():
+            average = self.learned.get(category, {}).get('avg_bytes')
+            if average is None:
+                unknown.append(category)
+            else:
+                saved += int(count * average)
+
+        return {
+            'mode': self.mode,
+            'blocked_categories': self.active_categories,
+            'blocked_requests': sum(blocked.values()),
+            'blocked_by_category': blocked,
+            'bytes_transferred': transferred,
+            'bytes_saved_estimate': saved,
+            'unknown_size_categories': unknown,
+            'needed_blocked': needed_blocked,
+        }
+
+    def print_summary(self, summary: dict):
+        print("🚫 Ressourcen-Filter:")
+        print(f"   Blockiert: {summary['blocked_requests']} Requests {summary['blocked_by_category']}")
+        print(f"   Übertragen: {summary['bytes_transferred'] / 1024:.0f} KB")
+        print(f"   Eingespart (geschätzt): {summary['bytes_saved_estimate'] / 1024:.0f} KB")
+        for url in summary['needed_blocked'][:5]:
+            print(f"   ⚠️ Benötigte Ressource blockiert: {url}")
+        if summary['unknown_size_categories']:
+            print(f"   (keine gelernten Größen für {', '.join(summary['unknown_size_categories'])} -"
+                  f" einmal mit UNTIS_BLOCK_RESOURCES=measure laufen lassen)")
+
+    def _load_learned(self) -> dict:
+        try:
+            with open(RESOURCE_STATS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _learn(self, sizes: dict, needed: set = ()):
+        """Aktualisiert die durchschnittlichen Größen pro Kategorie und die benötigten URLs"""
+        known = self.learned.get('needed_urls', [])
+        new_needed = [url for url in sorted(needed) if url not in known]
+        if not sizes and not new_needed:
+            return
+        if new_needed:
+            self.learned['needed_urls'] = (known + new_needed)[-MAX_NEEDED_URLS:]
+        for category, values in sizes.items():
+            entry = self.learned.setdefault(category, {'avg_bytes': 0, 'samples': 0})
+            total = entry['avg_bytes'] * entry['samples'] + sum(values)
+            entry['samples'] += len(values)
+            entry['avg_bytes'] = round(total / entry['samples'])
+        try:
+            with open(RESOURCE_STATS_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self.learned, f, indent=2)
+        except OSError:
+            pass
+
+
+def resource_filter_from_env():
+    """ResourceFilter aus UNTIS_BLOCK_RESOURCES / UNTIS_BLOCK_CATEGORIES (None wenn aus)"""
+    mode = os.getenv('UNTIS_BLOCK_RESOURCES', 'off').lower()
+    if mode in ('true', '1', 'yes'):
+        mode = 'on'
+    if mode not in ('on', 'measure'):
+        return None
+
+    categories = os.getenv('UNTIS_BLOCK_CATEGORIES')
+    if categories:
+        return ResourceFilter(mode, [c.strip() for c in categories.split(',') if c.strip()])
+    return ResourceFilter(mode)
@@ -33,7 +33,21 @@ log "   User: $UNTIS_USERNAME"
 log "   Wochen: $UNTIS_WEEKS"
 log ""
 
-if python3 extractor.py >> "$LOG_FILE" 2>&1; then
+# Extractor-Daemon nutzen falls er läuft (warmer, eingeloggter Browser),
+# sonst Extractor direkt starten
+run_extractor() {
+    if [ -S "${UNTIS_DAEMON_SOCKET:-extractor.sock}" ]; then
+        python3 extractor_daemon.py extract
+        status=$?
+        if [ $status -ne 3 ]; then
+            return $status
+        fi
+        echo "⚠ Daemon nicht erreichbar - starte Extractor direkt"
+    fi
+    python3 extractor.py
+}
+
+if run_extractor >> "$LOG_FILE" 2>&1; then
     log "✅ Extraktion erfolgreich!"
     
     # Zähle extrahierte Dateien
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Laufzeit-Statistiken der Extractor-Backends
+Misst die Dauer einzelner Phasen und schreibt extractor_stats.json
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+STATS_FILE = 'extractor_stats.json'
+
+
+class PhaseTimer:
+    """Misst die Dauer einzelner Phasen (Login, Navigation, Extraktion, ...)"""
+
+    def __init__(self):
+        self.records = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append({
+                'phase': name,
+                'seconds': round(time.perf_counter() - start, 3)
+            })
+
+    def summary(self) -> dict:
+        """Fasst die Messungen pro Phase zusammen"""
+        result = {}
+        for record in self.records:
+            entry = result.setdefault(record['phase'], {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] = round(entry['total'] + record['seconds'], 3)
+            entry['max'] = max(entry['max'], record['seconds'])
+        return result
+
+    def print_summary(self):
+        print("⏱️  Phasen-Dauer:")
+        for name, entry in self.summary().items():
+            print(f"   {name:18} {entry['total']:7.2f}s  ({entry['count']}x, max {entry['max']:.2f}s)")
+
+
+def write_run_stats(timer: PhaseTimer, started: datetime, files: list, extra: dict = None):
+    """Speichert Laufzeit-Statistiken (Phasen-Dauer) für Vergleiche zwischen Läufen"""
+    finished = datetime.now()
+    stats = {
+        'started': started.isoformat(),
+        'finished': finished.isoformat(),
+        'total_seconds': round((finished - started).total_seconds(), 3),
+        'weeks_extracted': len(files),
+        'phases': timer.summary(),
+    }
+    stats.update(extra or {})
+
+    timer.print_summary()
+    print(f"   {'gesamt':18} {stats['total_seconds']:7.2f}s")
+
+    try:
+        with open(STATS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+    except OSError as e:
+        print(f"⚠ Statistik konnte nicht gespeichert werden: {e}")
+
+    return stats
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Verschlüsselte Session-Datei für WebUntis
+Speichert Cookies + localStorage einer eingeloggten Browser-Session,
+damit der nächste Lauf den Login überspringen kann
+"""
+
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+SESSION_FILE = '.untis_session'
+KDF_ITERATIONS = 200_000
+
+# Nur diese Cookie-Felder akzeptiert Selenium beim add_cookie
+COOKIE_FIELDS = ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry', 'sameSite')
+
+
+def _derive_key(secret: str, salt: bytes) -> bytes:
+    """Leitet einen Fernet-Key aus dem Secret ab"""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=KDF_ITERATIONS)
+    return base64.urlsafe_b64encode(kdf.derive(secret.encode()))
+
+
+class SessionStore:
+    """Lädt/speichert eine verschlüsselte WebUntis Session"""
+
+    def __init__(self, school_name: str, username: str, secret: str,
+                 path: str = SESSION_FILE, max_age_hours: float = 12):
+        self.school_name = school_name
+        self.username = username
+        self.secret = secret
+        self.path = path
+        self.max_age = timedelta(hours=max_age_hours)
+
+    def save(self, cookies: list, local_storage: dict):
+        """Verschlüsselt und speichert Cookies + localStorage"""
+        payload = {
+            'school': self.school_name,
+            'username': self.username,
+            'saved_at': datetime.now().isoformat(),
+            'cookies': [{k: c[k] for k in COOKIE_FIELDS if k in c} for c in cookies],
+            'localStorage': local_storage,
+        }
+
+        salt = os.urandom(16)
+        token = Fernet(_derive_key(self.secret, salt)).encrypt(json.dumps(payload).encode())
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'salt': base64.b64encode(salt).decode(), 'token': token.decode()}, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> dict:
+        """
+        Lädt die Session
+
+        Returns: Payload-Dict oder None (fehlt, abgelaufen, anderer Account, nicht entschlüsselbar)
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            salt = base64.b64decode(stored['salt'])
+            raw = Fernet(_derive_key(self.secret, salt)).decrypt(stored['token'].encode())
+            payload = json.loads(raw)
+        except (OSError, ValueError, KeyError, InvalidToken) as e:
+            print(f"  ⚠ Session-Datei nicht lesbar: {type(e).__name__} {e}")
+            return None
+
+        if payload.get('school') != self.school_name or payload.get('username') != self.username:
+            return None
+
+        saved_at = datetime.fromisoformat(payload['saved_at'])
+        if datetime.now() - saved_at > self.max_age:
+            print(f"  ⚠ Session zu alt (gespeichert {payload['saved_at']})")
+            return None
+
+        return payload
+
+    def clear(self):
+        """Löscht die Session-Datei (z.B. wenn abgelaufen)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Lokaler Index der Untis-Events im Google Calendar (SQLite, untis_state.db)
+Pro Event: uid, Event-ID, etag, Inhalts-Hash und Datum - dazu der syncToken in
+der meta-Tabelle. Jeder Schreibzugriff des Syncs wird sofort (in einer Transaktion)
+eingetragen; Änderungen von außen holt refresh_store() per syncToken.
+sync_all_weeks.py, remove_duplicates.py und cleanup_calendar.py arbeiten mit
+diesem Index statt den Kalender jedes Mal komplett zu listen.
+
+Nutzung:
+    python3 state_store.py verify     # Index mit dem Kalender vergleichen
+    python3 state_store.py rebuild    # Index aus dem Kalender neu aufbauen
+"""
+
+import json
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from googleapiclient.errors import HttpError
+
+STATE_DB = 'untis_state.db'
+PARSED_LESSONS_FILE = 'parsed_lessons_all_weeks.json'
+
+# Nur die Felder die der Index braucht (statt kompletter Events mit Beschreibung etc.)
+EVENT_FIELDS = 'id,etag,status,summary,location,start,created,extendedProperties/private'
+LIST_FIELDS = f'items({EVENT_FIELDS}),nextPageToken,nextSyncToken'
+
+
+# Vom Sync angelegte Events (serverseitig filterbar, aber nicht zusammen mit syncToken)
+SYNC_PROPERTY = 'untis_source=automated_sync'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    uid TEXT,
+    etag TEXT,
+    hash TEXT,
+    date TEXT,
+    start TEXT,
+    summary TEXT,
+    location TEXT,
+    created TEXT
+);
+CREATE INDEX IF NOT EXISTS events_uid ON events(uid);
+CREATE INDEX IF NOT EXISTS events_date ON events(date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+def is_untis_event(event: dict) -> bool:
+    """Vom Sync angelegt, oder sieht aus wie ein Untis-Event"""
+    extended = event.get('extendedProperties', {}).get('private', {})
+    if extended.get('untis_source') == 'automated_sync':
+        return True
+
+    summary = event.get('summary', '')
+    location = event.get('location', '')
+
+    # Prüfe ob es ein Untis-Event sein könnte
+    # Kriterien: Kurzer Name (< 10 Zeichen) UND Raum-Pattern (O + Zahlen)
+    is_short_name = len(summary) <= 10
+    has_room_pattern = location and (
+        location.startswith('O') and any(c.isdigit() for c in location)
+    )
+
+    # Nur Events die beides haben sind wahrscheinlich Untis-Events
+    return bool(is_short_name and has_room_pattern)
+
+
+def event_row(event: dict) -> tuple:
+    """Spalten der events-Tabelle für ein Event der Calendar API"""
+    extended = event.get('extendedProperties', {}).get('private', {})
+    start_info = event.get('start', {})
+    start = start_info.get('dateTime', start_info.get('date', ''))
+    return (
+        event['id'],
+        extended.get('untis_uid'),
+        event.get('etag'),
+        extended.get('untis_hash'),
+        start[:10],
+        start,
+        event.get('summary', ''),
+        event.get('location', ''),
+        event.get('created', ''),
+    )
+
+
+class StateStore:
+    """uid <-> Event-Index eines Kalenders"""
+
+    def __init__(self, path: str = STATE_DB, calendar_id: str = 'primary'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+        # Index gehört zu einem anderen Kalender - neu anfangen
+        if self.get_meta('calendar_id') != calendar_id:
+            with self.conn:
+                self.conn.execute('DELETE FROM events')
+                self.conn.execute('DELETE FROM meta')
+                self._set_meta('calendar_id', calendar_id)
+
+    def get_meta(self, key: str):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, key: str, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    @property
+    def sync_token(self):
+        return self.get_meta('sync_token')
+
+    def apply_changes(self, items: list, sync_token, full: bool = False):
+        """Gelistete Events übernehmen - zusammen mit dem neuen syncToken in einer Transaktion"""
+        with self.conn:
+            if full:
+                self.conn.execute('DELETE FROM events')
+            for item in items:
+                if item.get('status') == 'cancelled' or not is_untis_event(item):
+                    self.conn.execute('DELETE FROM events WHERE event_id = ?', (item['id'],))
+                else:
+                    self.conn.execute('INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                      event_row(item))
+            self._set_meta('sync_token', sync_token)
+
+    def upsert_event(self, event: dict):
+        """Nach insert/patch: Antwort der API eintragen"""
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                              event_row(event))
+
+    def delete_event(self, event_id: str):
+        with self.conn:
+            self.conn.execute('DELETE FROM events WHERE event_id = ?', (event_id,))
+
+    def events(self, date_min: str = None, date_max: str = None) -> list:
+        """Events im Zeitraum (YYYY-MM-DD, inklusive), nach Start sortiert"""
+        query = 'SELECT * FROM events WHERE date >= ? AND date <= ? ORDER BY start'
+        return self.conn.execute(query, (date_min or '', date_max or '9999')).fetchall()
+
+    def duplicate_groups(self, date_min: str = None, date_max: str = None) -> dict:
+        """uid -> Events (älteste zuerst) für alle uids mit mehr als einem Event"""
+        rows = self.conn.execute(
+            '''SELECT * FROM events WHERE uid IN (
+                   SELECT uid FROM events WHERE uid IS NOT NULL AND date >= ? AND date <= ?
+                   GROUP BY uid HAVING COUNT(*) > 1)
+               ORDER BY uid, created''',
+            (date_min or '', date_max or '9999')
+        ).fetchall()
+        groups = {}
+        for row in rows:
+            groups.setdefault(row['uid'], []).append(row)
+        return groups
+
+    def count(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def new_transfer_stats() -> dict:
+    return {'requests': 0, 'bytes': 0}
+
+
+def format_transfer(stats: dict) -> str:
+    return f"{stats['requests']} Requests, ~{stats['bytes'] / 1024:.1f} KB"
+
+
+def list_events(service, calendar_id: str, stats: dict = None, **params) -> tuple:
+    """
+    Alle Seiten eines events().list - gibt (Events, nextSyncToken) zurück
+    stats zählt Requests und (ungefähr, als JSON ohne Kompression) übertragene Bytes.
+    """
+    all_events = []
+    page_token = None
+    params.setdefault('fields', LIST_FIELDS)
+
+    # Paginate durch ALLE Events (nicht nur erste 1000)
+    # Für den Index ohne timeMin/timeMax/orderBy/privateExtendedProperty und ohne
+    # singleEvents (Serien bleiben ein Event) - damit gibt es keinen syncToken
+    while True:
+        events_result = service.events().list(
+            calendarId=calendar_id,
+            maxResults=2500,  # Maximum pro Request
+            pageToken=page_token,
+            **params
+        ).execute()
+
+        if stats is not None:
+            stats['requests'] += 1
+            stats['bytes'] += len(json.dumps(events_result, ensure_ascii=False).encode('utf-8'))
+
+        all_events.extend(events_result.get('items', []))
+
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            return all_events, events_result.get('nextSyncToken')
+
+
+def refresh_store(service, store: StateStore, calendar_id: str = 'primary', stats: dict = None) -> tuple:
+    """
+    Index auf den Stand des Kalenders bringen: mit syncToken nur Änderungen, ohne
+    Token oder bei 410 GONE einmal komplett. Gibt (Anzahl Events, inkrementell) zurück.
+    """
+    sync_token = store.sync_token
+    if sync_token:
+        try:
+            changes, next_token = list_events(service, calendar_id, stats, syncToken=sync_token)
+            store.apply_changes(changes, next_token)
+            return len(changes), True
+        except HttpError as error:
+            if error.resp.status != 410:
+                raise
+            print("  ⚠ Sync-Token abgelaufen - lade Kalender komplett")
+
+    events, next_token = list_events(service, calendar_id, stats)
+    store.apply_changes(events, next_token, full=True)
+    return len(events), False
+
+
+def verify_store(service, store: StateStore, calendar_id: str = 'primary', stats: dict = None) -> dict:
+    """Vergleicht die vom Sync angelegten Events im Index mit dem Kalender (serverseitig gefiltert)"""
+    remote_events, _ = list_events(service, calendar_id, stats,
+                                   privateExtendedProperty=SYNC_PROPERTY,
+                                   fields='items(id,etag,status),nextPageToken')
+    remote = {event['id']: event.get('etag') for event in remote_events
+              if event.get('status') != 'cancelled'}
+    local = {row['event_id']: row['etag'] for row in store.events() if row['uid']}
+
+    return {
+        'missing': sorted(set(remote) - set(local)),     # im Kalender, nicht im Index
+        'stale': sorted(set(local) - set(remote)),       # im Index, nicht mehr im Kalender
+        'changed': sorted(event_id for event_id in set(local) & set(remote)
+                          if local[event_id] != remote[event_id]),
+    }
+
+
+def parsed_date_range(path: str = PARSED_LESSONS_FILE):
+    """(erstes, letztes) Datum der zuletzt geparsten Lessons - None wenn nicht vorhanden"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            dates = [lesson['date'] for lesson in json.load(f)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return (min(dates), max(dates)) if dates else None
+
+
+def date_window(date_range=None, days_back: int = 7, days_forward: int = 90) -> tuple:
+    """
+    Zeitraum (YYYY-MM-DD, inklusive) für Abfragen: ganze Wochen um die geparsten
+    Lessons, sonst days_back Tage zurück bis days_forward Tage voraus
+    """
+    if date_range:
+        first = datetime.strptime(date_range[0], '%Y-%m-%d')
+        last = datetime.strptime(date_range[1], '%Y-%m-%d')
+        first -= timedelta(days=first.weekday())
+        last += timedelta(days=6 - last.weekday())
+    else:
+        now = datetime.utcnow()
+        first = now - timedelta(days=days_back)
+        last = now + timedelta(days=days_forward)
+    return first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')
+
+
+def main():
+    from remove_duplicates import authenticate
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    if command not in ('verify', 'rebuild'):
+        print("Nutzung: python3 state_store.py [verify|rebuild]")
+        return 1
+
+    service = authenticate()
+    store = StateStore()
+    stats = new_transfer_stats()
+
+    if command == 'rebuild':
+        events, next_token = list_events(service, 'primary', stats)
+        store.apply_changes(events, next_token, full=True)
+        print(f"✓ Index neu aufgebaut: {store.count()} Untis-Events ({len(events)} Events gelistet)")
+        print(f"📦 Übertragen: {format_transfer(stats)}")
+        return 0
+
+    result = verify_store(service, store, stats=stats)
+    print(f"📦 Übertragen: {format_transfer(stats)}")
+    print(f"📊 {store.count()} Untis-Events im Index")
+    print(f"   - {len(result['missing'])} vom Sync angelegte fehlen im Index")
+    print(f"   - {len(result['stale'])} existieren nicht mehr im Kalender")
+    print(f"   - {len(result['changed'])} mit anderem etag")
+    if any(result.values()):
+        print("⚠ Index weicht ab - 'python3 state_store.py rebuild' baut ihn neu auf")
+        return 1
+    print("✓ Index stimmt mit dem Kalender überein")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,8 +8,12 @@ import os
 import sys
 import json
 import glob
+import time
 from pathlib import Path
-from untis_sync_improved import ImprovedUntisParser, GoogleCalendarSync, UntisLesson
+from untis_sync_improved import GoogleCalendarSync
+from parallel_parse import parse_week_files, parse_workers
+from state_store import format_transfer
+from reconcile import week_start
 
 def sync_all_weeks():
     print("=" * 60)
@@ -28,37 +32,53 @@ def sync_all_weeks():
     for f in week_files:
         print(f"   - {f}")
     
-    # Parse alle Wochen
+    # Parse alle Wochen (parallel in Prozessen, Ausgabe in Datei-Reihenfolge)
     all_lessons = []
+    keep_weeks = set()  # nach Render-Timeout gespeichert - dort nichts löschen
+    workers = parse_workers(len(week_files))
+    print(f"\n⚙️  Parse mit {workers} Prozess(en)")
     
-    for week_file in week_files:
+    parse_started = time.perf_counter()
+    results = parse_week_files(week_files, workers)
+    parse_seconds = time.perf_counter() - parse_started
+    
+    for result in results:
+        week_file = result['path']
         week_num = Path(week_file).stem.split('_')[1]
         
         print(f"\n{'='*60}")
         print(f"📖 Verarbeite Woche {week_num}: {week_file}")
         print(f"{'='*60}")
+        print(result['log'], end='')
         
-        try:
-            parser = ImprovedUntisParser(week_file)
-            lessons = parser.parse_lessons()
-            
-            if len(lessons) == 0:
-                print(f"⚠️  Keine Lessons gefunden - möglicherweise Ferien oder kein Stundenplan veröffentlicht")
-            else:
-                print(f"✓ {len(lessons)} Lessons aus Woche {week_num} geparsed")
-                
-                # Zeige Datum-Range
-                if lessons:
-                    dates = sorted(set(l.date for l in lessons))
-                    print(f"  Datumsbereich: {dates[0]} bis {dates[-1]}")
+        if result['error']:
+            print(f"❌ Fehler beim Parsen von Woche {week_num}: {result['error']}")
+            continue
+        
+        lessons = result['lessons']
+        if len(lessons) == 0:
+            print(f"⚠️  Keine Lessons gefunden - möglicherweise Ferien oder kein Stundenplan veröffentlicht")
+        else:
+            print(f"✓ {len(lessons)} Lessons aus Woche {week_num} geparsed ({result['seconds'] * 1000:.0f} ms)")
             
-            all_lessons.extend(lessons)
+            # Zeige Datum-Range
+            if lessons:
+                dates = sorted(set(l.date for l in lessons))
+                print(f"  Datumsbereich: {dates[0]} bis {dates[-1]}")
             
-        except Exception as e:
-            print(f"❌ Fehler beim Parsen von Woche {week_num}: {e}")
-            import traceback
-            traceback.print_exc()
-            continue
+            if not result['complete']:
+                print(f"⚠️  Woche {week_num} wurde nach einem Timeout gespeichert - es wird nichts gelöscht")
+                keep_weeks.update(week_start(l.date) for l in lessons)
+        
+        all_lessons.extend(lessons)
+    
+    parse_total = sum(r['seconds'] for r in results)
+    print(f"\n⏱️  Parsen: {parse_seconds:.2f}s (Summe pro Datei {parse_total:.2f}s, {workers} Prozess(e))")
+    
+    hits = sum(1 for r in results if r['cache'] == 'hit')
+    misses = sum(1 for r in results if r['cache'] == 'miss')
+    if hits or misses:
+        print(f"♻️  Parse-Cache: {hits} Treffer, {misses} neu geparst")
     
     if not all_lessons:
         print("\n❌ Keine Lessons gefunden!")
@@ -97,16 +117,27 @@ def sync_all_weeks():
     print(f"{'='*60}\n")
     
     try:
-        syncer = GoogleCalendarSync()
-        created, duplicates, failed = syncer.sync_lessons_silent(all_lessons)
+        # Abgleich nur im Zeitraum der geparsten Lessons (ganze Wochen)
+        syncer = GoogleCalendarSync(date_range=(all_lessons[0].date, all_lessons[-1].date))
+        # Entfallene Stunden löschen (nur in Wochen mit geparsten Lessons)
+        delete = os.getenv('UNTIS_SYNC_DELETE', 'true').lower() == 'true'
+        counts = syncer.reconcile(all_lessons, delete=delete, keep_weeks=keep_weeks)
         
         print(f"\n{'='*60}")
         print("✅ Synchronisation abgeschlossen!")
         print(f"{'='*60}")
-        print(f"✓ Neu erstellt: {created}")
-        print(f"⊘ Übersprungen (Duplikate): {duplicates}")
-        if failed > 0:
-            print(f"✗ Fehlgeschlagen: {failed}")
+        print(f"✓ Neu erstellt: {counts['insert']}")
+        print(f"✎ Aktualisiert: {counts['patch']}")
+        print(f"🗑️  Gelöscht: {counts['delete']}")
+        print(f"⊘ Unverändert: {counts['unchanged']}")
+        if counts['failed'] > 0:
+            print(f"✗ Fehlgeschlagen: {counts['failed']}")
+        stats = syncer.write_stats
+        if stats.get('requests'):
+            mode = f"in {stats['batches']} Batches" if stats['batches'] else "einzeln"
+            print(f"⏱️  Kalender: {stats['requests']} Requests {mode}, "
+                  f"{stats['seconds']:.1f}s ({stats['requests_per_second']}/s)")
+        print(f"📦 Kalender-Listing: {format_transfer(syncer.list_stats)}")
         print(f"{'='*60}\n")
         
         return 0
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Parallele Extraktion mit mehr Wochen als Tabs (Nachfüllen und Wiederholungen)
+Läuft ohne Browser: ein Fake-Driver verhält sich bei geschlossenen Fenstern wie Selenium.
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from selenium.common.exceptions import NoSuchWindowException
+
+import extractor
+from extractor import UntisAutoExtractor
+from resilience import RetryPolicy, CircuitBreaker
+from run_stats import PhaseTimer
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def _require_current(self):
+        if self.driver.current not in self.driver.handles:
+            raise NoSuchWindowException('no such window: target window already closed')
+
+    def new_window(self, kind):
+        self._require_current()
+        self.driver.counter += 1
+        handle = f'tab{self.driver.counter}'
+        self.driver.handles.append(handle)
+        self.driver.current = handle
+
+    def window(self, handle):
+        if handle not in self.driver.handles:
+            raise NoSuchWindowException(f'no such window: {handle}')
+        self.driver.current = handle
+
+
+class FakeDriver:
+    name = 'firefox'
+    current_url = 'https://example/timetable/my-student'
+
+    def __init__(self):
+        self.handles = ['main']
+        self.current = 'main'
+        self.counter = 0
+        self.switch_to = FakeSwitchTo(self)
+
+    @property
+    def current_window_handle(self):
+        self.switch_to._require_current()
+        return self.current
+
+    def execute_script(self, script, *args):
+        self.switch_to._require_current()
+
+    def close(self):
+        self.switch_to._require_current()
+        self.handles.remove(self.current)
+
+
+class ReadyAtOnce:
+    def check(self, driver):
+        return 'lessons'
+
+
+def make_extractor(concurrency: int, retries: int = 0) -> UntisAutoExtractor:
+    ex = UntisAutoExtractor.__new__(UntisAutoExtractor)
+    ex.driver = FakeDriver()
+    ex.concurrency = concurrency
+    ex.timer = PhaseTimer()
+    ex.retry = RetryPolicy(retries=retries, base_delay=0.0)
+    ex.breaker = CircuitBreaker(threshold=10)
+    ex.refresh = None
+    ex.resource_filter = None
+    ex.debug = mock.Mock()
+    ex.week_url = lambda week, entity=None: (f'2025-10-{20 + week:02d}', f'https://example/{week}')
+    ex.extract_data = lambda: {'timetable': {'lessons': []}}
+    return ex
+
+
+class ExtractWeeksParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(extractor, 'TimetableReadiness', ReadyAtOnce),
+            mock.patch.object(extractor, 'save_week_file'),
+            mock.patch.object(extractor, 'POLL_INTERVAL', 0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_more_jobs_than_tabs(self):
+        ex = make_extractor(concurrency=2)
+        jobs = [(None, week) for week in range(5)]
+
+        files = ex.extract_weeks_parallel(jobs)
+
+        self.assertEqual(len(files), 5)
+        self.assertEqual(ex.driver.handles, ['main'])
+        self.assertEqual(ex.driver.current, 'main')
+
+    def test_retry_requeue_opens_new_tab(self):
+        ex = make_extractor(concurrency=1, retries=1)
+        calls = {'count': 0}
+
+        def flaky_extract():
+            calls['count'] += 1
+            if calls['count'] == 1:
+                raise Exception('kurzer Aussetzer')
+            return {'timetable': {'lessons': []}}
+
+        ex.extract_data = flaky_extract
+        ex.recover_session = lambda: True
+
+        files = ex.extract_weeks_parallel([(None, 0), (None, 1)])
+
+        self.assertEqual(len(files), 2)
+        self.assertEqual(ex.driver.handles, ['main'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+HTTP-Backend gegen den Replay-Server: Login + Woche aus einer kleinen Aufzeichnung,
+nicht aufgezeichnete Requests bekommen 404
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+
+from extractor import create_extractor_from_env
+from http_extractor import UntisHttpExtractor, TIMETABLE_ENTRIES_PATH
+from recording import ResponseRecorder, load_recordings
+from replay_server import ReplayHandler
+from untis_sync_improved import ImprovedUntisParser
+from week_files import save_week_file
+
+SCHOOL = 'Test Schule'
+PERSON_ID = 4711
+HOST = 'http://untis.test'
+
+
+def week_params(monday: datetime) -> dict:
+    """Query des Timetable-Requests wie UntisHttpExtractor.fetch_week ihn baut"""
+    return {
+        'start': monday.strftime('%Y-%m-%d'),
+        'end': (monday + timedelta(days=6)).strftime('%Y-%m-%d'),
+        'format': 4,
+        'resourceType': 'STUDENT',
+        'resources': PERSON_ID,
+        'periodTypes': '',
+        'timetableType': 'MY_TIMETABLE',
+    }
+
+
+def grid_entry(day: str, start: str, end: str, subject: str, teacher: str, room: str) -> dict:
+    def resource(kind, name):
+        return [{'current': {'type': kind, 'shortName': name}}]
+    return {
+        'duration': {'start': f'{day}T{start}', 'end': f'{day}T{end}'},
+        'position1': resource('TEACHER', teacher),
+        'position2': resource('SUBJECT', subject),
+        'position3': resource('ROOM', room),
+    }
+
+
+def write_recording(directory: str, monday: datetime):
+    recorder = ResponseRecorder(directory)
+    json_type = 'application/json'
+    day = monday.strftime('%Y-%m-%d')
+    entries = {'days': [{'date': day, 'gridEntries': [
+        grid_entry(day, '08:00', '08:45', 'M', 'Fay', 'O1-01'),
+        grid_entry(day, '08:50', '09:35', 'D', 'Kim', 'O2-17'),
+    ]}]}
+
+    recorder.record('GET', f"{HOST}/WebUntis/?{urlencode({'school': SCHOOL})}", 200, 'text/html', b'<html></html>')
+    recorder.record('POST', f'{HOST}/WebUntis/j_spring_security_check', 200, json_type,
+                    json.dumps({'state': 'SUCCESS'}).encode())
+    recorder.record('GET', f'{HOST}/WebUntis/api/token/new', 200, 'text/plain', b'jwt-token')
+    recorder.record('GET', f'{HOST}/WebUntis/api/rest/view/v1/app/data', 200, json_type,
+                    json.dumps({'user': {'person': {'id': PERSON_ID}}, 'tenant': {'id': 1}}).encode())
+    recorder.record('GET', f'{HOST}{TIMETABLE_ENTRIES_PATH}?{urlencode(week_params(monday))}', 200,
+                    json_type, json.dumps(entries).encode())
+
+
+class HttpReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        recording_dir = os.path.join(self.tmp.name, 'recording')
+
+        today = datetime.now()
+        self.monday = today - timedelta(days=today.weekday())
+        write_recording(recording_dir, self.monday)
+
+        handler = type('TestReplayHandler', (ReplayHandler,), {
+            'directory': recording_dir,
+            'entries': load_recordings(recording_dir),
+            'log_message': lambda self, format, *args: None,
+        })
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def extractor_from_env(self) -> UntisHttpExtractor:
+        env = {
+            'UNTIS_BACKEND': 'http',
+            'UNTIS_BASE_URL': self.base_url,
+            'UNTIS_SCHOOL': SCHOOL,
+            'UNTIS_USERNAME': 'schueler',
+            'UNTIS_PASSWORD': 'geheim',
+            'UNTIS_REFRESH_INTERVALS': '0',
+            'UNTIS_RETRIES': '0',
+        }
+        with mock.patch.dict(os.environ, env), mock.patch('builtins.print'):
+            extractor, _ = create_extractor_from_env()
+        self.assertIsInstance(extractor, UntisHttpExtractor)
+        return extractor
+
+    def test_login_and_fetch_week_produce_parsable_file(self):
+        extractor = self.extractor_from_env()
+        with mock.patch('builtins.print'):
+            extractor.login()
+            date_str, data = extractor.fetch_week(0)
+
+        self.assertEqual(date_str, self.monday.strftime('%Y-%m-%d'))
+        path = os.path.join(self.tmp.name, 'week_1.json')
+        save_week_file(path, data)
+        with mock.patch('builtins.print'):
+            lessons = ImprovedUntisParser(path).parse_lessons()
+
+        self.assertEqual([(l.start_time, l.subject, l.teacher, l.room) for l in lessons],
+                         [('08:00', 'M', 'Fay', 'O1-01'), ('08:50', 'D', 'Kim', 'O2-17')])
+        self.assertTrue(all(l.date == date_str for l in lessons))
+
+    def test_unrecorded_week_is_404(self):
+        next_week = week_params(self.monday + timedelta(weeks=1))
+        response = requests.get(f'{self.base_url}{TIMETABLE_ENTRIES_PATH}', params=next_week, timeout=5)
+        self.assertEqual(response.status_code, 404)
+
+        extractor = self.extractor_from_env()
+        with mock.patch('builtins.print'):
+            extractor.login()
+            with self.assertRaises(requests.HTTPError):
+                extractor.fetch_week(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""wait_for_login_result: vorhandene Banner dürfen einen langsamen Login nicht als Fehler melden"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from readiness import wait_for_login_result, login_error_texts, LOGIN_ERRORS_JS
+
+
+class FakeLoginPage:
+    """Login-Seite mit Banner; nach `redirect_after` Prüfungen Weiterleitung oder neuer Fehler"""
+
+    def __init__(self, banner='Wartungsarbeiten am Samstag', outcome='redirect', redirect_after=3):
+        self.url = 'https://example/WebUntis/?school=x#/basic/login'
+        self.errors = [banner] if banner else []
+        self.outcome = outcome
+        self.redirect_after = redirect_after
+        self.checks = 0
+
+    @property
+    def current_url(self):
+        self.checks += 1
+        if self.checks > self.redirect_after:
+            if self.outcome == 'redirect':
+                self.url = 'https://example/timetable/my-student'
+            elif 'Ungültiger Benutzername' not in self.errors:
+                self.errors.append('Ungültiger Benutzername oder Passwort')
+        return self.url
+
+    def execute_script(self, script, *args):
+        if script == LOGIN_ERRORS_JS:
+            return list(self.errors)
+        return True  # Formular bedienbar
+
+
+class LoginResultTest(unittest.TestCase):
+
+    def test_existing_banner_is_not_an_error(self):
+        page = FakeLoginPage(outcome='redirect')
+        known = login_error_texts(page)
+        self.assertEqual(wait_for_login_result(page, page.url, timeout=5, known_errors=known), 'url_changed')
+
+    def test_new_error_is_reported(self):
+        page = FakeLoginPage(outcome='error')
+        known = login_error_texts(page)
+        self.assertEqual(wait_for_login_result(page, page.url, timeout=5, known_errors=known), 'error')
+
+
+if __name__ == '__main__':
+    unittest.main()
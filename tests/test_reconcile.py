@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""plan_sync: Raumwechsel patchen, halb geladene Wochen nicht ausdünnen"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from reconcile import plan_sync, lesson_hash
+from untis_sync_improved import UntisLesson
+
+
+def lesson(date, start, subject, room='O1-01'):
+    return UntisLesson(start, f'{int(start[:2]) + 1:02d}{start[2:]}', subject, 'Fay', room, date)
+
+
+def index_of(lessons):
+    """existing_events wie von GoogleCalendarSync geladen"""
+    existing = {'by_uid': {}, 'by_signature': {}, 'by_id': {}}
+    for i, l in enumerate(lessons):
+        event_id = f'ev{i}'
+        existing['by_uid'][l.uid] = event_id
+        existing['by_id'][event_id] = {'uid': l.uid, 'hash': lesson_hash(l), 'date': l.date,
+                                       'start': l.start_time, 'summary': l.subject}
+    return existing
+
+
+WEEK = [lesson('2025-10-20', '08:00', 'M'), lesson('2025-10-20', '09:00', 'D'),
+        lesson('2025-10-21', '08:00', 'E'), lesson('2025-10-22', '10:00', 'PH')]
+
+
+class PlanSyncTest(unittest.TestCase):
+
+    def test_room_change_is_patched(self):
+        moved = lesson('2025-10-20', '09:00', 'D', room='O2-17')
+        plan = plan_sync([WEEK[0], moved, WEEK[2], WEEK[3]], index_of(WEEK))
+
+        self.assertEqual(plan.patches, [('ev1', moved)])
+        self.assertEqual((plan.inserts, plan.deletes), ([], []))
+
+    def test_cancelled_lesson_is_deleted(self):
+        plan = plan_sync(WEEK[:3], index_of(WEEK))
+        self.assertEqual(plan.deletes, ['ev3'])
+
+    def test_sharp_drop_keeps_week(self):
+        plan = plan_sync(WEEK[:1], index_of(WEEK))
+        self.assertEqual(plan.deletes, [])
+        self.assertIn('2025-10-20', plan.kept_weeks)
+
+    def test_timeout_week_keeps_events(self):
+        plan = plan_sync(WEEK[:3], index_of(WEEK), keep_weeks={'2025-10-20'})
+        self.assertEqual(plan.deletes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
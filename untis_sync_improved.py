@@ -12,51 +12,84 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import os
 import pickle
+import sys
+import time
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import hashlib
+from normalize import lesson_uid, lesson_signature
+from resilience import retry_policy_from_env
+from reconcile import lesson_hash, plan_sync
+from state_store import (StateStore, refresh_store, date_window, new_transfer_stats, format_transfer,
+                         EVENT_FIELDS)
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# Calendar API: max. 50 Requests pro Batch
+BATCH_LIMIT = 50
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Version der Parser-Ausgabe - bei Änderungen erhöhen (macht den Parse-Cache ungültig)
+PARSER_VERSION = 1
+
+# Vorkompilierte Muster für den DOM-Parser
+TIME_PATTERN = re.compile(r'\d{2}:\d{2}')
+ROOM_PATTERN = re.compile(r'O\d{3,4}')
+ROOM_LIST_PATTERN = re.compile(r'(O\d{3,4}(?:,\s*\+O\d{3,4})*)')
+
 class UntisLesson:
-    """Repräsentiert eine einzelne Unterrichtsstunde"""
+    """
+    Repräsentiert eine einzelne Unterrichtsstunde (unveränderlich)
+    Slots statt __dict__ und internierte Strings - bei vielen tausend Lessons
+    teilen sich alle Stunden eines Fachs/Lehrers/Raums dasselbe String-Objekt.
+    Die uid wird erst beim ersten Zugriff berechnet.
+    """
+    __slots__ = ('start_time', 'end_time', 'subject', 'teacher', 'room', 'date', 'note',
+                 '_uid', '_signature')
+
     def __init__(self, start_time: str, end_time: str, subject: str, 
-                 teacher: str, room: str, date: str):
-        self.start_time = start_time
-        self.end_time = end_time
-        self.subject = subject
-        self.teacher = teacher
-        self.room = room
-        self.date = date
-        
-        # Erstelle eine eindeutige ID für Duplikat-Erkennung
-        self.uid = self._generate_uid()
-    
-    def _generate_uid(self) -> str:
-        """Generiert eine eindeutige ID für diese Lesson"""
-        # Normalisiere Raum: entferne Raumänderungen aber behalte Hauptraum
-        # "+O1101, O1104" -> "O1104" (nimm zweiten wenn erster mit + beginnt)
-        # "O1027, +O1101, +O1102" -> "O1027" (nimm ersten)
-        # "N/A" -> "N/A"
-        room_parts = [r.strip() for r in self.room.split(',')]
-        
-        # Filter: Nimm ersten Raum der NICHT mit + beginnt
-        room_normalized = None
-        for part in room_parts:
-            clean_part = part.lstrip('+').strip()
-            if clean_part and clean_part != 'N/A':
-                room_normalized = clean_part
-                break
-        
-        # Fallback auf originalen Raum wenn nichts gefunden
-        if not room_normalized:
-            room_normalized = room_parts[0].lstrip('+').strip() if room_parts else self.room
-        
-        data = f"{self.date}_{self.start_time}_{self.end_time}_{self.subject}_{room_normalized}"
-        return hashlib.md5(data.encode()).hexdigest()[:16]
+                 teacher: str, room: str, date: str, note: Optional[str] = None,
+                 uid: Optional[str] = None):
+        _set = object.__setattr__
+        _set(self, 'start_time', sys.intern(start_time))
+        _set(self, 'end_time', sys.intern(end_time))
+        _set(self, 'subject', sys.intern(subject))
+        _set(self, 'teacher', sys.intern(teacher))
+        _set(self, 'room', sys.intern(room))
+        _set(self, 'date', sys.intern(date))
+        _set(self, 'note', note or None)
+        if uid:
+            _set(self, '_uid', uid)  # bereits berechnet (Parse-Cache, Parse-Prozess)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"UntisLesson ist unveränderlich ({name})")
+    
+    def __reduce__(self):
+        # Kompakt picklen (Parse-Prozesse) - Strings werden beim Laden neu interniert
+        return (UntisLesson, (self.start_time, self.end_time, self.subject, self.teacher,
+                              self.room, self.date, self.note, getattr(self, '_uid', None)))
+    
+    @property
+    def uid(self) -> str:
+        """Eindeutige ID für Duplikat-Erkennung (lazy)"""
+        try:
+            return self._uid
+        except AttributeError:
+            uid = lesson_uid(self.date, self.start_time, self.end_time, self.subject, self.room)
+            object.__setattr__(self, '_uid', uid)
+            return uid
+    
+    @property
+    def signature(self) -> str:
+        """Signatur Datum_Zeit_Fach_Raum für Events ohne untis_uid (lazy)"""
+        try:
+            return self._signature
+        except AttributeError:
+            signature = lesson_signature(self.date, self.start_time, self.subject, self.room)
+            object.__setattr__(self, '_signature', signature)
+            return signature
     
     def __repr__(self):
         return f"Lesson({self.date} {self.start_time}-{self.end_time}: {self.subject} @ {self.room})"
@@ -72,19 +105,71 @@ class UntisLesson:
             'room': self.room
         }
         # Füge Notiz hinzu falls vorhanden
-        if hasattr(self, 'note') and self.note:
+        if self.note:
             result['note'] = self.note
         return result
 
+
+class LessonTable:
+    """
+    Spaltenweiser Container für große Lesson-Mengen (z.B. ganze Schule über ein Halbjahr)
+    Eine Liste pro Feld statt eines Objekts pro Lesson; Lessons werden beim Zugriff erzeugt.
+    """
+    FIELDS = ('start_time', 'end_time', 'subject', 'teacher', 'room', 'date', 'note')
+    __slots__ = FIELDS
+
+    def __init__(self, lessons=()):
+        for field in self.FIELDS:
+            setattr(self, field, [])
+        self.extend(lessons)
+
+    def append(self, lesson: UntisLesson):
+        for field in self.FIELDS:
+            getattr(self, field).append(getattr(lesson, field))
+
+    def extend(self, lessons):
+        for lesson in lessons:
+            self.append(lesson)
+
+    def __len__(self):
+        return len(self.date)
+
+    def __getitem__(self, index: int) -> UntisLesson:
+        return UntisLesson(*(getattr(self, field)[index] for field in self.FIELDS))
+
+    def __iter__(self):
+        for row in zip(*(getattr(self, field) for field in self.FIELDS)):
+            yield UntisLesson(*row)
+
+    def sort(self):
+        """Sortiert nach Datum und Startzeit (wie sync_all_weeks)"""
+        order = sorted(range(len(self)), key=lambda i: (self.date[i], self.start_time[i]))
+        for field in self.FIELDS:
+            column = getattr(self, field)
+            setattr(self, field, [column[i] for i in order])
+
+def _first_ok(ok: list, i: int, n: int):
+    """Index des ersten passenden Elements in i..i+2 (None wenn keins)"""
+    if ok[i]:
+        return i
+    if i + 1 < n and ok[i + 1]:
+        return i + 1
+    if i + 2 < n and ok[i + 2]:
+        return i + 2
+    return None
+
 class ImprovedUntisParser:
     """Verbesserter Parser der mehrere Tage/Wochen unterstützt"""
     
-    def __init__(self, json_file: str):
+    def __init__(self, json_file: str, engine: str = None):
         with open(json_file, 'r', encoding='utf-8') as f:
             self.data = json.load(f)
         
         self.base_date = self._extract_date_from_url()
         
+        # DOM-Parser: 'fast' (ein Durchlauf, Standard) oder 'legacy' (Lookahead pro Card)
+        self.engine = (engine or os.getenv('UNTIS_PARSER_ENGINE', 'fast')).lower()
+        
     def _extract_date_from_url(self) -> str:
         """Extrahiert das Datum aus der URL"""
         url = self.data['timetable']['url']
@@ -95,6 +180,20 @@ class ImprovedUntisParser:
     
     def parse_lessons(self) -> List[UntisLesson]:
         """Parst alle Lessons - erkennt Wochentage durch Zeit-Resets"""
+        # Mitgeschnittene Timetable-JSON (UNTIS_EXTRACT_MODE=api)
+        if self.data.get('format') == 'api':
+            return self._parse_api_lessons()
+        
+        # Ein Record pro Lesson-Card (UNTIS_EXTRACT_MODE=compact)
+        if self.data.get('format') == 'compact':
+            return self._parse_compact_lessons()
+        
+        if self.engine == 'legacy':
+            return self._parse_dom_legacy()
+        return self._parse_dom_single_pass()
+    
+    def _parse_dom_legacy(self) -> List[UntisLesson]:
+        """Ursprünglicher DOM-Parser - scannt ab jeder Lesson-Card bis zu 35 Elemente"""
         lessons = []
         raw_lessons = self.data['timetable']['lessons']
         
@@ -146,6 +245,297 @@ class ImprovedUntisParser:
         
         return lessons
     
+    def _parse_dom_single_pass(self) -> List[UntisLesson]:
+        """
+        DOM-Parser in linearer Zeit - liefert dieselben Lessons wie _parse_dom_legacy
+        
+        Jedes Element wird in einem Rückwärts-Durchlauf einmal klassifiziert
+        (vorkompilierte Muster), jede Card findet ihre Felder dabei in O(1)
+        statt per 35er-Lookahead. Die Wochentage werden vorab berechnet.
+        """
+        raw_lessons = self.data['timetable']['lessons']
+        n = len(raw_lessons)
+        
+        print(f"Analysiere {n} Einträge...")
+        print(f"Basis-Datum aus URL: {self.base_date}")
+        
+        # Sieben Tage der Woche vorab (mehr Tag-Wechsel als 7 werden bei Bedarf ergänzt)
+        base = datetime.strptime(self.base_date, '%Y-%m-%d')
+        monday = base - timedelta(days=base.weekday())
+        day_dates = [(monday + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(7)]
+        
+        # Ein Durchlauf rückwärts über alle Elemente: jedes Element wird einmal
+        # klassifiziert, die Cards bekommen dabei das jeweils nächste Feld-Element
+        # mit Wert ((Feld-Index, Wert-Text) - wie "if not teacher" im Legacy-Parser)
+        # und das nächste Stop-Element (nächste Card) als Grenze ihres Bereichs.
+        short_ok = [False] * (n + 2)
+        room_ok = [False] * (n + 2)
+        note_ok = [False] * (n + 2)
+        texts = [''] * n
+        next_teacher = next_subject = next_room = next_note = None
+        next_stop = n
+        cards = []  # (Index, Lehrer, Fach, Raum, Notiz, Stop) in umgekehrter Reihenfolge
+        
+        for i in range(n - 1, -1, -1):
+            item = raw_lessons[i]
+            text = item.get('text', '').strip()
+            class_name = item.get('className', '')
+            testid = item.get('dataset', {}).get('testid', '')
+            texts[i] = text
+            
+            if text:
+                is_room = ROOM_PATTERN.match(text) is not None
+                no_colon = ':' not in text
+                short_ok[i] = len(text) < 20 and no_colon
+                room_ok[i] = is_room
+                note_ok[i] = len(text) < 50 and no_colon and not is_room
+            
+            # Feld-Element: Wert = erster passender Text in den nächsten 3 Elementen
+            # (Reihenfolge wie im elif des Legacy-Parsers)
+            if testid:
+                if 'lesson-card-resources-with-change-teachers' in testid:
+                    k = _first_ok(short_ok, i, n)
+                    if k is not None:
+                        next_teacher = (i, k)
+                elif 'lesson-card-subject' in testid:
+                    k = _first_ok(short_ok, i, n)
+                    if k is not None:
+                        next_subject = (i, k)
+                elif 'lesson-card-resources-with-change-rooms' in testid:
+                    k = _first_ok(room_ok, i, n)
+                    if k is not None:
+                        next_room = (i, k)
+                elif 'lesson-card-text-content-container' in testid:
+                    k = _first_ok(note_ok, i, n)
+                    if k is not None:
+                        next_note = (i, k)
+            
+            if 'lesson-card ' in class_name:
+                cards.append((i, next_teacher, next_subject, next_room, next_note, next_stop))
+            
+            if 'lesson-card' in class_name and 'lesson-card-' not in class_name:
+                next_stop = i
+        
+        # Cards in Dokument-Reihenfolge, Tage über Zeit-Resets
+        lessons = []
+        day_offset = 0
+        last_start_time = None
+        
+        for i, teacher, subject, room_entry, note, stop in reversed(cards):
+            times = TIME_PATTERN.findall(texts[i])
+            if times:
+                current_time = times[0]
+                if last_start_time and current_time < last_start_time:
+                    day_offset += 1
+                last_start_time = current_time
+            
+            if len(times) < 2:
+                continue
+            
+            # Card-Bereich: bis inkl. nächster Card (Stop) und max. 35 Elemente
+            end = min(i + 35, n, stop + 1)
+            values = {}
+            for field, entry in (('teacher', teacher), ('subject', subject), ('room', room_entry), ('note', note)):
+                values[field] = texts[entry[1]] if entry and entry[0] < end else None
+            
+            room = values['room']
+            if not room:
+                match = ROOM_LIST_PATTERN.search(texts[i])
+                if match:
+                    room = match.group(1)
+            
+            while day_offset >= len(day_dates):
+                day_dates.append((monday + timedelta(days=len(day_dates))).strftime('%Y-%m-%d'))
+            
+            lessons.append(self._make_lesson(
+                date=day_dates[day_offset],
+                start_time=times[0],
+                end_time=times[1],
+                subject=values['subject'],
+                teacher=values['teacher'],
+                room=room,
+                note=values['note']
+            ))
+        
+        lessons.sort(key=lambda l: (l.date, l.start_time))
+        
+        print(f"\n✓ {len(lessons)} Lessons über {day_offset + 1} Tage gefunden")
+        
+        return lessons
+    
+    def _parse_api_lessons(self) -> List[UntisLesson]:
+        """Parst mitgeschnittene Timetable-JSON-Responses - keine DOM-Heuristiken nötig"""
+        responses = self.data['timetable'].get('responses', [])
+        
+        print(f"Analysiere {len(responses)} Timetable-Response(s)...")
+        print(f"Basis-Datum aus URL: {self.base_date}")
+        
+        # Nur Lessons der Woche aus der URL (die SPA lädt teils Nachbarwochen mit)
+        base = datetime.strptime(self.base_date, '%Y-%m-%d')
+        monday = base - timedelta(days=base.weekday())
+        week_dates = {(monday + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(7)}
+        
+        lessons = []
+        seen = set()
+        
+        for response in responses:
+            payload = response.get('data') or {}
+            
+            if 'days' in payload:
+                parsed = self._lessons_from_rest_entries(payload)
+            else:
+                parsed = self._lessons_from_weekly_data(payload)
+            
+            for lesson in parsed:
+                key = (lesson.date, lesson.start_time, lesson.end_time, lesson.subject, lesson.room)
+                if lesson.date not in week_dates or key in seen:
+                    continue
+                seen.add(key)
+                lessons.append(lesson)
+        
+        lessons.sort(key=lambda l: (l.date, l.start_time))
+        
+        print(f"\n✓ {len(lessons)} Lessons über {len(set(l.date for l in lessons))} Tage gefunden")
+        
+        return lessons
+    
+    def _parse_compact_lessons(self) -> List[UntisLesson]:
+        """Parst kompakte Lesson-Records - Tag aus der Header-Spalte, sonst über Zeit-Sprünge"""
+        records = self.data['timetable'].get('lessons', [])
+        
+        print(f"Analysiere {len(records)} Lessons...")
+        print(f"Basis-Datum aus URL: {self.base_date}")
+        
+        base = datetime.strptime(self.base_date, '%Y-%m-%d')
+        monday = base - timedelta(days=base.weekday())
+        
+        lessons = []
+        day_offset = 0
+        last_start_time = None
+        
+        for record in records:
+            start_time = record.get('start', '')
+            
+            # Fallback wie beim DOM-Parser: Zeit kleiner als die vorige = neuer Tag
+            if last_start_time and start_time < last_start_time:
+                day_offset += 1
+            last_start_time = start_time
+            
+            day = record.get('day')
+            if day is None:
+                day = day_offset
+            
+            lessons.append(self._make_lesson(
+                date=(monday + timedelta(days=day)).strftime('%Y-%m-%d'),
+                start_time=start_time,
+                end_time=record.get('end', ''),
+                subject=record.get('subject', ''),
+                teacher=record.get('teachers', ''),
+                room=record.get('rooms', ''),
+                note=record.get('note', '')
+            ))
+        
+        lessons.sort(key=lambda l: (l.date, l.start_time))
+        
+        print(f"\n✓ {len(lessons)} Lessons über {len(set(l.date for l in lessons))} Tage gefunden")
+        
+        return lessons
+    
+    @staticmethod
+    def _make_lesson(date: str, start_time: str, end_time: str, subject: str,
+                     teacher: str, room: str, note: str) -> UntisLesson:
+        """Erstellt eine Lesson mit denselben Defaults wie der DOM-Parser"""
+        return UntisLesson(
+            start_time=start_time,
+            end_time=end_time,
+            subject=subject or 'Unbekannt',
+            teacher=teacher or 'N/A',
+            room=room or 'N/A',
+            date=date,
+            note=note
+        )
+    
+    def _lessons_from_rest_entries(self, payload: Dict) -> List[UntisLesson]:
+        """Neue REST-API: /api/rest/view/v1/timetable/entries"""
+        lessons = []
+        
+        for day in payload.get('days', []):
+            for entry in day.get('gridEntries', []):
+                # Entfallene Stunden gehören nicht in den Kalender
+                if entry.get('status') == 'CANCELLED':
+                    continue
+                
+                duration = entry.get('duration', {})
+                start = duration.get('start', '')
+                end = duration.get('end', '')
+                if 'T' not in start or 'T' not in end:
+                    continue
+                
+                resources = {'TEACHER': [], 'SUBJECT': [], 'ROOM': []}
+                for position in ('position1', 'position2', 'position3', 'position4', 'position5'):
+                    for item in entry.get(position) or []:
+                        current = (item or {}).get('current')
+                        if not current or current.get('type') not in resources:
+                            continue
+                        name = current.get('shortName') or current.get('displayName') or ''
+                        # Hinzugefügte Ressourcen wie in der Web-Ansicht mit + markieren
+                        if current.get('status') == 'ADDED':
+                            name = f"+{name}"
+                        resources[current['type']].append(name)
+                
+                note = entry.get('lessonText') or entry.get('substitutionText') or entry.get('notesAll')
+                
+                lessons.append(self._make_lesson(
+                    date=start[:10],
+                    start_time=start[11:16],
+                    end_time=end[11:16],
+                    subject=', '.join(resources['SUBJECT']),
+                    teacher=', '.join(resources['TEACHER']),
+                    room=', '.join(resources['ROOM']),
+                    note=(note or '').strip()
+                ))
+        
+        return lessons
+    
+    def _lessons_from_weekly_data(self, payload: Dict) -> List[UntisLesson]:
+        """Alte Weekly-API: /api/public/timetable/weekly/data"""
+        lessons = []
+        data = payload.get('data', {}).get('result', {}).get('data', {})
+        
+        # Element-Typen: 1 = Klasse, 2 = Lehrer, 3 = Fach, 4 = Raum
+        elements = {(e.get('type'), e.get('id')): e.get('name', '') for e in data.get('elements', [])}
+        
+        for periods in data.get('elementPeriods', {}).values():
+            for period in periods:
+                if period.get('cellState') == 'CANCEL':
+                    continue
+                
+                date_raw = str(period.get('date', ''))
+                if len(date_raw) != 8:
+                    continue
+                
+                names = {2: [], 3: [], 4: []}
+                for element in period.get('elements', []):
+                    element_type = element.get('type')
+                    if element_type in names:
+                        names[element_type].append(elements.get((element_type, element.get('id')), ''))
+                
+                start = f"{period.get('startTime', 0):04d}"
+                end = f"{period.get('endTime', 0):04d}"
+                note = period.get('lessonText') or period.get('substText') or period.get('periodText')
+                
+                lessons.append(self._make_lesson(
+                    date=f"{date_raw[:4]}-{date_raw[4:6]}-{date_raw[6:]}",
+                    start_time=f"{start[:2]}:{start[2:]}",
+                    end_time=f"{end[:2]}:{end[2:]}",
+                    subject=', '.join(n for n in names[3] if n),
+                    teacher=', '.join(n for n in names[2] if n),
+                    room=', '.join(n for n in names[4] if n),
+                    note=(note or '').strip()
+                ))
+        
+        return lessons
+    
     def _parse_lesson_card(self, lessons_list: List[Dict], start_index: int, day_offset: int) -> Optional[UntisLesson]:
         """Parst eine einzelne Lesson-Card"""
         try:
@@ -240,33 +630,48 @@ class ImprovedUntisParser:
                 # Wenn wir einen Hinweis haben, füge ihn zur Beschreibung hinzu aber nicht zum Raum
                 final_room = room or 'N/A'
                 
-                # Erstelle Lesson mit optionalem Hinweis
-                lesson = UntisLesson(
+                # Erstelle Lesson mit optionalem Hinweis (für spätere Nutzung)
+                return UntisLesson(
                     start_time=start_time,
                     end_time=end_time,
                     subject=subject or 'Unbekannt',
                     teacher=teacher or 'N/A',
                     room=final_room,
-                    date=lesson_date_str
+                    date=lesson_date_str,
+                    note=note
                 )
-                
-                # Füge Hinweis als Attribut hinzu (für spätere Nutzung)
-                if note:
-                    lesson.note = note
-                
-                return lesson
         
         except Exception as e:
             print(f"  ⚠ Fehler: {e}")
         
         return None
 
+def _is_retryable(error) -> bool:
+    """Vorübergehender Fehler (Rate-Limit, Server) - lohnt eine Wiederholung"""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status == 403:
+        # "Rate Limit Exceeded" / rateLimitExceeded / userRateLimitExceeded
+        return 'ratelimitexceeded' in str(error).lower().replace(' ', '')
+    return status in RETRY_STATUS
+
+
 class GoogleCalendarSync:
     """Synchronisiert mit Google Calendar - mit Duplikat-Erkennung"""
     
-    def __init__(self, calendar_id: str = 'primary'):
+    def __init__(self, calendar_id: str = 'primary', batch_size: int = None, date_range: tuple = None):
+        """date_range: (erstes, letztes) Datum der Lessons - bestimmt den Abgleich-Zeitraum"""
         self.calendar_id = calendar_id
+        self.date_range = date_range
+        self.list_stats = new_transfer_stats()
+        if batch_size is None:
+            batch_size = int(os.getenv('UNTIS_CALENDAR_BATCH_SIZE', str(BATCH_LIMIT)))
+        self.batch_size = max(1, min(batch_size, BATCH_LIMIT))
+        self.retry = retry_policy_from_env()
+        self.write_stats = {}
         self.service = self._authenticate()
+        self.store = StateStore(calendar_id=calendar_id)
         self.existing_events = self._load_existing_events()
     
     def _authenticate(self):
@@ -291,73 +696,50 @@ class GoogleCalendarSync:
         return build('calendar', 'v3', credentials=creds)
     
     def _load_existing_events(self) -> Dict[str, str]:
-        """Lade existierende Events um Duplikate zu vermeiden"""
+        """Lade existierende Events um Duplikate zu vermeiden (inkrementell per syncToken)"""
         existing_by_uid = {}
         existing_by_signature = {}
+        existing_by_id = {}
         
         try:
-            # Hole Events - erweitere den Zeitraum und erhöhe das Limit
-            now = datetime.utcnow()
-            
-            # Gehe 7 Tage zurück (falls alte Events vorhanden)
-            time_min = (now - timedelta(days=7)).isoformat() + 'Z'
-            time_max = (now + timedelta(days=90)).isoformat() + 'Z'
-            
-            print("  🔍 Lade existierende Events...")
-            
-            all_events = []
-            page_token = None
-            
-            # Paginate durch ALLE Events (nicht nur erste 1000)
-            while True:
-                events_result = self.service.events().list(
-                    calendarId=self.calendar_id,
-                    timeMin=time_min,
-                    timeMax=time_max,
-                    maxResults=2500,  # Maximum pro Request
-                    singleEvents=True,
-                    orderBy='startTime',
-                    pageToken=page_token
-                ).execute()
-                
-                events = events_result.get('items', [])
-                all_events.extend(events)
-                
-                page_token = events_result.get('nextPageToken')
-                if not page_token:
-                    break
+            # Zeitraum: die Wochen der geparsten Lessons, ohne Lessons 7 Tage zurück
+            # (falls alte Events vorhanden) bis 90 Tage voraus
+            date_min, date_max = date_window(self.date_range)
             
-            print(f"  📊 {len(all_events)} Events im Zeitraum gefunden")
+            print(f"  🔍 Lade existierende Events ({date_min} bis {date_max})...")
             
-            # Filtere nur Events die wie Untis-Events aussehen
+            changes, incremental = refresh_store(self.service, self.store, self.calendar_id,
+                                                 self.list_stats)
+            if incremental:
+                print(f"  📊 {changes} geänderte Events seit dem letzten Lauf")
+            else:
+                print(f"  📊 {changes} Events im Kalender gelistet")
+            print(f"  📦 Übertragen: {format_transfer(self.list_stats)}")
+            
+            # Im Index sind nur Untis-Events - hier noch auf den Zeitraum einschränken
             untis_count = 0
             
-            for event in all_events:
-                summary = event.get('summary', '')
-                location = event.get('location', '')
-                
-                # Prüfe ob es ein Untis-Event sein könnte
-                # Kriterien: Kurzer Name (< 10 Zeichen) UND Raum-Pattern (O + Zahlen)
-                is_short_name = len(summary) <= 10
-                has_room_pattern = location and (
-                    location.startswith('O') and any(c.isdigit() for c in location)
-                )
-                
-                # Nur Events die beides haben sind wahrscheinlich Untis-Events
-                if not (is_short_name and has_room_pattern):
-                    continue
+            for event in self.store.events(date_min, date_max):
+                summary = event['summary']
+                location = event['location']
                 
                 untis_count += 1
                 
                 # Methode 1: Per untis_uid
-                extended = event.get('extendedProperties', {}).get('private', {})
-                uid = extended.get('untis_uid')
+                uid = event['uid']
                 if uid:
-                    existing_by_uid[uid] = event['id']
+                    existing_by_uid[uid] = event['event_id']
+                    existing_by_id[event['event_id']] = {
+                        'uid': uid,
+                        'hash': event['hash'],
+                        'date': event['date'],
+                        'start': event['start'][11:16],  # HH:MM wie UntisLesson.start_time
+                        'summary': summary,
+                    }
                 
                 # Methode 2: Per Signatur
                 try:
-                    start = event['start'].get('dateTime', event['start'].get('date'))
+                    start = event['start']
                     
                     if 'T' in start:
                         # Parse als datetime
@@ -369,9 +751,9 @@ class GoogleCalendarSync:
                         date_str = dt.strftime('%Y-%m-%d')
                         time_str = dt.strftime('%H:%M')
                         
-                        # Erstelle Signatur: Datum_Zeit_Fach_Raum
-                        signature = f"{date_str}_{time_str}_{summary}_{location}"
-                        existing_by_signature[signature] = event['id']
+                        # Erstelle Signatur: Datum_Zeit_Fach_Raum (wie UntisLesson.signature)
+                        signature = lesson_signature(date_str, time_str, summary, location)
+                        existing_by_signature[signature] = event['event_id']
                 except Exception as e:
                     print(f"  ⚠ Fehler beim Parsen von Event: {e}")
             
@@ -386,9 +768,58 @@ class GoogleCalendarSync:
         
         return {
             'by_uid': existing_by_uid,
-            'by_signature': existing_by_signature
+            'by_signature': existing_by_signature,
+            'by_id': existing_by_id
         }
     
+    
+    @staticmethod
+    def _event_body(lesson: UntisLesson) -> Dict:
+        """Event-Daten für eine Lesson"""
+        start_datetime = datetime.strptime(
+            f"{lesson.date} {lesson.start_time}", 
+            "%Y-%m-%d %H:%M"
+        )
+        end_datetime = datetime.strptime(
+            f"{lesson.date} {lesson.end_time}", 
+            "%Y-%m-%d %H:%M"
+        )
+        
+        # Erstelle Beschreibung mit optionaler Notiz
+        description_parts = [f'Lehrer: {lesson.teacher}', f'Raum: {lesson.room}']
+        if lesson.note:
+            description_parts.append(f'📝 {lesson.note}')
+        description = '\n'.join(description_parts)
+        
+        event = {
+            'summary': lesson.subject,
+            'location': lesson.room,
+            'description': description,
+            'start': {
+                'dateTime': start_datetime.isoformat(),
+                'timeZone': 'Europe/Berlin',
+            },
+            'end': {
+                'dateTime': end_datetime.isoformat(),
+                'timeZone': 'Europe/Berlin',
+            },
+            'colorId': '6',  # Orange (passend zu Untis)
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'popup', 'minutes': 10},
+                ],
+            },
+            'extendedProperties': {
+                'private': {
+                    'untis_uid': lesson.uid,
+                    'untis_hash': lesson_hash(lesson),
+                    'untis_source': 'automated_sync'
+                }
+            }
+        }
+        return event
+    
     def create_event(self, lesson: UntisLesson, skip_duplicates: bool = True) -> Optional[str]:
         """Erstellt ein Event - mit verbesserter Duplikat-Prüfung"""
         try:
@@ -396,73 +827,22 @@ class GoogleCalendarSync:
             if skip_duplicates and lesson.uid in self.existing_events['by_uid']:
                 return 'DUPLICATE_UID'
             
-            start_datetime = datetime.strptime(
-                f"{lesson.date} {lesson.start_time}", 
-                "%Y-%m-%d %H:%M"
-            )
-            end_datetime = datetime.strptime(
-                f"{lesson.date} {lesson.end_time}", 
-                "%Y-%m-%d %H:%M"
-            )
-            
-            # Prüfe auf Duplikate - Methode 2: Per Signatur
-            # Normalisiere Raum genauso wie für UID
-            room_parts = [r.strip() for r in lesson.room.split(',')]
-            room_normalized = None
-            for part in room_parts:
-                clean_part = part.lstrip('+').strip()
-                if clean_part and clean_part != 'N/A':
-                    room_normalized = clean_part
-                    break
-            if not room_normalized:
-                room_normalized = room_parts[0].lstrip('+').strip() if room_parts else lesson.room
-            
-            signature = f"{lesson.date}_{lesson.start_time}_{lesson.subject}_{room_normalized}"
+            # Prüfe auf Duplikate - Methode 2: Per Signatur (Raum normalisiert wie für UID)
+            signature = lesson.signature
             if skip_duplicates and signature in self.existing_events['by_signature']:
                 return 'DUPLICATE_SIG'
             
-            # Erstelle Beschreibung mit optionaler Notiz
-            description_parts = [f'Lehrer: {lesson.teacher}', f'Raum: {lesson.room}']
-            if hasattr(lesson, 'note') and lesson.note:
-                description_parts.append(f'📝 {lesson.note}')
-            description = '\n'.join(description_parts)
-            
-            event = {
-                'summary': lesson.subject,
-                'location': lesson.room,
-                'description': description,
-                'start': {
-                    'dateTime': start_datetime.isoformat(),
-                    'timeZone': 'Europe/Berlin',
-                },
-                'end': {
-                    'dateTime': end_datetime.isoformat(),
-                    'timeZone': 'Europe/Berlin',
-                },
-                'colorId': '6',  # Orange (passend zu Untis)
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'popup', 'minutes': 10},
-                    ],
-                },
-                'extendedProperties': {
-                    'private': {
-                        'untis_uid': lesson.uid,
-                        'untis_source': 'automated_sync'
-                    }
-                }
-            }
+            event = self._event_body(lesson)
             
             event_result = self.service.events().insert(
                 calendarId=self.calendar_id,
-                body=event
+                body=event,
+                fields=EVENT_FIELDS
             ).execute()
             
             # Speichere in existierenden Events (WICHTIG!)
             event_id = event_result.get('id')
-            self.existing_events['by_uid'][lesson.uid] = event_id
-            self.existing_events['by_signature'][signature] = event_id
+            self._remember_event(event_id, lesson, event_result)
             
             return event_id
         
@@ -506,20 +886,193 @@ class GoogleCalendarSync:
             print(f"✗ Fehlgeschlagen: {failed}")
         print(f"{'='*60}\n")
     
+    def _remember_event(self, event_id: str, lesson: UntisLesson, event: Dict = None):
+        """Neues/aktualisiertes Event in existing_events und im lokalen Index eintragen"""
+        if event:
+            self.store.upsert_event(event)
+        self.existing_events['by_uid'][lesson.uid] = event_id
+        self.existing_events['by_signature'][lesson.signature] = event_id
+        self.existing_events['by_id'][event_id] = {
+            'uid': lesson.uid, 'hash': lesson_hash(lesson), 'date': lesson.date
+        }
+    
+    def _forget_event(self, event_id: str):
+        self.store.delete_event(event_id)
+        info = self.existing_events['by_id'].pop(event_id, None)
+        if info and self.existing_events['by_uid'].get(info['uid']) == event_id:
+            del self.existing_events['by_uid'][info['uid']]
+    
+    def _execute_batched(self, actions: list) -> List[bool]:
+        """
+        Führt Requests per Batch aus (bis zu batch_size pro HTTP-Request), bei
+        batch_size 1 ohne Batch-Endpunkt einzeln per execute()
+        actions: Liste von (build_request, on_success, gone_ok) - build_request erzeugt den
+        Request (pro Versuch neu), on_success bekommt die Antwort, gone_ok = 404/410 zählt
+        als Erfolg (Löschen). Nur Einzel-Requests mit vorübergehendem Fehler werden
+        wiederholt. Gibt pro Action zurück ob sie erfolgreich war.
+        """
+        started = time.perf_counter()
+        done = [False] * len(actions)
+        pending = list(range(len(actions)))
+        requests = 0
+        batches = 0
+        retried = 0
+        attempt = 0
+        
+        while pending:
+            retry = []
+            
+            def on_result(request_id, response, exception):
+                index = int(request_id)
+                _, on_success, gone_ok = actions[index]
+                if exception is not None and gone_ok and isinstance(exception, HttpError) \
+                        and exception.resp.status in (404, 410):
+                    exception = None  # schon weg
+                if exception is None:
+                    on_success(response)
+                    done[index] = True
+                elif _is_retryable(exception) and attempt < self.retry.retries:
+                    retry.append(index)
+                else:
+                    print(f'  ✗ HTTP Error: {exception}')
+            
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                if self.batch_size <= 1:
+                    index = chunk[0]
+                    try:
+                        response = actions[index][0]().execute()
+                    except HttpError as error:
+                        on_result(str(index), None, error)
+                    else:
+                        on_result(str(index), response, None)
+                    requests += 1
+                    continue
+                
+                batch = self.service.new_batch_http_request(callback=on_result)
+                for index in chunk:
+                    batch.add(actions[index][0](), request_id=str(index))
+                
+                try:
+                    batch.execute()
+                except HttpError as error:
+                    # Ganzer Batch abgelehnt - alle Einträge wie Einzelfehler behandeln
+                    for index in chunk:
+                        on_result(str(index), None, error)
+                
+                requests += len(chunk)
+                batches += 1
+            
+            if retry:
+                delay = self.retry.delay(attempt)
+                print(f"  🔁 {len(retry)} Requests werden in {delay:.1f}s erneut gesendet")
+                time.sleep(delay)
+                retried += len(retry)
+                attempt += 1
+            pending = sorted(retry)
+        
+        seconds = time.perf_counter() - started
+        self.write_stats = {
+            'requests': requests,
+            'batches': batches,
+            'retried': retried,
+            'seconds': round(seconds, 3),
+            'requests_per_second': round(requests / seconds, 1) if seconds > 0 else None,
+        }
+        return done
+    
+    def _insert_action(self, lesson: UntisLesson, event_ids: list = None, index: int = None):
+        def on_success(response):
+            self._remember_event(response.get('id'), lesson, response)
+            if event_ids is not None:
+                event_ids[index] = response.get('id')
+        return (
+            lambda: self.service.events().insert(calendarId=self.calendar_id,
+                                                 body=self._event_body(lesson), fields=EVENT_FIELDS),
+            on_success,
+            False,
+        )
+    
+    def _patch_action(self, event_id: str, lesson: UntisLesson):
+        return (
+            lambda: self.service.events().patch(calendarId=self.calendar_id, eventId=event_id,
+                                                body=self._event_body(lesson), fields=EVENT_FIELDS),
+            lambda response: self._remember_event(event_id, lesson, response),
+            False,
+        )
+    
+    def _delete_action(self, event_id: str):
+        return (
+            lambda: self.service.events().delete(calendarId=self.calendar_id, eventId=event_id),
+            lambda response: self._forget_event(event_id),
+            True,
+        )
+    
+    def insert_events_batched(self, lessons: List[UntisLesson]) -> List[Optional[str]]:
+        """Fügt Events per Batch ein - Event-IDs in der Reihenfolge von lessons (None = fehlgeschlagen)"""
+        event_ids = [None] * len(lessons)
+        self._execute_batched([self._insert_action(lesson, event_ids, i)
+                               for i, lesson in enumerate(lessons)])
+        return event_ids
+    
+    def reconcile(self, lessons: List[UntisLesson], delete: bool = True, keep_weeks=()) -> Dict[str, int]:
+        """
+        Gleicht den Kalender mit den Lessons ab: neue Stunden einfügen, geänderte
+        patchen, entfallene löschen (siehe reconcile.py). Gibt Anzahl pro Aktion zurück.
+        keep_weeks: Montage (YYYY-MM-DD) in denen nichts gelöscht wird
+        """
+        plan = plan_sync(lessons, self.existing_events, delete=delete, keep_weeks=keep_weeks)
+        for week, reason in sorted(plan.kept_weeks.items()):
+            print(f"  ⚠ Woche ab {week}: {reason} - lösche dort nichts")
+        
+        kinds = (['insert'] * len(plan.inserts) + ['patch'] * len(plan.patches)
+                 + ['delete'] * len(plan.deletes))
+        actions = ([self._insert_action(lesson) for lesson in plan.inserts]
+                   + [self._patch_action(event_id, lesson) for event_id, lesson in plan.patches]
+                   + [self._delete_action(event_id) for event_id in plan.deletes])
+        
+        counts = {'insert': 0, 'patch': 0, 'delete': 0, 'unchanged': plan.unchanged, 'failed': 0}
+        self.write_stats = {}
+        if actions:
+            for kind, ok in zip(kinds, self._execute_batched(actions)):
+                counts[kind if ok else 'failed'] += 1
+        return counts
+    
     def sync_lessons_silent(self, lessons: List[UntisLesson]) -> tuple:
         """Synchronisiert Lessons ohne viel Output (für Automatisierung)"""
         created = 0
         duplicates = 0
         failed = 0
         
+        if self.batch_size <= 1:
+            for lesson in lessons:
+                result = self.create_event(lesson)
+                if result in ['DUPLICATE_UID', 'DUPLICATE_SIG']:
+                    duplicates += 1
+                elif result:
+                    created += 1
+                else:
+                    failed += 1
+            return (created, duplicates, failed)
+        
+        # Duplikate vorab aussortieren - auch innerhalb dieser Liste
+        to_insert = []
+        new_uids = set()
+        new_signatures = set()
         for lesson in lessons:
-            result = self.create_event(lesson)
-            if result in ['DUPLICATE_UID', 'DUPLICATE_SIG']:
+            if (lesson.uid in self.existing_events['by_uid'] or lesson.uid in new_uids
+                    or lesson.signature in self.existing_events['by_signature']
+                    or lesson.signature in new_signatures):
                 duplicates += 1
-            elif result:
-                created += 1
-            else:
-                failed += 1
+                continue
+            new_uids.add(lesson.uid)
+            new_signatures.add(lesson.signature)
+            to_insert.append(lesson)
+        
+        if to_insert:
+            event_ids = self.insert_events_batched(to_insert)
+            created = sum(1 for event_id in event_ids if event_id)
+            failed = len(event_ids) - created
         
         return (created, duplicates, failed)
 
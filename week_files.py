@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Schreiben der Wochen-Dateien (weekly_data/week_N.json)
+Gemeinsam für alle Extractor-Backends
+"""
+
+import json
+import os
+
+WEEKLY_DATA_DIR = 'weekly_data'
+
+# Stundenplan-Typen für UNTIS_ENTITIES (Web-Route und REST resourceType)
+ENTITY_TYPES = {
+    'class': 'CLASS',
+    'teacher': 'TEACHER',
+    'room': 'ROOM',
+    'student': 'STUDENT',
+}
+
+
+def parse_entities(spec: str) -> list:
+    """
+    Parst UNTIS_ENTITIES, z.B. "class:391,teacher:12:Fay,room:812"
+
+    Format pro Eintrag: typ:id[:label]. "me" steht für den eigenen Stundenplan.
+    Returns: Liste von Dicts {'type', 'id', 'label'} bzw. None für "me"
+    """
+    entities = []
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if item == 'me':
+            entities.append(None)
+            continue
+
+        parts = item.split(':')
+        if len(parts) < 2 or parts[0] not in ENTITY_TYPES or not parts[1].isdigit():
+            raise ValueError(f"Ungültige Entity '{item}' (erwartet typ:id[:label], typ = {', '.join(ENTITY_TYPES)})")
+
+        entities.append({
+            'type': parts[0],
+            'id': int(parts[1]),
+            'label': parts[2] if len(parts) > 2 else f"{parts[0]} {parts[1]}",
+        })
+    return entities
+
+
+def week_file_path(week_number: int, entity: dict = None) -> str:
+    """Pfad der Wochen-Datei (week_number beginnt bei 1), pro Entity ein eigenes Verzeichnis"""
+    if entity:
+        return os.path.join(WEEKLY_DATA_DIR, 'entities', f"{entity['type']}_{entity['id']}",
+                            f'week_{week_number}.json')
+    return os.path.join(WEEKLY_DATA_DIR, f'week_{week_number}.json')
+
+
+def job_label(entity: dict, week: int) -> str:
+    """Lesbare Bezeichnung eines (Entity, Woche)-Jobs für Log-Ausgaben"""
+    if entity:
+        return f"{entity['label']} Woche {week+1}"
+    return f"Woche {week+1}"
+
+
+def job_slug(entity: dict, week: int) -> str:
+    """Dateiname-tauglicher Name eines Jobs (z.B. für Debug-Artefakte)"""
+    if entity:
+        return f"{entity['type']}_{entity['id']}_week_{week+1}"
+    return f"week_{week+1}"
+
+
+def entity_throughput(entities: list, num_weeks: int, files: list, seconds: float) -> dict:
+    """Durchsatz eines Laufs - vollständig extrahierte Entities und Wochen pro Minute"""
+    saved = set(files)
+    complete = sum(
+        1 for entity in entities
+        if all(week_file_path(week + 1, entity) in saved for week in range(num_weeks))
+    )
+    minutes = max(seconds, 0.001) / 60
+    return {
+        'entities': len(entities),
+        'entities_complete': complete,
+        'weeks': len(files),
+        'seconds': round(seconds, 2),
+        'entities_per_minute': round(complete / minutes, 2),
+        'weeks_per_minute': round(len(files) / minutes, 2),
+    }
+
+
+class WeekPlan:
+    """
+    Jobs eines Laufs für alle Backends: alle (Entity, Woche)-Paare, davon fällig
+    und nach Refresh-Policy übersprungen (refresh=None = alles fällig)
+    """
+
+    def __init__(self, entities: list, num_weeks: int, refresh=None):
+        self.entities = entities
+        self.num_weeks = num_weeks
+        self.refresh = refresh
+        self.throughput = None
+        self.all_jobs = [(entity, week) for entity in entities for week in range(num_weeks)]
+        self.due, self.skipped = self.all_jobs, []
+        if refresh:
+            self.due, self.skipped = refresh.plan(self.all_jobs,
+                                                  lambda entity, week: week_file_path(week + 1, entity))
+            if self.skipped:
+                print(f"⏭️  {len(self.skipped)} von {len(self.all_jobs)} Wochen noch aktuell "
+                      f"(Refresh-Intervall) - übersprungen")
+
+    def skipped_files(self) -> list:
+        return [week_file_path(week + 1, entity) for entity, week in self.skipped]
+
+    def finish(self, files: list, seconds: float) -> list:
+        """
+        Durchsatz festhalten (self.throughput) und Refresh-Zustand speichern -
+        gibt extrahierte plus übersprungene Dateien in Job-Reihenfolge zurück
+        """
+        self.throughput = entity_throughput(self.entities, self.num_weeks, files, seconds)
+        self.throughput['skipped'] = len(self.skipped)
+        if len(self.entities) > 1:
+            print(f"\n⏱️  {self.throughput['entities']} Entities in {self.throughput['seconds']:.1f}s "
+                  f"({self.throughput['entities_per_minute']:.1f} Entities/Minute)")
+
+        if self.refresh:
+            self.refresh.save()
+
+        # Übersprungene Wochen sind aktuell und zählen wie extrahierte
+        order = {week_file_path(week + 1, entity): i for i, (entity, week) in enumerate(self.all_jobs)}
+        return sorted(files + self.skipped_files(), key=order.get)
+
+
+def save_week_file(path: str, data: dict, complete: bool = True):
+    """
+    Schreibt eine Wochen-Datei atomar (der Sync liest nie halbe Dateien)
+    complete=False: Stundenplan war beim Speichern nicht fertig gerendert (Timeout) -
+    die Datei wird markiert und der Sync löscht in dieser Woche nichts.
+    """
+    if not complete:
+        data = dict(data, incomplete=True)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+